@@ -0,0 +1,141 @@
+""" Benchmark for opening WebSocket connections.
+
+Times ``WampWebSocket.connect``, i.e. the TCP connect plus the HTTP
+upgrade handshake, against a local server that answers every upgrade
+request with a canned ``101 Switching Protocols``. The original
+byte-at-a-time handshake reader is timed alongside the buffered one for
+comparison.
+
+usage::
+
+    $ python benchmarks/bench_connect.py [connections]
+
+"""
+from __future__ import print_function
+
+import sys
+import time
+
+import eventlet
+
+from wampy.transports.websocket.connection import WampWebSocket
+
+
+HANDSHAKE_RESPONSE = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Server: Crossbar/0.15.0\r\n"
+    b"X-Powered-By: AutobahnPython/0.17.2\r\n"
+    b"Upgrade: WebSocket\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Sec-WebSocket-Protocol: wamp.2.json\r\n"
+    b"Sec-WebSocket-Accept: 9bQuJ8W0sJPf9o0qPAmzcXxzRDs=\r\n"
+    b"\r\n"
+)
+
+
+class Router(object):
+    ipv = 4
+
+    def __init__(self, port):
+        self.url = "ws://localhost:{}".format(port)
+
+
+class ByteAtATimeWampWebSocket(WampWebSocket):
+    """ The original handshake reader, for comparison. """
+
+    def _read_handshake_response(self):
+        status = None
+        headers = {}
+
+        while True:
+            eventlet.sleep()
+
+            line = bytearray()
+            while True:
+                received = self.socket.recv(1)
+                if not received:
+                    break
+                line.extend(received)
+                if received == b"\n":
+                    break
+
+            line = line.decode('utf-8')
+            if line == "\r\n" or line == "\n":
+                break
+
+            line = line.strip()
+            if not status:
+                status = int(line.split(" ", 2)[1])
+                headers['status'] = status
+                continue
+
+            key, value = line.split(":", 1)
+            headers[key.lower()] = value.strip().lower()
+
+        return status, headers
+
+
+def handle(client):
+    request = bytearray()
+    while b"\r\n\r\n" not in request:
+        received = client.recv(4096)
+        if not received:
+            client.close()
+            return
+        request.extend(received)
+
+    client.sendall(HANDSHAKE_RESPONSE)
+
+    # wait for the client to hang up
+    while client.recv(4096):
+        pass
+    client.close()
+
+
+def serve(server):
+    while True:
+        client, _ = server.accept()
+        eventlet.spawn(handle, client)
+
+
+def time_connections(transport_cls, router, connections):
+    started = time.time()
+
+    for _ in range(connections):
+        transport = transport_cls(router=router)
+        transport.connect()
+        assert transport.status == 101
+        transport.socket.close()
+
+    return time.time() - started
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    server = eventlet.listen(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    eventlet.spawn(serve, server)
+    router = Router(port)
+
+    print('{} connections'.format(connections))
+    print('{:>14}{:>12}{:>16}'.format('reader', 'total', 'per connection'))
+
+    timings = []
+    for name, transport_cls in (
+            ('byte-at-a-time', ByteAtATimeWampWebSocket),
+            ('buffered', WampWebSocket),
+    ):
+        # warm up
+        time_connections(transport_cls, router, 10)
+
+        elapsed = time_connections(transport_cls, router, connections)
+        timings.append(elapsed)
+        print('{:>14}{:>11.3f}s{:>14.1f}us'.format(
+            name, elapsed, elapsed / connections * 1e6))
+
+    print('speed-up: {:.1f}x'.format(timings[0] / timings[1]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+""" Benchmark for the peak memory taken to receive a large message.
+
+A local server, in a separate process, sends a single RESULT of the
+given size over a WebSocket connection, which is received and decoded
+by a fresh process for each case, reporting how far receiving it raised
+that process's peak memory (max RSS) above where it started. Messages
+are received
+
+- through the receive buffer and decoded from text, as wampy used to,
+- straight into a buffer of their own, and decoded from UTF-8 bytes.
+
+usage::
+
+    $ python benchmarks/bench_large_message.py [megabytes]
+
+"""
+from __future__ import print_function
+
+import json
+import os
+import resource
+import socket
+import sys
+import time
+from struct import pack
+
+from wampy.transports.websocket.connection import WampWebSocket
+
+
+class Router(object):
+    ipv = 4
+
+    def __init__(self, port):
+        self.url = "ws://localhost:{}".format(port)
+
+
+def make_frame(megabytes):
+    body = json.dumps(
+        [50, 1, {}, [u"\u00e9t\u00e9 " * (megabytes * 1024 * 1024 // 8)]],
+        ensure_ascii=False,
+    ).encode('utf-8')
+
+    return pack('!BBQ', 0x82, 127, len(body)) + body
+
+
+def max_rss():
+    # kilobytes, on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def serve(listener, megabytes):
+    frame = make_frame(megabytes)
+    while True:
+        client, _ = listener.accept()
+        client.sendall(frame)
+        client.close()
+
+
+def receive(port, stream):
+    connection = WampWebSocket(router=Router(port))
+    if not stream:
+        connection.large_frame_size = float('inf')
+
+    connection._connect()
+    before = max_rss()
+
+    frame = connection.read_websocket_frame()
+    if stream:
+        payload = frame.payload
+    else:
+        payload = json.loads(frame.text)
+
+    assert payload[0] == 50
+    return max_rss() - before
+
+
+def measure(port, stream):
+    read_end, write_end = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        os.write(write_end, str(receive(port, stream)).encode('ascii'))
+        os._exit(0)
+
+    os.close(write_end)
+    started = time.time()
+    os.waitpid(pid, 0)
+    elapsed = time.time() - started
+
+    peak = int(os.read(read_end, 64))
+    os.close(read_end)
+    return peak, elapsed
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(5)
+    port = listener.getsockname()[1]
+
+    pid = os.fork()
+    if pid == 0:
+        serve(listener, megabytes)
+        os._exit(0)
+    listener.close()
+
+    print('a {} MB RESULT'.format(megabytes))
+    print('{:>12}{:>16}{:>12}'.format('', 'peak memory', 'time'))
+
+    try:
+        for name, stream in (('buffered', False), ('streamed', True)):
+            peak, elapsed = measure(port, stream)
+            print('{:>12}{:>14.0f}MB{:>11.2f}s'.format(
+                name, peak / 1024.0, elapsed))
+    finally:
+        os.kill(pid, 15)
+        os.waitpid(pid, 0)
+
+
+if __name__ == '__main__':
+    main()
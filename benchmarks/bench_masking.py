@@ -0,0 +1,94 @@
+""" Micro-benchmark for Client -> Server frame masking.
+
+Compares the original byte-at-a-time masking loop with the whole-buffer
+implementations in ``wampy.transports.websocket.masking``.
+
+usage::
+
+    $ python benchmarks/bench_masking.py
+
+"""
+from __future__ import print_function
+
+import array
+import os
+import timeit
+
+from wampy.transports.websocket import masking
+
+
+SIZES = [
+    16, 256, 4 * 1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024,
+]
+
+# don't wait all day for the byte loop to mask 16 MB over and over
+MAX_BYTES_PER_RUN = 32 * 1024 * 1024
+
+
+def mask_bytewise(mask_key, data):
+    """ The original implementation, for comparison. """
+    _m = array.array("B", mask_key)
+    _d = array.array("B", data)
+
+    for i in range(len(_d)):
+        _d[i] ^= _m[i % 4]
+
+    return _d.tobytes() if hasattr(_d, 'tobytes') else _d.tostring()
+
+
+def copy_and_mask(engine):
+    def masker(mask_key, data):
+        buffer = bytearray(data)
+        engine(mask_key, buffer)
+        return bytes(buffer)
+
+    return masker
+
+
+def best_of(fn, number, repeat=3):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return '{}{}'.format(size, unit)
+        size //= 1024
+    return '{}GB'.format(size)
+
+
+def main():
+    engines = [
+        ('bytewise', mask_bytewise),
+        ('translate', copy_and_mask(masking.mask_with_translate)),
+    ]
+    if masking.numpy is not None:
+        engines.append(('numpy', copy_and_mask(masking.mask_with_numpy)))
+    else:
+        print('NumPy is not installed: skipping the NumPy engine\n')
+
+    print('{:>8}'.format('size') + ''.join(
+        '{:>14}'.format(name) for name, _ in engines) + '{:>10}'.format(
+        'speed-up'))
+
+    mask_key = os.urandom(4)
+
+    for size in SIZES:
+        data = os.urandom(size)
+        expected = mask_bytewise(mask_key, data)
+        number = max(1, MAX_BYTES_PER_RUN // (size * 64))
+
+        timings = []
+        for name, engine in engines:
+            assert engine(mask_key, data) == expected, name
+            timings.append(
+                best_of(lambda: engine(mask_key, data), number=number)
+            )
+
+        print('{:>8}'.format(format_size(size)) + ''.join(
+            '{:>12.1f}us'.format(t * 1e6) for t in timings
+        ) + '{:>9.0f}x'.format(timings[0] / min(timings[1:])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+""" Benchmark for sending bursts of small messages.
+
+Many green threads each send a burst of small WAMP messages over one
+``WampWebSocket`` to a local server, in a separate process, that reads
+and discards everything sent to it. Messages are sent both through the
+connection's writer, as wampy does, and with a ``sendall`` per message
+by the green thread sending it, as it used to.
+
+usage::
+
+    $ python benchmarks/bench_send.py [green threads] [messages each]
+
+"""
+from __future__ import print_function
+
+import os
+import signal
+import sys
+import time
+
+import eventlet
+
+from wampy.transports.websocket.connection import WampWebSocket
+
+
+MESSAGE = u'[16,1,{},"com.example.topic",["spam"],{}]'
+
+
+class Router(object):
+    ipv = 4
+
+    def __init__(self, port):
+        self.url = "ws://localhost:{}".format(port)
+
+
+class SendallWriter(object):
+    """ A write per frame, for comparison. """
+
+    def __init__(self, send):
+        self.send = send
+
+    def start(self):
+        pass
+
+    def admit(self):
+        return True
+
+    def write(self, data):
+        self.send(data)
+
+    def flush(self):
+        pass
+
+
+class SendallWampWebSocket(WampWebSocket):
+
+    def __init__(self, *args, **kwargs):
+        super(SendallWampWebSocket, self).__init__(*args, **kwargs)
+        self.writer = SendallWriter(self._sendall)
+
+
+class CountingSocket(object):
+
+    def __init__(self, _socket):
+        self._socket = _socket
+        self.writes = 0
+
+    def sendall(self, data):
+        self.writes += 1
+        self._socket.sendall(data)
+
+
+def serve(listener):
+    client, _ = listener.accept()
+    while client.recv(1024 * 1024):
+        pass
+
+
+def burst(connection, messages):
+    for _ in range(messages):
+        connection.send(MESSAGE)
+
+
+def time_bursts(transport_cls, router, threads, messages):
+    connection = transport_cls(router=router)
+    connection._connect()
+    connection.socket = CountingSocket(connection.socket)
+    connection.writer.start()
+
+    started = time.time()
+    pool = [
+        eventlet.spawn(burst, connection, messages) for _ in range(threads)
+    ]
+    for thread in pool:
+        thread.wait()
+    connection.writer.flush()
+    elapsed = time.time() - started
+
+    connection.socket._socket.close()
+    return elapsed, connection.socket.writes
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    messages = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    total = threads * messages
+
+    print('{} green threads sending {} messages each'.format(
+        threads, messages))
+    print('{:>12}{:>14}{:>12}'.format('writes', 'messages/s', 'syscalls'))
+
+    for name, transport_cls in (
+            ('per frame', SendallWampWebSocket),
+            ('writer', WampWebSocket),
+    ):
+        listener = eventlet.listen(('127.0.0.1', 0))
+        router = Router(listener.getsockname()[1])
+
+        pid = os.fork()
+        if pid == 0:
+            serve(listener)
+            os._exit(0)
+        listener.close()
+
+        try:
+            elapsed, writes = time_bursts(
+                transport_cls, router, threads, messages)
+        finally:
+            os.kill(pid, signal.SIGTERM)
+            os.waitpid(pid, 0)
+
+        print('{:>12}{:>14.0f}{:>12}'.format(name, total / elapsed, writes))
+
+
+if __name__ == '__main__':
+    main()
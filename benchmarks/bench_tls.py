@@ -0,0 +1,191 @@
+""" Benchmark for opening TLS WebSocket connections.
+
+Times ``TLSWampWebSocket.connect`` - the TCP connect, the TLS handshake
+and the HTTP upgrade - against a local server, in a separate process,
+that answers every upgrade request with a canned ``101 Switching
+Protocols``. Both the wall clock time and the CPU time spent by the
+client are reported, for
+
+- ``ssl.wrap_socket`` creating a new context for every connection, as
+  wampy used to,
+- a shared ``SSLContext``, and
+- a shared ``SSLContext`` resuming the TLS session of the previous
+  connection, where Python supports it (3.6+).
+
+The server uses the certificate of the test suite. As that has expired,
+certificates are not verified here.
+
+usage::
+
+    $ python benchmarks/bench_tls.py [connections]
+
+"""
+from __future__ import print_function
+
+import os
+import resource
+import signal
+import sys
+import time
+
+import eventlet
+from eventlet.green import socket, ssl
+
+from wampy.transports import tls
+from wampy.transports.websocket.connection import TLSWampWebSocket
+
+
+CERTIFICATE = './wampy/testing/keys/server_cert.pem'
+KEY = './wampy/testing/keys/server_key.pem'
+
+HANDSHAKE_RESPONSE = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Upgrade: WebSocket\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Sec-WebSocket-Protocol: wamp.2.json\r\n"
+    b"\r\n"
+)
+
+
+class Router(object):
+    ipv = 4
+    certificate = CERTIFICATE
+
+    def __init__(self, port):
+        self.url = "wss://localhost:{}".format(port)
+
+
+class WrapSocketTLSWampWebSocket(TLSWampWebSocket):
+    """ The original, context per connection, TLS setup for comparison.
+    """
+
+    def _connect(self):
+        _socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket = ssl.wrap_socket(
+            _socket,
+            ssl_version=ssl.PROTOCOL_TLSv1_2,
+            ciphers=tls.CIPHERS,
+            cert_reqs=ssl.CERT_NONE,
+            ca_certs=self.certificate,
+        )
+        self.socket.connect((self.host, self.port))
+
+    def _upgrade(self):
+        super(TLSWampWebSocket, self)._upgrade()
+
+
+def handle(client, context):
+    # as a router would, or else replies queue behind the session tickets
+    # sent after a TLS 1.3 handshake, waiting on a delayed ACK
+    client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    try:
+        client = context.wrap_socket(client, server_side=True)
+
+        request = bytearray()
+        while b"\r\n\r\n" not in request:
+            received = client.recv(4096)
+            if not received:
+                return
+            request.extend(received)
+
+        client.sendall(HANDSHAKE_RESPONSE)
+
+        # wait for the client to hang up
+        while client.recv(4096):
+            pass
+    except (socket.error, ssl.SSLError):
+        pass
+    finally:
+        client.close()
+
+
+def serve(listener):
+    context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+    context.load_cert_chain(CERTIFICATE, KEY)
+
+    while True:
+        client, _ = listener.accept()
+        eventlet.spawn(handle, client, context)
+
+
+def cpu_time():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def time_connections(make_connection, connections):
+    started, started_cpu = time.time(), cpu_time()
+
+    for _ in range(connections):
+        connection = make_connection()
+        connection.connect()
+        assert connection.status == 101
+        connection.disconnect()
+
+    return time.time() - started, cpu_time() - started_cpu
+
+
+def main():
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    listener = eventlet.listen(('127.0.0.1', 0))
+    router = Router(listener.getsockname()[1])
+
+    pid = os.fork()
+    if pid == 0:
+        serve(listener)
+        os._exit(0)
+
+    listener.close()
+
+    try:
+        run(router, connections)
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+
+def run(router, connections):
+    def shared_context():
+        tls.clear()
+        context = tls.create_ssl_context(CERTIFICATE)
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    no_resumption = shared_context()
+    resumption = shared_context()
+    tls.SESSION_RESUMPTION, resumes = False, tls.SESSION_RESUMPTION
+
+    cases = [
+        ('wrap_socket', lambda: WrapSocketTLSWampWebSocket(
+            router=router, ssl_context=no_resumption)),
+        ('shared context', lambda: TLSWampWebSocket(
+            router=router, ssl_context=no_resumption)),
+    ]
+
+    print('{} connections'.format(connections))
+    print('{:>26}{:>16}{:>16}'.format(
+        '', 'per connection', 'client CPU'))
+
+    def report(name, make_connection):
+        # warm up
+        time_connections(make_connection, 10)
+
+        elapsed, cpu = time_connections(make_connection, connections)
+        print('{:>26}{:>14.0f}us{:>14.0f}us'.format(
+            name, elapsed / connections * 1e6, cpu / connections * 1e6))
+
+    for name, make_connection in cases:
+        report(name, make_connection)
+
+    if resumes:
+        tls.SESSION_RESUMPTION = True
+        report('shared context + resume', lambda: TLSWampWebSocket(
+            router=router, ssl_context=resumption))
+    else:
+        print('TLS session resumption requires Python 3.6+: not measured')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+""" Benchmark comparing the WebSocket and RawSocket transports.
+
+Starts Crossbar.io with each transport in turn and measures
+
+- the round trip time of an RPC with a tiny payload, and
+- the throughput of RPCs echoing large payloads back and forth.
+
+Crossbar.io must be installed. Run from the root of the repository::
+
+    $ python benchmarks/bench_transports.py
+
+"""
+from __future__ import print_function
+
+import time
+
+from wampy.peers.clients import Client
+from wampy.peers.routers import Crossbar
+from wampy.roles.callee import callee
+from wampy.testing.helpers import wait_for_registrations
+
+
+CONFIGS = [
+    ('websocket', './wampy/testing/configs/crossbar.config.ipv4.json'),
+    (
+        'rawsocket',
+        './wampy/testing/configs/crossbar.config.ipv4.rawsocket.json',
+    ),
+]
+
+RTT_CALLS = 2000
+BULK_CALLS = 20
+BULK_SIZE = 256 * 1024
+
+
+class EchoService(Client):
+
+    @callee
+    def echo(self, message):
+        return message
+
+
+def measure(transport, router):
+    service = EchoService(router=router, transport=transport)
+    client = Client(router=router, transport=transport)
+
+    with service, client:
+        wait_for_registrations(service, 1)
+
+        # warm up
+        for _ in range(100):
+            client.rpc.echo("x")
+
+        started = time.time()
+        for _ in range(RTT_CALLS):
+            client.rpc.echo("x")
+        rtt = (time.time() - started) / RTT_CALLS
+
+        message = "x" * BULK_SIZE
+        started = time.time()
+        for _ in range(BULK_CALLS):
+            assert len(client.rpc.echo(message)) == BULK_SIZE
+        elapsed = time.time() - started
+
+    # every byte goes to the callee and back, via the router, twice
+    throughput = 4.0 * BULK_SIZE * BULK_CALLS / elapsed
+
+    return rtt, throughput
+
+
+def main():
+    print('{:>10}{:>12}{:>16}'.format('transport', 'RPC RTT', 'throughput'))
+
+    for transport, config_path in CONFIGS:
+        with Crossbar(
+                config_path=config_path, crossbar_directory='./') as router:
+            rtt, throughput = measure(transport, router)
+
+        # don't start the next router until this one has let go of its port
+        router.proc.wait()
+
+        print('{:>10}{:>10.0f}us{:>12.1f}MB/s'.format(
+            transport, rtt * 1e6, throughput / 1024 / 1024))
+
+
+if __name__ == '__main__':
+    main()
@@ -32,6 +32,9 @@ setup(
         "eventlet==0.18.4",
     ],
     extras_require={
+        'gevent': [
+            "gevent",
+        ],
         'dev': [
             "crossbar==0.15.0",
             "autobahn==0.17.2",
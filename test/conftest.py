@@ -1,10 +1,16 @@
 import logging
+import sys
 
 import colorlog
 import pytest
 
 from wampy.peers.clients import Client
 
+collect_ignore = []
+if sys.version_info < (3, 5):
+    # async/await syntax
+    collect_ignore.append('test_aio.py')
+
 logging_level_map = {
     'DEBUG': logging.DEBUG,
     'INFO': logging.INFO,
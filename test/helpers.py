@@ -13,3 +13,52 @@ def assert_stops_raising(
             else:
                 return
             eventlet.sleep(interval)
+
+
+class FakeRouter(object):
+
+    def __init__(self, url="ws://localhost:8080", ipv=4):
+        self.url = url
+        self.ipv = ipv
+
+
+class FakeSocket(object):
+    """ Hands out pre-canned chunks of bytes, one per ``recv``. """
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.recv_calls = 0
+        self.sent = bytearray()
+        self.timeout = None
+
+    def gettimeout(self):
+        return self.timeout
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def recv(self, bufsize):
+        self.recv_calls += 1
+        if not self.chunks:
+            return b''
+
+        chunk = self.chunks.pop(0)
+        assert len(chunk) <= bufsize
+        return chunk
+
+    def sendall(self, data):
+        self.sent.extend(data)
+
+    def recv_into(self, buffer):
+        self.recv_calls += 1
+        if not self.chunks:
+            return 0
+
+        chunk = self.chunks.pop(0)
+        if len(chunk) > len(buffer):
+            # as a socket would, keep the rest for the next call
+            self.chunks.insert(0, chunk[len(buffer):])
+            chunk = chunk[:len(buffer)]
+
+        buffer[:len(chunk)] = chunk
+        return len(chunk)
@@ -0,0 +1,158 @@
+import time
+
+import eventlet
+import pytest
+
+from wampy.errors import CallCanceledError, CallError, WampProtocolError
+from wampy.peers.clients import Client
+from wampy.roles.callee import callee
+from wampy.testing.helpers import wait_for_registrations
+
+
+class MathService(Client):
+
+    @callee
+    def square(self, number):
+        return number * number
+
+    @callee
+    def add(self, first, second):
+        return first + second
+
+    @callee
+    def slow_square(self, number, delay):
+        eventlet.sleep(delay)
+        return number * number
+
+    @callee
+    def count_to(self, number):
+        for count in range(1, number + 1):
+            yield count
+
+
+@pytest.yield_fixture
+def math_service(router):
+    with MathService(router=router) as service:
+        wait_for_registrations(service, 4)
+        yield
+
+
+@pytest.yield_fixture
+def client(router, math_service):
+    with Client(router=router) as client:
+        yield client
+
+
+def test_call_async(client):
+    future = client.call_async("square", 3)
+
+    assert future.result() == 9
+    assert future.done()
+
+
+def test_call_async_with_concurrent_calls(client):
+    futures = [client.call_async("add", number, 1) for number in range(50)]
+
+    assert [future.result() for future in futures] == list(range(1, 51))
+
+
+def test_call_async_error(client):
+    future = client.call_async("no.such.procedure")
+
+    with pytest.raises(WampProtocolError):
+        future.result()
+
+    with pytest.raises(CallError) as exc_info:
+        future.result()
+    assert exc_info.value.uri == "wamp.error.no_such_procedure"
+
+
+def test_call_error(client):
+    with pytest.raises(CallError) as exc_info:
+        client.call("no.such.procedure")
+
+    assert exc_info.value.uri == "wamp.error.no_such_procedure"
+
+
+def test_call_many_in_order(client):
+    results = client.call_many("square", range(100), concurrency=7)
+
+    assert list(results) == [number * number for number in range(100)]
+
+
+def test_call_many_as_completed(client):
+    results = client.call_many(
+        "add", [(number, 1) for number in range(100)], ordered=False)
+
+    assert sorted(results) == list(range(1, 101))
+
+
+def test_call_many_bounds_calls_in_flight(client):
+    in_flight = []
+    call_async = client.call_async
+
+    def record_call_async(*args, **kwargs):
+        in_flight.append(len(client.session._pending))
+        return call_async(*args, **kwargs)
+
+    client.call_async = record_call_async
+
+    assert len(list(client.call_many("square", range(30), concurrency=4)))
+
+    assert max(in_flight) < 4
+
+
+def test_call_many_error_abandons_calls_in_flight(client):
+    with pytest.raises(WampProtocolError):
+        list(client.call_many("no.such.procedure", range(10), concurrency=4))
+
+    assert client.session._pending == {}
+
+
+def test_call_with_timeout(client):
+    started = time.time()
+
+    with pytest.raises(WampProtocolError):
+        client.rpc.with_timeout(0.05).slow_square(2, 1)
+
+    assert time.time() - started < 0.5
+
+    assert client.call.with_timeout(5)("slow_square", 2, 0.1) == 4
+    assert client.session._pending == {}
+
+
+def test_call_timeout_of_the_client(router, math_service):
+    with Client(router=router, call_timeout=0.05) as client:
+        future = client.call_async("slow_square", 2, 1)
+
+        with pytest.raises(WampProtocolError):
+            future.result()
+
+        assert client.rpc.with_timeout(5).slow_square(3, 0) == 9
+
+
+def test_cancel_call(client):
+    future = client.call_async("slow_square", 2, 0.5)
+
+    assert future.cancel() is True
+
+    with pytest.raises(CallCanceledError):
+        future.result()
+
+    # the session carries on regardless of the late result
+    assert client.rpc.square(3) == 9
+
+
+def test_call_stream(client):
+    assert list(client.call_stream("count_to", 500)) == list(range(1, 501))
+
+    # all at once when progressive results aren't asked for
+    assert client.rpc.count_to(3) == [1, 2, 3]
+
+
+def test_call_stream_stopped_early(client):
+    for count in client.call_stream("count_to", 1000):
+        if count == 10:
+            break
+
+    assert client.rpc.square(3) == 9
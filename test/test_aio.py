@@ -0,0 +1,378 @@
+import asyncio
+import json
+from struct import pack
+from time import time
+
+import pytest
+
+from wampy.aio import Client, callee, subscribe
+from wampy.errors import CallError, ConnectionError, WampProtocolError
+from wampy.transports.websocket import masking
+from wampy.transports.websocket.frames import FrameHeader
+
+
+HANDSHAKE_RESPONSE = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Upgrade: WebSocket\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Sec-WebSocket-Protocol: wamp.2.json\r\n"
+    b"\r\n"
+)
+
+
+class Router(object):
+    ipv = 4
+    realm = {'name': 'realm1'}
+
+    def __init__(self, port):
+        self.url = "ws://localhost:{}".format(port)
+
+
+class Peer(object):
+
+    def __init__(self, session_id, writer):
+        self.session_id = session_id
+        self.writer = writer
+
+    def send(self, message):
+        body = json.dumps(message).encode('utf-8')
+        length = len(body)
+        if length < 126:
+            header = pack('!BB', 0x81, length)
+        elif length < (1 << 16):
+            header = pack('!BBH', 0x81, 126, length)
+        else:
+            header = pack('!BBQ', 0x81, 127, length)
+
+        self.writer.write(header + body)
+
+
+class FakeRouter(object):
+    """ Just enough of a WAMP router, over WebSocket, to test against. """
+
+    def __init__(self):
+        self.server = None
+        self.port = None
+        self.peers = []
+
+        self._ids = iter(range(1, 1 << 30))
+        # topic: [(peer, subscription ID)]
+        self.subscriptions = {}
+        # registration ID: peer
+        self.registrations = {}
+        # procedure: registration ID
+        self.procedures = {}
+        # invocation ID: (caller, CALL request ID, callee)
+        self.invocations = {}
+        # the messages of each type received, by WAMP code
+        self.received = {}
+
+    async def start(self):
+        self.server = await asyncio.start_server(
+            self.handle, '127.0.0.1', 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        for peer in self.peers:
+            peer.writer.close()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def read_message(self, reader):
+        data = await reader.readexactly(2)
+        indicator = data[1] & 0x7F
+        if indicator == 126:
+            data += await reader.readexactly(2)
+        elif indicator == 127:
+            data += await reader.readexactly(8)
+        data += await reader.readexactly(4)
+
+        header = FrameHeader.parse(bytearray(data))
+        mask_key = data[-4:]
+        body = masking.mask(
+            mask_key, await reader.readexactly(header.payload_length))
+
+        if header.opcode == 0x8:
+            return None
+        return json.loads(body.decode('utf-8'))
+
+    async def handle(self, reader, writer):
+        await reader.readuntil(b'\r\n\r\n')
+        writer.write(HANDSHAKE_RESPONSE)
+
+        peer = Peer(next(self._ids), writer)
+        self.peers.append(peer)
+
+        try:
+            while True:
+                message = await self.read_message(reader)
+                if message is None:
+                    break
+                self.process(peer, message)
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    def process(self, peer, message):
+        wamp_code = message[0]
+        self.received.setdefault(wamp_code, []).append(message)
+
+        if wamp_code == 1:  # HELLO
+            peer.send([2, peer.session_id, {
+                "roles": {"dealer": {"features": {"call_canceling": True}}},
+            }])
+
+        elif wamp_code == 6:  # GOODBYE
+            peer.send([6, {}, "wamp.close.goodbye_and_out"])
+
+        elif wamp_code == 64:  # REGISTER
+            _, request_id, _, procedure = message
+            registration_id = next(self._ids)
+            self.registrations[registration_id] = peer
+            self.procedures[procedure] = registration_id
+            peer.send([65, request_id, registration_id])
+
+        elif wamp_code == 48:  # CALL
+            _, request_id, _, procedure, args, kwargs = message
+            if procedure not in self.procedures:
+                peer.send([
+                    8, 48, request_id, {}, "wamp.error.no_such_procedure"])
+                return
+
+            registration_id = self.procedures[procedure]
+            callee = self.registrations[registration_id]
+            invocation_id = next(self._ids)
+            self.invocations[invocation_id] = peer, request_id, callee
+            callee.send(
+                [68, invocation_id, registration_id, {}, args, kwargs])
+
+        elif wamp_code == 70:  # YIELD
+            _, invocation_id, _, args, kwargs = message
+            caller, request_id, _ = self.invocations.pop(invocation_id)
+            caller.send([50, request_id, {}, args, kwargs])
+
+        elif wamp_code == 49:  # CANCEL
+            _, request_id, options = message
+            for invocation_id, (caller, call_request_id, callee) in (
+                    self.invocations.items()):
+                if (caller, call_request_id) == (peer, request_id):
+                    callee.send([69, invocation_id, options])
+
+        elif wamp_code == 8:  # ERROR, of an INVOCATION
+            _, _, invocation_id, details, uri = message[:5]
+            caller, request_id, _ = self.invocations.pop(invocation_id)
+            caller.send([8, 48, request_id, details, uri])
+
+        elif wamp_code == 32:  # SUBSCRIBE
+            _, request_id, _, topic = message
+            subscription_id = next(self._ids)
+            self.subscriptions.setdefault(topic, []).append(
+                (peer, subscription_id))
+            peer.send([33, request_id, subscription_id])
+
+        elif wamp_code == 16:  # PUBLISH
+            _, request_id, _, topic, args, kwargs = message
+            publication_id = next(self._ids)
+            for subscriber, subscription_id in self.subscriptions.get(
+                    topic, []):
+                if subscriber is not peer:
+                    subscriber.send([
+                        36, subscription_id, publication_id, {}, args,
+                        kwargs,
+                    ])
+
+
+def run(test):
+    """ Run the coroutine function ``test`` with a router to talk to. """
+    async def with_router():
+        router = FakeRouter()
+        await router.start()
+        try:
+            await asyncio.wait_for(test(router, Router(router.port)), 5)
+        finally:
+            await router.stop()
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(with_router())
+    finally:
+        loop.close()
+
+
+class MathService(Client):
+
+    @callee
+    async def add(self, x, y):
+        return x + y
+
+    @callee
+    async def slow_add(self, x, y):
+        await asyncio.sleep(0.1)
+        return x + y
+
+    @callee
+    def multiply(self, x, y):
+        return x * y
+
+
+class SilentService(Client):
+
+    @callee
+    async def never(self):
+        await asyncio.sleep(60)
+
+
+class NewsSubscriber(Client):
+
+    def __init__(self, *args, **kwargs):
+        super(NewsSubscriber, self).__init__(*args, **kwargs)
+        self.received = asyncio.Queue()
+
+    @subscribe(topic="news")
+    async def news_handler(self, *args, **kwargs):
+        await self.received.put((args, kwargs))
+
+
+def test_session():
+    async def test(fake_router, router):
+        client = Client(router=router)
+
+        await client.start()
+        assert client.session.id == fake_router.peers[0].session_id
+
+        await client.stop()
+        assert client.session.id is None
+
+    run(test)
+
+
+def test_call():
+    async def test(fake_router, router):
+        async with MathService(router=router), Client(router=router) as (
+                client):
+            assert await client.call("add", 1, 2) == 3
+            assert await client.rpc.multiply(3, 4) == 12
+
+    run(test)
+
+
+def test_concurrent_calls():
+    async def test(fake_router, router):
+        async with MathService(router=router), Client(router=router) as (
+                client):
+            started = time()
+            results = await asyncio.gather(*(
+                client.rpc.slow_add(i, i) for i in range(100)
+            ))
+
+            assert results == [i * 2 for i in range(100)]
+            # every call is outstanding at once
+            assert time() - started < 1
+
+    run(test)
+
+
+def test_call_unknown_procedure():
+    async def test(fake_router, router):
+        async with Client(router=router) as client:
+            with pytest.raises(WampProtocolError):
+                await client.call("spam")
+
+            with pytest.raises(CallError) as exc_info:
+                await client.rpc.spam()
+            assert exc_info.value.uri == "wamp.error.no_such_procedure"
+
+    run(test)
+
+
+def test_invocation_of_unknown_registration():
+    async def test(fake_router, router):
+        async with MathService(router=router) as service, Client(
+                router=router) as client:
+            registration_map = service.session.registration_map
+            for registration_id, (_, procedure) in list(
+                    registration_map.items()):
+                if procedure == "add":
+                    del registration_map[registration_id]
+
+            with pytest.raises(CallError) as exc_info:
+                await client.rpc.add(1, 2)
+            assert exc_info.value.uri == "wamp.error.no_such_registration"
+
+            # the callee carries on receiving
+            assert await client.rpc.multiply(2, 3) == 6
+
+    run(test)
+
+
+def test_call_deadline_cancels_the_call():
+    async def test(fake_router, router):
+        async with SilentService(router=router) as service, Client(
+                router=router, call_timeout=0.05) as client:
+            started = time()
+            with pytest.raises(asyncio.TimeoutError):
+                await client.call("never")
+            assert time() - started < 1
+
+            [call] = fake_router.received[48]
+            assert call[2] == {"timeout": 50}
+
+            # the callee is interrupted and answers the Dealer
+            await asyncio.sleep(0.05)
+            [cancel] = fake_router.received[49]
+            assert cancel == [49, call[1], {"mode": "kill"}]
+            [error] = fake_router.received[8]
+            assert error[4] == "wamp.error.canceled"
+            assert service.session._invocations == {}
+            assert fake_router.invocations == {}
+
+            # and no more is waited for
+            assert client.session._requests == {}
+
+    run(test)
+
+
+def test_cancelled_call_is_canceled():
+    async def test(fake_router, router):
+        async with SilentService(router=router), Client(
+                router=router, call_timeout=None) as client:
+            call = asyncio.ensure_future(client.rpc.never())
+            await asyncio.sleep(0.05)
+            call.cancel()
+            await asyncio.sleep(0.05)
+
+            [cancel] = fake_router.received[49]
+            assert cancel[2] == {"mode": "kill"}
+            assert fake_router.invocations == {}
+
+    run(test)
+
+
+def test_publish_and_subscribe():
+    async def test(fake_router, router):
+        async with NewsSubscriber(router=router) as subscriber, Client(
+                router=router) as publisher:
+            await publisher.publish(topic="news", message="spam")
+
+            args, kwargs = await subscriber.received.get()
+            assert kwargs['message'] == "spam"
+            assert kwargs['meta']['topic'] == "news"
+
+    run(test)
+
+
+def test_connection_lost_fails_calls():
+    async def test(fake_router, router):
+        async with SilentService(router=router), Client(router=router) as (
+                client):
+            call = asyncio.ensure_future(client.call("never"))
+            await asyncio.sleep(0.05)
+            assert not call.done()
+
+            # the caller's connection
+            fake_router.peers[1].writer.close()
+            with pytest.raises(ConnectionError):
+                await call
+
+    run(test)
@@ -0,0 +1,126 @@
+import importlib
+
+import pytest
+
+from wampy.backends import BACKENDS, get_backend, set_backend
+from wampy.errors import WampyError
+from wampy.transports.writer import Writer
+
+
+@pytest.fixture(params=sorted(BACKENDS))
+def backend(request):
+    if request.param == 'gevent':
+        pytest.importorskip('gevent')
+
+    return importlib.import_module(BACKENDS[request.param])
+
+
+@pytest.fixture
+def restore_backend():
+    backend = get_backend()
+    yield
+    set_backend(backend)
+
+
+def test_spawn_and_wait(backend):
+    thread = backend.spawn(lambda x, y: x + y, 1, y=2)
+
+    assert thread.wait() == 3
+    assert thread.dead
+
+
+def test_wait_raises_what_the_thread_raised(backend):
+    def fail():
+        raise ValueError("spam")
+
+    thread = backend.spawn(fail)
+
+    with pytest.raises(ValueError):
+        thread.wait()
+
+
+def test_kill_before_the_thread_has_started(backend):
+    thread = backend.spawn(backend.sleep, 1)
+    thread.kill()
+
+    if backend.name != 'threading':
+        # threads of the threading backend can't be killed
+        assert thread.dead
+
+
+def test_event(backend):
+    event = backend.Event()
+    backend.spawn(event.send, "ham")
+
+    assert event.wait() == "ham"
+
+
+def test_event_exception(backend):
+    event = backend.Event()
+    backend.spawn(event.send_exception, ValueError("eggs"))
+
+    with pytest.raises(ValueError):
+        event.wait()
+
+
+def test_queue(backend):
+    queue = backend.Queue()
+    backend.spawn(queue.put, "spam")
+
+    assert queue.get(timeout=1) == "spam"
+    assert queue.qsize() == 0
+
+    with pytest.raises(backend.Empty):
+        queue.get(timeout=0.01)
+
+
+def test_timeout(backend):
+    with pytest.raises(backend.Timeout):
+        with backend.Timeout(0.01):
+            backend.sleep(1)
+
+
+def test_timeout_swallowed(backend):
+    with backend.Timeout(0.01, False):
+        backend.Event().wait()
+
+
+def test_timeout_raises_exception(backend):
+    with pytest.raises(ValueError):
+        with backend.Timeout(0.01, ValueError("spam")):
+            backend.Queue().get()
+
+
+def test_timeout_not_expired(backend):
+    with backend.Timeout(1):
+        backend.sleep(0.01)
+
+
+def test_semaphore(backend):
+    semaphore = backend.Semaphore()
+
+    with semaphore:
+        assert not semaphore.acquire(False)
+
+    assert semaphore.acquire(False)
+
+
+def test_unknown_backend():
+    with pytest.raises(WampyError):
+        set_backend("twisted")
+
+
+@pytest.mark.usefixtures('restore_backend')
+def test_writer(backend):
+    set_backend(backend)
+    sent = []
+
+    writer = Writer(sent.append)
+    writer.start()
+
+    writer.write(b'spam')
+    writer.write(b'eggs')
+    writer.flush(timeout=1)
+    writer.stop()
+
+    assert b''.join(bytes(data) for data in sent) == b'spameggs'
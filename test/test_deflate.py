@@ -0,0 +1,93 @@
+import zlib
+
+import pytest
+
+from wampy.errors import WebsocktProtocolError
+from wampy.transports.websocket.deflate import PerMessageDeflate
+
+
+def test_offer():
+    assert PerMessageDeflate().offer() == (
+        'permessage-deflate; client_max_window_bits'
+    )
+
+    extension = PerMessageDeflate(
+        client_max_window_bits=10, server_max_window_bits=11,
+        client_no_context_takeover=True, server_no_context_takeover=True,
+    )
+    assert extension.offer() == (
+        'permessage-deflate; client_no_context_takeover; '
+        'server_no_context_takeover; server_max_window_bits=11; '
+        'client_max_window_bits=10'
+    )
+
+
+def test_invalid_window_bits():
+    with pytest.raises(ValueError):
+        PerMessageDeflate(client_max_window_bits=8)
+
+
+def test_accept():
+    extension = PerMessageDeflate()
+
+    assert extension.accept(
+        'x-webkit-deflate-frame, permessage-deflate; '
+        'client_max_window_bits=12; server_no_context_takeover'
+    )
+
+    assert extension.client_max_window_bits == 12
+    assert extension.server_max_window_bits == 15
+    assert extension.server_no_context_takeover is True
+    assert extension.client_no_context_takeover is False
+
+
+def test_accept_declined():
+    assert not PerMessageDeflate().accept('x-webkit-deflate-frame')
+
+
+def test_accept_unknown_parameter():
+    with pytest.raises(WebsocktProtocolError):
+        PerMessageDeflate().accept('permessage-deflate; spam=1')
+
+
+@pytest.mark.parametrize("no_context_takeover", [True, False])
+def test_compress(no_context_takeover):
+    extension = PerMessageDeflate(
+        client_no_context_takeover=no_context_takeover)
+    # the server side of the conversation
+    decompressor = zlib.decompressobj(-15)
+
+    for i in range(3):
+        message = b'[16,1,{},"com.example.telemetry",[],{"spam":"eggs"}]' * 20
+        compressed = extension.compress(message)
+
+        assert len(compressed) < len(message)
+        assert decompressor.decompress(
+            compressed + PerMessageDeflate.TAIL) == message
+
+
+def test_decompress():
+    extension = PerMessageDeflate()
+    # the server side of the conversation
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+
+    for i in range(3):
+        message = b'[36,1,2,{},[],{"spam":"eggs"}]' * 20
+        compressed = compressor.compress(message)
+        compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        assert extension.decompress(compressed[:-4]) == message
+
+
+def test_decompress_too_big():
+    extension = PerMessageDeflate()
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    message = b'x' * 10000
+    compressed = compressor.compress(message)
+    compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    assert extension.decompress(compressed[:-4], max_size=10000) == message
+
+    extension = PerMessageDeflate()
+    with pytest.raises(WebsocktProtocolError):
+        extension.decompress(compressed[:-4], max_size=9999)
@@ -0,0 +1,459 @@
+import json
+import os
+from struct import pack
+
+import eventlet
+import pytest
+from eventlet.green import socket
+
+from wampy.errors import (
+    ConnectionError, WampProtocolError, WebsocktProtocolError)
+from wampy.messages.publish import Publish
+from wampy.session import Session
+from wampy.transports.websocket.connection import WampWebSocket
+from wampy.transports.websocket import masking
+from wampy.transports.websocket.frames import (
+    ClientFrame, FrameHeader, ServerFrame)
+
+from test.helpers import FakeRouter, FakeSocket
+
+
+def make_raw_frame(body, opcode=0x1, fin=1):
+    length = len(body)
+    first_byte = (fin << 7) | opcode
+
+    if length < 126:
+        header = pack('!BB', first_byte, length)
+    elif length < (1 << 16):
+        header = pack('!BBH', first_byte, 126, length)
+    else:
+        header = pack('!BBQ', first_byte, 127, length)
+
+    return header + body
+
+
+def make_server_frame(message):
+    return make_raw_frame(json.dumps(message).encode('utf-8'))
+
+
+def make_fragmented_server_frames(message, fragment_size):
+    body = json.dumps(message).encode('utf-8')
+    fragments = [
+        body[i:i + fragment_size] for i in range(0, len(body), fragment_size)
+    ]
+
+    frames = []
+    for index, fragment in enumerate(fragments):
+        opcode = 0x1 if index == 0 else 0x0
+        fin = int(index == len(fragments) - 1)
+        frames.append(make_raw_frame(fragment, opcode=opcode, fin=fin))
+
+    return b''.join(frames)
+
+
+def read_client_frames(data):
+    data = bytearray(data)
+    frames = []
+
+    while data:
+        header = FrameHeader.parse(data)
+        mask_key = bytes(data[header.length - 4:header.length])
+        body = masking.mask(
+            mask_key, bytes(data[header.length:header.frame_length]))
+        frames.append((header, body))
+        del data[:header.frame_length]
+
+    return frames
+
+
+def sent(connection):
+    connection.writer.flush()
+    return connection.socket.sent
+
+
+def make_connection(chunks, **kwargs):
+    connection = WampWebSocket(router=FakeRouter(), **kwargs)
+    connection.socket = FakeSocket(chunks)
+    connection.writer.start()
+    return connection
+
+
+@pytest.mark.parametrize("length", [0, 125, 126, 65535, 65536, 100000])
+def test_parse_header(length):
+    message = ["x" * length]
+    frame = make_server_frame(message)
+
+    header = FrameHeader.parse(bytearray(frame))
+
+    assert header.fin == 1
+    assert header.opcode == 0x1
+    assert header.masked == 0
+    assert header.frame_length == len(frame)
+
+
+def test_parse_incomplete_header():
+    frame = bytearray(make_server_frame(["x" * 70000]))
+
+    assert FrameHeader.parse(frame[:1]) is None
+    assert FrameHeader.parse(frame[:9]) is None
+    assert FrameHeader.parse(frame[:10]) is not None
+
+
+def test_server_frame():
+    frame = ServerFrame(bytearray(make_server_frame([50, 1, {}, ["spam"]])))
+
+    assert frame.payload == [50, 1, {}, ["spam"]]
+
+
+def test_read_many_frames_from_one_recv():
+    messages = [[36, 1, 2, {}, [i]] for i in range(10)]
+    burst = b''.join(make_server_frame(message) for message in messages)
+    connection = make_connection([burst])
+
+    for message in messages:
+        assert connection.read_websocket_frame().payload == message
+
+    assert connection.socket.recv_calls == 1
+
+
+def test_read_frame_split_across_recvs():
+    message = [50, 1, {}, ["x" * 200000]]
+    frame = make_server_frame(message)
+    chunks = [frame[:1], frame[1:5]] + [
+        frame[i:i + 65536] for i in range(5, len(frame), 65536)
+    ]
+    connection = make_connection(chunks)
+
+    assert connection.read_websocket_frame().payload == message
+    assert connection.socket.recv_calls == len(chunks)
+
+
+def test_read_frame_when_connection_closed():
+    connection = make_connection([])
+
+    with pytest.raises(WampProtocolError):
+        connection.read_websocket_frame()
+
+
+def mask_bytewise(mask_key, data):
+    mask_key = bytearray(mask_key)
+    return bytes(bytearray(
+        byte ^ mask_key[i % 4] for i, byte in enumerate(bytearray(data))
+    ))
+
+
+@pytest.mark.parametrize("length", [0, 1, 3, 4, 7, 8, 9, 1023, 4097, 70001])
+def test_mask_with_translate(length):
+    mask_key = os.urandom(4)
+    data = os.urandom(length)
+
+    buffer = bytearray(b"header" + data)
+
+    masking.mask_with_translate(mask_key, buffer, offset=6)
+    assert buffer == b"header" + mask_bytewise(mask_key, data)
+
+    masking.mask_with_translate(mask_key, buffer, offset=6)
+    assert buffer == b"header" + data
+
+
+@pytest.mark.skipif(masking.numpy is None, reason="requires NumPy")
+@pytest.mark.parametrize("length", [8, 9, 15, 4096, 4097, 70001])
+def test_mask_with_numpy(length):
+    mask_key = os.urandom(4)
+    data = os.urandom(length)
+
+    buffer = bytearray(b"header" + data)
+
+    masking.mask_with_numpy(mask_key, buffer, offset=6)
+    assert buffer == b"header" + mask_bytewise(mask_key, data)
+
+    masking.mask_with_numpy(mask_key, buffer, offset=6)
+    assert buffer == b"header" + data
+
+
+@pytest.mark.parametrize("length", [0, 125, 126, 65536])
+def test_client_frame(length):
+    body = b"x" * length
+    frame = bytearray(ClientFrame(body).payload)
+
+    header = FrameHeader.parse(frame)
+
+    assert header.fin == 1
+    assert header.masked == 1
+    assert header.payload_length == length
+    assert header.frame_length == len(frame)
+
+    mask_key = bytes(frame[header.length - 4:header.length])
+    assert masking.mask(mask_key, bytes(frame[header.length:])) == body
+
+
+def test_send_text_frame():
+    connection = make_connection([])
+    message = u'[48,1,{},"com.example.greet",["\u00e9t\u00e9"],{}]'
+
+    connection.send_websocket_frame(message)
+
+    [(header, body)] = read_client_frames(sent(connection))
+
+    assert header.fin == 1
+    assert body.decode('utf-8') == message
+
+
+def test_read_fragmented_message():
+    message = [50, 1, {}, ["x" * 5000]]
+    event = [36, 1, 2, {}, ["spam"]]
+    burst = make_fragmented_server_frames(message, 1000)
+    burst += make_server_frame(event)
+    connection = make_connection([burst])
+
+    assert connection.read_websocket_frame().payload == message
+    assert connection.read_websocket_frame().payload == event
+
+
+def test_read_fragmented_message_too_big():
+    message = [50, 1, {}, ["x" * 5000]]
+    burst = make_fragmented_server_frames(message, 1000)
+    connection = make_connection([burst], max_message_size=4000)
+
+    with pytest.raises(WebsocktProtocolError):
+        connection.read_websocket_frame()
+
+
+def test_read_message_too_big_rejected_from_header():
+    # only the header of the frame ever arrives
+    header = pack('!BBQ', 0x81, 127, 2 ** 40)
+    connection = make_connection([header], max_message_size=4000)
+
+    with pytest.raises(WebsocktProtocolError):
+        connection.read_websocket_frame()
+
+
+def test_read_invalid_payload_length():
+    header = pack('!BBQ', 0x81, 127, 2 ** 63)
+
+    with pytest.raises(WebsocktProtocolError):
+        FrameHeader.parse(bytearray(header))
+
+
+@pytest.mark.parametrize("fragment_size", [None, 3000])
+def test_read_large_message(fragment_size):
+    message = [50, 1, {}, [u"\u00e9t\u00e9" * 2000]]
+    if fragment_size:
+        burst = make_fragmented_server_frames(message, fragment_size)
+    else:
+        burst = make_server_frame(message)
+    event = make_server_frame([36, 1, 2, {}, ["spam"]])
+    # the start of the large frame arrives in the receive buffer, and
+    # the rest is received into place
+    chunks = [burst[:500], burst[500:-100], burst[-100:], event]
+    connection = make_connection(chunks)
+    connection.large_frame_size = 1000
+
+    assert connection.read_websocket_frame().payload == message
+    assert connection.read_websocket_frame().payload == [
+        36, 1, 2, {}, ["spam"]]
+
+
+def test_read_unexpected_continuation_frame():
+    connection = make_connection([make_raw_frame(b'[]', opcode=0x0)])
+
+    with pytest.raises(WebsocktProtocolError):
+        connection.read_websocket_frame()
+
+
+def test_send_fragmented_message():
+    connection = make_connection([], fragment_size=1000)
+    message = b'[48,1,{},"com.example.echo",["' + b'x' * 5000 + b'"],{}]'
+
+    connection.send_websocket_frame(message)
+
+    frames = read_client_frames(sent(connection))
+    assert len(frames) == 6
+    assert [header.opcode for header, _ in frames] == [1, 0, 0, 0, 0, 0]
+    assert [header.fin for header, _ in frames] == [0, 0, 0, 0, 0, 1]
+    assert b''.join(body for _, body in frames) == message
+
+
+def test_ping_is_answered_with_pong():
+    message = [36, 1, 2, {}, ["spam"]]
+    burst = make_raw_frame(b'are you there?', opcode=0x9)
+    burst += make_server_frame(message)
+    connection = make_connection([burst])
+
+    assert connection.read_websocket_frame().payload == message
+
+    [(header, body)] = read_client_frames(sent(connection))
+    assert header.opcode == 0xa
+    assert body == b'are you there?'
+
+
+def test_pong_measures_round_trip_time():
+    connection = make_connection([])
+    connection.ping()
+
+    [(_, body)] = read_client_frames(sent(connection))
+    message = [36, 1, 2, {}, ["spam"]]
+    burst = make_raw_frame(body, opcode=0xa) + make_server_frame(message)
+    connection.socket.chunks.append(burst)
+    connection.missed_pongs = 1
+
+    assert connection.read_websocket_frame().payload == message
+    assert connection.rtt >= 0
+    assert connection.missed_pongs == 0
+
+
+def test_close_is_answered_and_ends_the_connection():
+    close = make_raw_frame(pack('!H', 1001) + b'going away', opcode=0x8)
+    connection = make_connection([close])
+
+    with pytest.raises(ConnectionError) as exc_info:
+        connection.read_websocket_frame()
+
+    assert "1001 going away" in str(exc_info.value)
+
+    [(header, body)] = read_client_frames(sent(connection))
+    assert header.opcode == 0x8
+    assert body == pack('!H', 1001)
+
+
+def test_keepalive_gives_up_on_unresponsive_peer():
+    client_socket, server_socket = socket.socketpair()
+    connection = WampWebSocket(
+        router=FakeRouter(), ping_interval=0.01, max_missed_pongs=2)
+    connection.socket = client_socket
+    connection.writer.start()
+    keepalive = eventlet.spawn(connection._keepalive)
+
+    try:
+        with eventlet.Timeout(1):
+            with pytest.raises(WampProtocolError):
+                connection.read_websocket_frame()
+    finally:
+        keepalive.kill()
+        connection.writer.stop()
+        client_socket.close()
+
+    pings = read_client_frames(server_socket.recv(1024))
+    assert [header.opcode for header, _ in pings] == [0x9, 0x9]
+
+    server_socket.close()
+
+
+HANDSHAKE_RESPONSE = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Server: Crossbar/0.15.0\r\n"
+    b"Upgrade: WebSocket\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Sec-WebSocket-Protocol: wamp.2.json\r\n"
+    b"Sec-WebSocket-Accept: 9bQuJ8W0sJPf9o0qPAmzcXxzRDs=\r\n"
+    b"\r\n"
+)
+
+
+def test_handshake_response_in_one_recv():
+    message = [2, 1, {"roles": {"broker": {}}}]
+    connection = make_connection(
+        [HANDSHAKE_RESPONSE + make_server_frame(message)])
+
+    connection._upgrade()
+
+    assert connection.status == 101
+    assert connection.headers['upgrade'] == 'websocket'
+    assert connection.headers['sec-websocket-protocol'] == 'wamp.2.json'
+    assert connection.socket.sent.startswith(b"GET /")
+
+    # the frame that arrived with the headers was kept for the frame reader
+    assert connection.read_websocket_frame().payload == message
+    assert connection.socket.recv_calls == 1
+
+
+def test_handshake_response_split_across_recvs():
+    chunks = [
+        HANDSHAKE_RESPONSE[i:i + 7]
+        for i in range(0, len(HANDSHAKE_RESPONSE), 7)
+    ]
+    connection = make_connection(chunks)
+
+    connection._upgrade()
+
+    assert connection.status == 101
+    assert connection.headers['connection'] == 'upgrade'
+    assert connection._buffer == b''
+
+
+def test_handshake_connection_closed():
+    connection = make_connection([HANDSHAKE_RESPONSE[:40]])
+
+    with pytest.raises(ConnectionError):
+        connection._upgrade()
+
+
+def test_send_binary_frame():
+    connection = make_connection([])
+    message = b'\x95\x30\x01\x80\xa4spam\x90'
+
+    connection.send_websocket_frame(memoryview(message), binary=True)
+
+    [(header, body)] = read_client_frames(sent(connection))
+
+    assert header.opcode == 0x2
+    assert body == message
+
+
+def test_send_fragmented_binary_message():
+    connection = make_connection([], fragment_size=100)
+    message = os.urandom(250)
+
+    connection.send_websocket_frame(message, binary=True)
+
+    frames = read_client_frames(sent(connection))
+    assert [header.opcode for header, _ in frames] == [2, 0, 0]
+    assert b''.join(body for _, body in frames) == message
+
+
+def test_read_binary_message():
+    message = os.urandom(3000)
+    burst = make_raw_frame(message[:1000], opcode=0x2, fin=0)
+    burst += make_raw_frame(message[1000:], opcode=0x0)
+    connection = make_connection([burst])
+
+    frame = connection.read_websocket_frame()
+
+    assert frame.is_binary
+    assert isinstance(frame.data, memoryview)
+    assert frame.data.tobytes() == message
+
+
+def test_session_send_bytes():
+    connection = make_connection([])
+    session = Session(client=None, router=FakeRouter(), transport=connection)
+    session._connection = connection
+    message = Publish(topic="foo", options={}, message=u"\u00e9t\u00e9")
+    serialized = message.serialize().encode('utf-8')
+
+    session.send_bytes(memoryview(serialized))
+
+    [(header, body)] = read_client_frames(sent(connection))
+    assert header.opcode == 0x1
+    assert body == serialized
+
+    with pytest.raises(TypeError):
+        session.send_bytes(u"[16,1,{},\"foo\"]")
+
+
+def test_connect_over_unix_socket(tmpdir):
+    path = str(tmpdir.join('router.sock'))
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(1)
+
+    connection = WampWebSocket(router=FakeRouter(url="ws+unix://" + path))
+    connection._connect()
+
+    try:
+        assert connection.socket.family == socket.AF_UNIX
+        assert connection.socket.getpeername() == path
+        assert "Host: localhost" in connection._get_handshake_headers()
+    finally:
+        connection.socket.close()
+        server.close()
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what importing wampy may cost, in microseconds, on top of the standard
+# library modules that any application has imported anyway
+IMPORT_TIME_BUDGET = 20000
+
+# imported only once they are used
+HEAVY_MODULES = (
+    'eventlet', 'gevent', 'wampy.peers', 'wampy.session',
+    'wampy.transports', 'wampy.messages',
+)
+
+
+def run_python(*args):
+    process = subprocess.Popen(
+        [sys.executable] + list(args), cwd=ROOT,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    out, err = process.communicate()
+    assert process.returncode == 0, err
+    return out.decode('utf-8'), err.decode('utf-8')
+
+
+def test_import_loads_no_heavy_modules():
+    out, _ = run_python(
+        '-c', 'import sys, wampy; print("\\n".join(sys.modules))')
+
+    imported = [
+        module for module in out.split()
+        if module.startswith(HEAVY_MODULES)
+    ]
+    assert imported == []
+
+
+def test_import_patches_nothing():
+    out, _ = run_python(
+        '-c',
+        'import socket, threading; '
+        'patched = socket.socket, threading.Thread; '
+        'import wampy; '
+        'print(patched == (socket.socket, threading.Thread))',
+    )
+
+    assert out.strip() == 'True'
+
+
+def test_client_is_imported_on_first_use():
+    out, _ = run_python(
+        '-c',
+        'import sys, wampy; '
+        'loaded = "wampy.peers.clients" in sys.modules; '
+        'print("%s %s" % (loaded, wampy.Client.__module__))',
+    )
+
+    assert out.split() == ['False', 'wampy.peers.clients']
+
+
+@pytest.mark.skipif(
+    sys.version_info < (3, 7), reason="requires python -X importtime")
+def test_import_time_budget():
+    _, err = run_python(
+        '-X', 'importtime', '-c',
+        'import importlib, logging, sys, types; import wampy',
+    )
+
+    # "import time: self [us] | cumulative | imported package", indented
+    # by the depth of the import
+    [cumulative] = [
+        int(line.split('|')[1])
+        for line in err.splitlines()
+        if line.startswith('import time:') and
+        line.split('|')[-1].rstrip() == ' wampy'
+    ]
+    assert cumulative < IMPORT_TIME_BUDGET
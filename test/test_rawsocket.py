@@ -0,0 +1,114 @@
+import json
+from struct import pack
+
+import pytest
+
+from wampy.errors import WampProtocolError, WampyError
+from wampy.transports.rawsocket.connection import RawSocket
+
+from test.helpers import FakeRouter, FakeSocket
+
+
+def make_message(message, message_type=0):
+    body = json.dumps(message).encode('utf-8')
+    return pack('!I', (message_type << 24) | len(body)) + body
+
+
+def make_connection(chunks, **kwargs):
+    connection = RawSocket(
+        router=FakeRouter(url="rs://localhost:8080"), **kwargs)
+    connection.socket = FakeSocket(chunks)
+    connection.writer.start()
+    return connection
+
+
+@pytest.mark.parametrize("max_message_size, octet", [
+    (None, 0xf1), (512, 0x01), (1000, 0x11), (1024, 0x11), (1025, 0x21),
+])
+def test_handshake(max_message_size, octet):
+    connection = make_connection(
+        [b'\x7f\x71\x00\x00'], max_message_size=max_message_size)
+
+    connection._handshake()
+
+    assert connection.socket.sent == bytearray([0x7f, octet, 0, 0])
+    assert connection.max_send_size == 2 ** 16
+
+
+def test_handshake_refused():
+    # the router does not speak the serializer asked for
+    connection = make_connection([b'\x7f\x10\x00\x00'])
+
+    with pytest.raises(WampProtocolError) as exc_info:
+        connection._handshake()
+
+    assert "serializer unsupported" in str(exc_info.value)
+
+
+def test_max_message_size_too_big():
+    with pytest.raises(WampyError):
+        make_connection([], max_message_size=2 ** 24 + 1)
+
+
+def test_read_messages():
+    messages = [[36, 1, 2, {}, [i]] for i in range(10)]
+    # the first message arrives with the end of the handshake
+    burst = b'\x7f\xf1\x00\x00' + b''.join(
+        make_message(message) for message in messages)
+    connection = make_connection([burst[:9], burst[9:]])
+
+    connection._handshake()
+
+    for message in messages:
+        assert connection.receive().payload == message
+
+    assert connection.socket.recv_calls == 2
+
+
+def test_send_message():
+    connection = make_connection([])
+    message = u'[48,1,{},"com.example.greet",["\u00e9t\u00e9"],{}]'
+    encoded = message.encode('utf-8')
+
+    connection.send(message)
+    connection.writer.flush()
+
+    assert connection.socket.sent == pack('!I', len(encoded)) + encoded
+
+
+def test_send_message_too_big():
+    connection = make_connection([])
+    connection.max_send_size = 512
+
+    with pytest.raises(WampProtocolError):
+        connection.send(b'x' * 513)
+
+
+def test_ping_is_answered_with_pong():
+    message = [36, 1, 2, {}, ["spam"]]
+    ping = pack('!I', (1 << 24) | 4) + b'ping'
+    connection = make_connection([ping + make_message(message)])
+
+    assert connection.receive().payload == message
+    connection.writer.flush()
+    assert connection.socket.sent == pack('!I', (2 << 24) | 4) + b'ping'
+
+
+def test_read_large_message():
+    message = [50, 1, {}, [u"\u00e9t\u00e9" * 2000]]
+    event = [36, 1, 2, {}, ["spam"]]
+    burst = make_message(message)
+    chunks = [burst[:500], burst[500:-100], burst[-100:], make_message(event)]
+    connection = make_connection(chunks)
+    connection.large_message_size = 1000
+
+    assert connection.receive().payload == message
+    assert connection.receive().payload == event
+
+
+def test_read_message_too_big():
+    connection = make_connection(
+        [make_message(["x" * 1000])], max_message_size=512)
+
+    with pytest.raises(WampProtocolError):
+        connection.receive()
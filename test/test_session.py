@@ -0,0 +1,730 @@
+import itertools
+import json
+import time
+
+import eventlet
+import pytest
+from eventlet.queue import Queue
+
+from wampy.constants import MAX_REQUEST_ID
+from wampy.errors import (
+    CallCanceledError, ConnectionError, WampProtocolError, WampyError)
+from wampy.futures import Condition, Future
+from wampy.messages import Interrupt, Invocation, Message
+from wampy.messages.call import Call
+from wampy.messages.handlers.default import MessageHandler
+from wampy.messages.subscribe import Subscribe
+from wampy.roles.caller import call_many, call_stream, send_call
+from wampy.session import Session
+
+from test.helpers import FakeRouter
+
+
+class FakeFrame(object):
+
+    def __init__(self, payload=None, data=None):
+        self.payload = payload
+        self.data = data
+        self.is_binary = data is not None
+
+
+class FakeTransport(object):
+    """ Receives whatever messages a test replies with. """
+
+    url = "ws://localhost:8080"
+
+    def __init__(self):
+        self.sent = []
+        self.sent_binary = []
+        self.replies = Queue()
+
+    def connect(self):
+        pass
+
+    def disconnect(self):
+        self.replies.put(None)
+
+    def send(self, message, binary=False):
+        if binary:
+            self.sent_binary.append(bytes(message))
+        else:
+            self.sent.append(json.loads(message))
+
+    def receive(self):
+        message = self.replies.get()
+        if message is None:
+            raise ConnectionError("connection closed")
+        if isinstance(message, FakeFrame):
+            return message
+        return FakeFrame(message)
+
+    def reply(self, message):
+        self.replies.put(message)
+
+
+class ReversedJson(object):
+    """ A binary serializer, of JSON text reversed. """
+
+    @staticmethod
+    def dumps(message):
+        return json.dumps(message).encode('utf-8')[::-1]
+
+    @staticmethod
+    def loads(data):
+        return json.loads(bytes(bytearray(data))[::-1].decode('utf-8'))
+
+
+class FakeClient(object):
+    roles = {}
+
+    def __init__(self):
+        self.processed = []
+        self.session = None
+
+    def process_message(self, message):
+        self.processed.append(message)
+
+
+@pytest.fixture
+def session():
+    router = FakeRouter()
+    router.host = "localhost"
+
+    session = Session(
+        client=FakeClient(), router=router, transport=FakeTransport())
+    session.client.session = session
+    session._connect()
+
+    yield session
+
+    if session._connection is not None:
+        session._disconnet()
+
+
+def result(call_request_id, value):
+    return [Message.RESULT, call_request_id, {}, [value]]
+
+
+def test_request_ids_are_sequential(session):
+    call = Call(procedure="foo")
+    assert call.request_id is None
+
+    session.request(call)
+    session.send_message(Subscribe(topic="bar"))
+    session.request(Call(procedure="baz"))
+
+    assert [message[1] for message in session.transport.sent] == [1, 2, 3]
+    assert call.request_id == 1
+
+
+def test_request_ids_wrap_around(session):
+    session._request_ids = itertools.count(MAX_REQUEST_ID - 1)
+
+    assert [session.next_request_id() for _ in range(3)] == [
+        MAX_REQUEST_ID - 1, MAX_REQUEST_ID, 1]
+
+
+def test_replies_resolve_their_own_requests(session):
+    first = session.request(Call(procedure="foo"))
+    second = session.request(Call(procedure="bar"))
+
+    session.transport.reply(result(second.request_id, "bar"))
+    session.transport.reply(result(first.request_id, "foo"))
+
+    assert first.result(timeout=1)[3] == ["foo"]
+    assert second.result(timeout=1)[3] == ["bar"]
+    assert session.client.processed == []
+
+
+def test_concurrent_calls(session):
+    def call(number):
+        future = session.request(Call(procedure="echo", args=[number]))
+        return future.result(timeout=1)[3][0]
+
+    callers = [eventlet.spawn(call, number) for number in range(100)]
+    eventlet.sleep()
+
+    # answer in the reverse order
+    for request in reversed(session.transport.sent):
+        _, request_id, _, _, args, _ = request
+        session.transport.reply(result(request_id, args[0]))
+
+    assert [caller.wait() for caller in callers] == list(range(100))
+
+
+def test_error_resolves_its_request(session):
+    future = session.request(Call(procedure="spam"))
+    error = [
+        Message.ERROR, Message.CALL, future.request_id, {},
+        "wamp.error.no_such_procedure",
+    ]
+    session.transport.reply(error)
+
+    assert future.result(timeout=1) == error
+
+
+def test_late_reply_is_dropped(session):
+    late = session.request(Call(procedure="slow"), timeout=0.01)
+
+    with pytest.raises(WampProtocolError):
+        late.result()
+
+    session.transport.reply(result(late.request_id, "too late"))
+    future = session.request(Call(procedure="fast"))
+    session.transport.reply(result(future.request_id, "on time"))
+
+    assert future.result(timeout=1)[3] == ["on time"]
+    # handled as any unexpected message would be
+    assert session.client.processed == [result(late.request_id, "too late")]
+
+
+def test_lost_connection_fails_pending_requests(session):
+    future = session.request(Call(procedure="foo"))
+    session.transport.disconnect()
+
+    with pytest.raises(ConnectionError):
+        future.result(timeout=1)
+
+    assert session._pending == {}
+
+
+def test_ending_session_fails_pending_requests(session):
+    future = session.request(Call(procedure="foo"))
+    session._disconnet()
+
+    with pytest.raises(ConnectionError):
+        future.result(timeout=1)
+
+
+def test_request_that_cannot_be_sent(session):
+    attempts = []
+
+    def send(message):
+        attempts.append(json.loads(message))
+        raise ConnectionError("connection closed")
+
+    session.transport.send = send
+    session.router_details = {
+        'roles': {'dealer': {'features': {'call_canceling': True}}}}
+
+    with pytest.raises(ConnectionError):
+        session.request(Call(procedure="foo"), timeout=1)
+
+    # the CALL, and no CANCEL of it
+    assert [message[0] for message in attempts] == [Message.CALL]
+    assert session._pending == {}
+    assert session._deadlines == []
+
+
+def test_failure_to_process_a_message_fails_pending_requests(session):
+    def process_message(message):
+        raise ValueError(message)
+
+    session.client.process_message = process_message
+    future = session.request(Call(procedure="foo"))
+    session.transport.reply([Message.EVENT, 1, 2, {}])
+
+    with pytest.raises(ConnectionError):
+        future.result(timeout=1)
+
+    assert not session._listening
+
+
+def test_binary_request(session):
+    session.binary_serializer = ReversedJson
+    future = session.request(Call(procedure="foo"), binary=True)
+
+    [data] = session.transport.sent_binary
+    assert ReversedJson.loads(data)[:4] == [
+        Message.CALL, future.request_id, {}, "foo"]
+    assert future.request_id in session._pending
+
+    session.transport.reply(FakeFrame(data=memoryview(
+        ReversedJson.dumps(result(future.request_id, "spam")))))
+
+    assert future.result(timeout=1)[3] == ["spam"]
+
+
+def test_binary_message_without_a_serializer():
+    with pytest.raises(WampyError):
+        Session(
+            client=FakeClient(), router=None, transport=FakeTransport(),
+        ).send_message(Call(procedure="foo"), binary=True)
+
+
+def test_binary_frame_without_a_serializer_is_dropped(session):
+    future = session.request(Call(procedure="foo"))
+    session.transport.reply(FakeFrame(data=memoryview(b"\x93\x01\x02")))
+    session.transport.reply(result(future.request_id, "spam"))
+
+    assert future.result(timeout=1)[3] == ["spam"]
+    assert session._listening
+    assert session._received == 1
+
+
+def test_future_abandoned():
+    abandoned = []
+    future = Future(
+        1, on_abandon=abandoned.append, deadline=time.time() + 0.02)
+
+    # waiting less than until the deadline gives up on nothing
+    with pytest.raises(WampProtocolError):
+        future.result(timeout=0.01)
+
+    assert not future.done()
+    assert abandoned == []
+
+    with pytest.raises(WampProtocolError):
+        future.result()
+
+    assert future.done()
+    assert abandoned == [future]
+
+    # the reply has been given up on
+    future.set_result("spam")
+    with pytest.raises(WampProtocolError):
+        future.result()
+
+
+def test_wait_for_a_processed_message(session):
+    def welcomed():
+        return session.client.processed
+
+    waiter = eventlet.spawn(session.wait_for, welcomed, 1)
+    eventlet.sleep()
+    assert not waiter.dead
+
+    session.transport.reply([Message.WELCOME, 1, {}])
+
+    assert waiter.wait() == [[Message.WELCOME, 1, {}]]
+
+
+def test_wait_for_times_out(session):
+    assert session.wait_for(lambda: False, timeout=0.01) is False
+
+
+def test_recv_message(session):
+    receiver = eventlet.spawn(session.recv_message, 1)
+    eventlet.sleep()
+
+    session.transport.reply([Message.WELCOME, 1, {}])
+
+    assert receiver.wait() == [Message.WELCOME, 1, {}]
+
+
+def test_recv_message_returns_the_first_message_to_arrive(session):
+    receiver = eventlet.spawn(session.recv_message, 1)
+    eventlet.sleep()
+
+    session.transport.reply([Message.GOODBYE, {}, "wamp.close.normal"])
+    session.transport.reply([Message.WELCOME, 1, {}])
+    eventlet.sleep(0.01)
+
+    assert session._received == 2
+    assert receiver.wait() == [Message.GOODBYE, {}, "wamp.close.normal"]
+
+
+def test_recv_message_on_lost_connection(session):
+    receiver = eventlet.spawn(session.recv_message, 5)
+    eventlet.sleep()
+
+    started = time.time()
+    session.transport.disconnect()
+
+    with pytest.raises(ConnectionError):
+        receiver.wait()
+
+    assert time.time() - started < 1
+
+
+def test_end_returns_once_goodbye_is_echoed(session):
+    def echo_goodbye():
+        eventlet.sleep()
+        session.transport.reply([Message.GOODBYE, {}, "wamp.close.normal"])
+
+    eventlet.spawn(echo_goodbye)
+
+    started = time.time()
+    session.end()
+
+    assert session.transport.sent[-1][0] == Message.GOODBYE
+    assert time.time() - started < 1
+
+
+def test_condition_waiters_are_woken():
+    condition = Condition()
+    state = []
+
+    def wait_for_state(number):
+        return condition.wait_for(lambda: len(state) >= number, timeout=1)
+
+    waiters = [eventlet.spawn(wait_for_state, number) for number in (1, 2)]
+    eventlet.sleep()
+
+    state.append(1)
+    condition.notify_all()
+    assert waiters[0].wait() is True
+    assert not waiters[1].dead
+
+    state.append(2)
+    condition.notify_all()
+    assert waiters[1].wait() is True
+
+
+def test_waiting_less_than_the_deadline_leaves_the_call_pending(session):
+    session.router_details = {
+        "roles": {"dealer": {"features": {"call_canceling": True}}}}
+    future = session.request(Call(procedure="slow"), timeout=5)
+
+    with pytest.raises(WampProtocolError):
+        future.result(timeout=0.01)
+
+    assert session._pending == {future.request_id: future}
+    # nor has it been canceled
+    assert len(session.transport.sent) == 1
+
+    session.transport.reply(result(future.request_id, "in time"))
+    assert future.result()[3] == ["in time"]
+
+
+def test_future_done_callbacks():
+    done = []
+    future = Future(1)
+    future.add_done_callback(done.append)
+
+    assert done == []
+
+    future.set_result("spam")
+    future.add_done_callback(done.append)
+
+    assert done == [future, future]
+
+
+def test_requests_expire_at_their_deadline(session):
+    expired = session.request(Call(procedure="slow"), timeout=0.01)
+    unbounded = session.request(Call(procedure="slow"))
+    eventlet.sleep(0.02)
+
+    # whatever arrives next sweeps the expired requests away
+    session.transport.reply([Message.WELCOME, 1, {}])
+    eventlet.sleep(0.01)
+
+    assert expired.done()
+    assert list(session._pending) == [unbounded.request_id]
+
+    session.transport.reply(result(expired.request_id, "too late"))
+    with pytest.raises(WampProtocolError):
+        expired.result()
+
+
+def test_call_sends_its_timeout_to_the_dealer(session):
+    session.client.call_timeout = 0.05
+
+    send_call(session.client, "foo", timeout=300)
+    send_call(session.client, "bar")
+
+    assert [message[2] for message in session.transport.sent] == [
+        {"timeout": 300000}, {"timeout": 50}]
+
+
+def test_cancel_call(session):
+    future = session.request(Call(procedure="slow"))
+
+    assert session.cancel(future) is True
+    assert session.cancel(future) is False
+
+    with pytest.raises(CallCanceledError):
+        future.result()
+
+    assert session._pending == {}
+    # the Router hasn't announced it supports call canceling
+    assert [message[0] for message in session.transport.sent] == [
+        Message.CALL]
+
+
+def test_cancel_call_with_the_dealer(session):
+    session.router_details = {
+        "roles": {"dealer": {"features": {"call_canceling": True}}}}
+
+    canceled = session.request(Call(procedure="slow"))
+    expired = session.request(Call(procedure="slow"), timeout=0.01)
+
+    session.cancel(canceled, mode="skip")
+    with pytest.raises(WampProtocolError):
+        expired.result()
+
+    assert session.transport.sent[2:] == [
+        [Message.CANCEL, canceled.request_id, {"mode": "skip"}],
+        [Message.CANCEL, expired.request_id, {"mode": "kill"}],
+    ]
+
+
+class FakeCallee(object):
+
+    concurrent_invocations = True
+
+    def __init__(self, session):
+        self.session = session
+        self.registration_map = {1: "slow_square"}
+        self.finished = []
+
+    def slow_square(self, number, delay):
+        eventlet.sleep(delay)
+        self.finished.append(number)
+        return number * number
+
+    def count_to(self, number):
+        for count in range(1, number + 1):
+            yield count
+
+
+def invoke(callee, request_id, *args, **details):
+    message = [Message.INVOCATION, request_id, 1, details, list(args)]
+    Invocation(*message).process(message, callee)
+
+
+def test_invocation_yields_its_result(session):
+    callee = FakeCallee(session)
+
+    invoke(callee, 10, 3, 0)
+    eventlet.sleep(0.01)
+
+    [yield_] = session.transport.sent
+    assert yield_[:2] == [Message.YIELD, 10]
+    assert yield_[3] == [9]
+    assert session.invocations == {}
+
+
+def test_invocation_of_unknown_registration(session):
+    callee = FakeCallee(session)
+    callee.registration_map = {}
+
+    invoke(callee, 10, 3, 0)
+
+    assert session.transport.sent == [[
+        Message.ERROR, Message.INVOCATION, 10, {},
+        "wamp.error.no_such_registration",
+    ]]
+    assert session.invocations == {}
+
+
+def test_interrupt_kills_the_invocation(session):
+    callee = FakeCallee(session)
+
+    invoke(callee, 10, 3, 1)
+    invoke(callee, 11, 4, 0)
+    eventlet.sleep(0.01)
+
+    message = [Message.INTERRUPT, 10, {"mode": "kill"}]
+    Interrupt(*message).process(message, callee)
+    eventlet.sleep(0.01)
+
+    assert callee.finished == [4]
+    assert session.invocations == {}
+    assert [message[:2] for message in session.transport.sent] == [
+        [Message.YIELD, 11], [Message.ERROR, Message.INVOCATION]]
+    assert session.transport.sent[1][2:] == [10, {}, "wamp.error.canceled"]
+
+    # too late for the invocation that's done: nothing more is sent
+    message = [Message.INTERRUPT, 11, {"mode": "kill"}]
+    Interrupt(*message).process(message, callee)
+    assert len(session.transport.sent) == 2
+
+
+def test_invocations_one_at_a_time(session):
+    callee = FakeCallee(session)
+    callee.concurrent_invocations = False
+
+    invoke(callee, 10, 3, 0.01)
+    invoke(callee, 11, 4, 0)
+
+    # each is done before the next is invoked
+    assert callee.finished == [3, 4]
+    assert [message[:2] for message in session.transport.sent] == [
+        [Message.YIELD, 10], [Message.YIELD, 11]]
+    assert session.invocations == {}
+
+
+def test_interrupt_without_a_handler_for_it(session):
+    handler = MessageHandler(
+        client=FakeCallee(session), messages_to_handle=[Invocation])
+
+    handler([Message.INTERRUPT, 10, {"mode": "kill"}])
+
+    with pytest.raises(WampyError):
+        handler([Message.EVENT, 1, 2, {}])
+
+
+def progress(call_request_id, value):
+    return [Message.RESULT, call_request_id, {"progress": True}, [value]]
+
+
+def test_progressive_results(session):
+    received = []
+    future = session.request(
+        Call(procedure="count"), on_progress=received.append)
+
+    session.transport.reply(progress(future.request_id, 1))
+    session.transport.reply(progress(future.request_id, 2))
+    session.transport.reply([Message.RESULT, future.request_id, {}])
+
+    assert future.result(timeout=1) == [Message.RESULT, future.request_id, {}]
+    assert received == [
+        progress(future.request_id, 1), progress(future.request_id, 2)]
+    assert session._pending == {}
+
+
+def test_call_stream(session):
+    # streams have no deadline unless given one
+    session.client.call_timeout = 5
+    stream = call_stream(session.client, "count", buffer_size=5)
+    next_result = eventlet.spawn(next, stream)
+    eventlet.sleep()
+
+    [call] = session.transport.sent
+    assert call[2] == {"receive_progress": True}
+    assert session._deadlines == []
+
+    for count in range(1, 6):
+        session.transport.reply(progress(call[1], count))
+    session.transport.reply(result(call[1], 6))
+    eventlet.sleep(0.01)
+
+    assert session._received == 6
+
+    assert next_result.wait() == 1
+    assert list(stream) == [2, 3, 4, 5, 6]
+
+
+def test_call_stream_blocks_on_overflow(session):
+    stream = call_stream(session.client, "count", buffer_size=2)
+    next_result = eventlet.spawn(next, stream)
+    eventlet.sleep()
+
+    [call] = session.transport.sent
+    for count in range(1, 5):
+        session.transport.reply(progress(call[1], count))
+    session.transport.reply(result(call[1], 5))
+    eventlet.sleep(0.01)
+
+    # one consumed and two buffered: the fourth waits for room
+    assert next_result.wait() == 1
+    assert session._received == 3
+
+    assert list(stream) == [2, 3, 4, 5]
+    assert session._received == 5
+
+
+def test_call_stream_drops_the_oldest_on_overflow(session):
+    stream = call_stream(
+        session.client, "count", buffer_size=2, overflow="drop")
+    next_result = eventlet.spawn(next, stream)
+    eventlet.sleep()
+
+    [call] = session.transport.sent
+    for count in range(1, 7):
+        session.transport.reply(progress(call[1], count))
+    session.transport.reply(result(call[1], 7))
+    eventlet.sleep(0.01)
+
+    # the listener never waits for the results to be consumed
+    assert session._received == 7
+
+    results = [next_result.wait()] + list(stream)
+    assert len(results) < 7
+    assert results[-3:] == [5, 6, 7]
+
+
+def test_call_stream_canceled_on_overflow(session):
+    stream = call_stream(
+        session.client, "count", buffer_size=2, overflow="raise")
+    next_result = eventlet.spawn(next, stream)
+    eventlet.sleep()
+
+    [call] = session.transport.sent
+    for count in range(1, 5):
+        session.transport.reply(progress(call[1], count))
+    eventlet.sleep(0.01)
+
+    assert session._received == 4
+    assert session._pending == {}
+
+    # those buffered, then the error
+    assert [next_result.wait(), next(stream)] == [1, 2]
+    with pytest.raises(WampProtocolError):
+        next(stream)
+
+
+def test_call_stream_unknown_overflow_policy(session):
+    with pytest.raises(WampyError):
+        next(call_stream(session.client, "count", overflow="spill"))
+
+
+def test_call_stream_deadline(session):
+    started = time.time()
+
+    with pytest.raises(WampProtocolError):
+        list(call_stream(session.client, "count", timeout=0.05))
+
+    assert time.time() - started < 1
+    assert session._pending == {}
+
+
+def test_call_stream_canceled_when_closed(session):
+    stream = call_stream(session.client, "count", buffer_size=1)
+    eventlet.spawn(next, stream)
+    eventlet.sleep()
+
+    [call] = session.transport.sent
+    session.transport.reply(progress(call[1], 1))
+    eventlet.sleep(0.01)
+
+    stream.close()
+    eventlet.sleep(0.01)
+
+    assert session._pending == {}
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_call_many_deadline(session, ordered):
+    session.client.call_timeout = 0.05
+    session.client.call_async = lambda procedure, *args: send_call(
+        session.client, procedure, args)
+    started = time.time()
+
+    with pytest.raises(WampProtocolError):
+        list(call_many(session.client, "square", range(3), ordered=ordered))
+
+    assert time.time() - started < 1
+    assert session._pending == {}
+
+
+def test_call_many_timeout_abandons_calls_in_flight(session):
+    session.client.call_timeout = None
+    session.client.call_async = lambda procedure, *args: send_call(
+        session.client, procedure, args)
+
+    with pytest.raises(WampProtocolError):
+        list(call_many(session.client, "square", range(3), timeout=0.01))
+
+    assert len(session.transport.sent) == 3
+    assert session._pending == {}
+
+
+def test_invocation_streams_its_results(session):
+    callee = FakeCallee(session)
+    callee.registration_map = {1: "count_to"}
+
+    invoke(callee, 10, 3, receive_progress=True)
+    invoke(callee, 11, 3)
+    eventlet.sleep(0.01)
+
+    yields = session.transport.sent
+    assert [message[2:4] for message in yields[:3]] == [
+        [{"progress": True}, [1]],
+        [{"progress": True}, [2]],
+        [{"progress": True}, [3]],
+    ]
+    assert yields[3][1:4] == [10, {}, []]
+    # all at once to a Caller not asking for progressive results
+    assert yields[4][1:4] == [11, {}, [[1, 2, 3]]]
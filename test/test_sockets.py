@@ -0,0 +1,238 @@
+from time import time
+
+import eventlet
+import pytest
+from eventlet.green import socket
+
+from wampy.errors import ConnectionError
+from wampy.transports import sockets
+
+
+@pytest.yield_fixture
+def listeners():
+    servers = [eventlet.listen(('127.0.0.1', 0)) for _ in range(2)]
+    yield [server.getsockname() for server in servers]
+    for server in servers:
+        server.close()
+
+
+@pytest.yield_fixture
+def slow_addresses(monkeypatch):
+    """ Addresses added here take a second to connect to. """
+    slow = []
+    attempt = sockets._attempt
+
+    def slow_attempt(family, sockaddr, *args):
+        if sockaddr in slow:
+            eventlet.sleep(1)
+        attempt(family, sockaddr, *args)
+
+    monkeypatch.setattr(sockets, '_attempt', slow_attempt)
+    yield slow
+
+
+@pytest.yield_fixture
+def addresses(monkeypatch):
+    """ The addresses that every host resolves to. """
+    addresses = []
+    monkeypatch.setattr(
+        sockets, 'resolve', lambda host, port, ipv: list(addresses))
+    yield addresses
+
+
+def closed_port():
+    _socket = socket.socket()
+    _socket.bind(('127.0.0.1', 0))
+    address = _socket.getsockname()
+    _socket.close()
+    return address
+
+
+def test_interleave():
+    v4 = [(socket.AF_INET, ('10.0.0.{}'.format(i), 80)) for i in range(3)]
+    v6 = [(socket.AF_INET6, ('fe80::{}'.format(i), 80)) for i in range(2)]
+
+    assert sockets.interleave(v6 + v4) == [
+        v6[0], v4[0], v6[1], v4[1], v4[2],
+    ]
+
+
+def test_resolve_is_cached(monkeypatch):
+    calls = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(*args):
+        calls.append(args)
+        return getaddrinfo(*args)
+
+    monkeypatch.setattr(socket, 'getaddrinfo', counting_getaddrinfo)
+    monkeypatch.setattr(sockets, 'address_cache', sockets.AddressCache())
+
+    expected = [(socket.AF_INET, ('127.0.0.1', 8080))]
+    assert sockets.resolve('127.0.0.1', 8080, 4) == expected
+    assert sockets.resolve('127.0.0.1', 8080, 4) == expected
+    assert len(calls) == 1
+
+    # expired
+    sockets.address_cache.ttl = -1
+    sockets.address_cache.clear()
+    sockets.resolve('127.0.0.1', 8080, 4)
+    sockets.resolve('127.0.0.1', 8080, 4)
+    assert len(calls) == 3
+
+
+def test_unknown_ipv():
+    with pytest.raises(sockets.WampyError):
+        sockets.resolve('localhost', 8080, ipv=5)
+
+
+def test_falls_back_at_once_when_refused(listeners, addresses):
+    addresses.extend([
+        (socket.AF_INET, closed_port()), (socket.AF_INET, listeners[0]),
+    ])
+
+    started = time()
+    _socket = sockets.connect_tcp('router', 8080)
+
+    assert time() - started < sockets.CONNECTION_ATTEMPT_DELAY
+    assert _socket.getpeername() == listeners[0]
+    _socket.close()
+
+
+def test_races_slow_address(listeners, addresses, slow_addresses):
+    addresses.extend([
+        (socket.AF_INET, listeners[0]), (socket.AF_INET, listeners[1]),
+    ])
+    slow_addresses.append(listeners[0])
+
+    started = time()
+    _socket = sockets.connect_tcp('router', 8080)
+
+    assert time() - started < 0.5
+    assert _socket.getpeername() == listeners[1]
+    _socket.close()
+
+
+def test_connect_timeout(listeners, addresses, slow_addresses):
+    addresses.append((socket.AF_INET, listeners[0]))
+    slow_addresses.append(listeners[0])
+
+    with pytest.raises(socket.timeout):
+        sockets.connect_tcp('router', 8080, timeout=0.1)
+
+
+def test_all_refused(addresses):
+    addresses.extend([
+        (socket.AF_INET, closed_port()), (socket.AF_INET, closed_port()),
+    ])
+
+    with pytest.raises(socket.error):
+        sockets.connect_tcp('router', 8080)
+
+
+def test_stale_cached_addresses_are_looked_up_again(
+        monkeypatch, listeners):
+    calls = []
+
+    def getaddrinfo(host, port, family, type):
+        calls.append(host)
+        return [(socket.AF_INET, type, 6, '', listeners[0])]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setattr(sockets, 'address_cache', sockets.AddressCache())
+    # where the router was before it moved
+    sockets.address_cache.set(
+        ('router', 8080, socket.AF_UNSPEC),
+        [(socket.AF_INET, closed_port())],
+    )
+
+    _socket = sockets.connect_tcp('router', 8080)
+
+    assert _socket.getpeername() == listeners[0]
+    assert calls == ['router']
+    assert sockets.resolve('router', 8080) == [
+        (socket.AF_INET, listeners[0])]
+    _socket.close()
+
+
+def test_unreachable_host_is_looked_up_once(monkeypatch):
+    calls = []
+
+    def getaddrinfo(host, port, family, type):
+        calls.append(host)
+        return [(socket.AF_INET, type, 6, '', closed_port())]
+
+    monkeypatch.setattr(socket, 'getaddrinfo', getaddrinfo)
+    monkeypatch.setattr(sockets, 'address_cache', sockets.AddressCache())
+
+    with pytest.raises(socket.error):
+        sockets.connect_tcp('router', 8080)
+    assert calls == ['router']
+
+    # cached, and then looked up again
+    with pytest.raises(socket.error):
+        sockets.connect_tcp('router', 8080)
+    assert calls == ['router', 'router']
+
+
+def test_socket_options(listeners):
+    options = sockets.SocketOptions(
+        tcp_keepalive=30, send_buffer_size=64 * 1024,
+        receive_buffer_size=128 * 1024,
+    )
+
+    _socket = sockets.connect_tcp(
+        *listeners[0], socket_options=options)
+
+    try:
+        assert _socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+        assert _socket.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE)
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            assert _socket.getsockopt(
+                socket.IPPROTO_TCP, socket.TCP_KEEPIDLE) == 30
+        # Linux doubles the sizes asked for, to allow for its bookkeeping
+        assert _socket.getsockopt(
+            socket.SOL_SOCKET, socket.SO_SNDBUF) >= 64 * 1024
+        assert _socket.getsockopt(
+            socket.SOL_SOCKET, socket.SO_RCVBUF) >= 128 * 1024
+    finally:
+        _socket.close()
+
+
+def test_nagle_can_be_left_enabled(listeners):
+    options = sockets.SocketOptions(tcp_nodelay=False)
+
+    _socket = sockets.connect_tcp(*listeners[0], socket_options=options)
+
+    assert not _socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY)
+    _socket.close()
+
+
+def test_recv_into():
+    client_socket, server_socket = socket.socketpair()
+    buffer = bytearray(b'ab' + b'\0' * 4)
+
+    server_socket.sendall(b'cd')
+    eventlet.spawn_after(0.01, server_socket.sendall, b'ef')
+    sockets.recv_into(client_socket, buffer, 2)
+
+    assert buffer == b'abcdef'
+
+    server_socket.sendall(b'gh')
+    server_socket.close()
+    with pytest.raises(ConnectionError):
+        sockets.recv_into(client_socket, bytearray(4))
+
+    client_socket.close()
+
+
+def test_socket_timeout():
+    client_socket, server_socket = socket.socketpair()
+
+    with pytest.raises(socket.timeout):
+        with sockets.socket_timeout(client_socket, 0.01):
+            client_socket.recv(1)
+
+    assert client_socket.gettimeout() is None
+    client_socket.close()
+    server_socket.close()
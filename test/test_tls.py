@@ -0,0 +1,121 @@
+import eventlet
+import pytest
+from eventlet.green import ssl
+
+from wampy.transports import tls
+from wampy.transports.websocket.connection import TLSWampWebSocket
+
+from test.helpers import FakeRouter
+
+
+CERTIFICATE = './wampy/testing/keys/server_cert.pem'
+KEY = './wampy/testing/keys/server_key.pem'
+
+HANDSHAKE_RESPONSE = (
+    b"HTTP/1.1 101 Switching Protocols\r\n"
+    b"Upgrade: WebSocket\r\n"
+    b"Connection: Upgrade\r\n"
+    b"Sec-WebSocket-Protocol: wamp.2.json\r\n"
+    b"\r\n"
+)
+
+
+class TLSServer(object):
+    """ Answers every upgrade request over TLS with a ``101``. """
+
+    def __init__(self):
+        self.context = ssl.SSLContext(ssl.PROTOCOL_SSLv23)
+        self.context.load_cert_chain(CERTIFICATE, KEY)
+        self.context.set_alpn_protocols(['http/1.1'])
+        self.context.set_servername_callback(self.servername_received)
+
+        self.server_names = []
+        self.alpn_protocols = []
+        self.sessions_reused = []
+
+        self.listener = eventlet.listen(('127.0.0.1', 0))
+        self.port = self.listener.getsockname()[1]
+        self.thread = eventlet.spawn(self.serve)
+
+    def servername_received(self, sock, server_name, context):
+        self.server_names.append(server_name)
+
+    def serve(self):
+        while True:
+            client, _ = self.listener.accept()
+            eventlet.spawn(self.handle, client)
+
+    def handle(self, client):
+        client = self.context.wrap_socket(client, server_side=True)
+        self.alpn_protocols.append(client.selected_alpn_protocol())
+        self.sessions_reused.append(getattr(client, 'session_reused', None))
+
+        request = bytearray()
+        while b"\r\n\r\n" not in request:
+            request.extend(client.recv(4096))
+        client.sendall(HANDSHAKE_RESPONSE)
+
+        while client.recv(4096):
+            pass
+        client.close()
+
+    def stop(self):
+        self.thread.kill()
+        self.listener.close()
+
+
+@pytest.yield_fixture
+def tls_server():
+    tls.clear()
+    server = TLSServer()
+    yield server
+    server.stop()
+    tls.clear()
+
+
+@pytest.fixture
+def ssl_context():
+    context = tls.create_ssl_context(CERTIFICATE)
+    # the test certificate has expired
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def make_router(port):
+    router = FakeRouter(url="wss://localhost:{}".format(port))
+    router.certificate = CERTIFICATE
+    return router
+
+
+def test_ssl_context_is_shared():
+    tls.clear()
+
+    context = tls.get_ssl_context(CERTIFICATE)
+
+    assert tls.get_ssl_context(CERTIFICATE) is context
+    assert TLSWampWebSocket(make_router(443)).ssl_context is context
+    assert context.verify_mode == ssl.CERT_REQUIRED
+
+
+def test_sni_and_alpn(tls_server, ssl_context):
+    connection = TLSWampWebSocket(
+        make_router(tls_server.port), ssl_context=ssl_context)
+
+    connection.connect()
+    connection.disconnect()
+
+    assert connection.status == 101
+    assert tls_server.server_names == ['localhost']
+    assert tls_server.alpn_protocols == ['http/1.1']
+
+
+@pytest.mark.skipif(
+    not tls.SESSION_RESUMPTION, reason="requires ssl.SSLSession")
+def test_session_is_resumed(tls_server, ssl_context):
+    for _ in range(2):
+        connection = TLSWampWebSocket(
+            make_router(tls_server.port), ssl_context=ssl_context)
+        connection.connect()
+        connection.disconnect()
+
+    assert tls_server.sessions_reused == [False, True]
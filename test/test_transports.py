@@ -1,4 +1,5 @@
 import datetime
+import socket
 from datetime import date
 
 import pytest
@@ -6,8 +7,11 @@ import pytest
 from wampy.peers.clients import Client
 from wampy.peers.routers import Crossbar
 from wampy.roles.callee import callee
+from wampy.roles.subscriber import subscribe
 from wampy.testing.helpers import wait_for_session, wait_for_registrations
 
+from test.helpers import assert_stops_raising
+
 
 class DateService(Client):
 
@@ -60,6 +64,135 @@ class TestIP6(object):
             assert result == today.isoformat()
 
 
+class EchoService(Client):
+
+    @callee
+    def echo(self, message):
+        return message
+
+
+class TestFragmentation(object):
+
+    @pytest.fixture(scope="function")
+    def config_path(self):
+        # the router fragments every message larger than 1024 bytes
+        return './wampy/testing/configs/crossbar.config.ipv4.fragmented.json'
+
+    def test_fragmented_messages(self, config_path, router):
+        message = "spam" * 10000
+        transport_options = {'fragment_size': 1000}
+
+        service = EchoService(
+            router=router, transport_options=transport_options)
+        with service:
+            wait_for_registrations(service, 1)
+
+            client = Client(
+                router=router, transport_options=transport_options)
+            with client:
+                result = client.rpc.echo(message)
+
+        assert result == message
+
+
+class TestCompression(object):
+
+    @pytest.fixture(scope="function")
+    def config_path(self):
+        return './wampy/testing/configs/crossbar.config.ipv4.deflate.json'
+
+    def test_compressed_messages(self, config_path, router):
+        message = "spam and eggs " * 1000
+        transport_options = {'compression': {'threshold': 64}}
+
+        service = EchoService(
+            router=router, transport_options=transport_options)
+        with service:
+            wait_for_registrations(service, 1)
+
+            client = Client(
+                router=router, transport_options=transport_options)
+            with client:
+                deflate = client.session.transport.deflate
+                result = client.rpc.echo(message)
+
+        assert result == message
+        # as configured by the router
+        assert deflate.client_max_window_bits == 12
+        assert deflate.server_max_window_bits == 15
+
+
+class TestUnixSocket(object):
+
+    @pytest.fixture(scope="function")
+    def config_path(self):
+        return './wampy/testing/configs/crossbar.config.unix.json'
+
+    def test_unix_socket_websocket_connection(self, config_path, router):
+        service = DateService(router=router)
+        with service:
+            wait_for_registrations(service, 1)
+
+            client = Client(router=router)
+            with client:
+                connection = client.session.transport
+                assert connection.socket.family == socket.AF_UNIX
+
+                result = client.rpc.get_todays_date()
+
+        assert result == date.today().isoformat()
+
+
+class EggsSubscriber(Client):
+
+    messages = None
+
+    @subscribe(topic="eggs")
+    def eggs_handler(self, message, **kwargs):
+        self.messages = (self.messages or []) + [message]
+
+
+class TestRawSocket(object):
+
+    @pytest.fixture(scope="function")
+    def config_path(self):
+        return './wampy/testing/configs/crossbar.config.ipv4.rawsocket.json'
+
+    def test_rawsocket_connection(self, config_path, router):
+        message = "spam and eggs " * 10000
+
+        service = EchoService(router=router, transport="rawsocket")
+        subscriber = EggsSubscriber(router=router, transport="rawsocket")
+        with service, subscriber:
+            wait_for_registrations(service, 1)
+
+            client = Client(router=router, transport="rawsocket")
+            with client:
+                assert client.session.transport.max_send_size > 0
+
+                result = client.rpc.echo(message)
+                client.publish(topic="eggs", message="spam")
+
+                def published():
+                    assert subscriber.messages == ["spam"]
+
+                assert_stops_raising(published)
+
+        assert result == message
+
+
+def test_keepalive(router):
+    client = Client(router=router, transport_options={'ping_interval': 0.1})
+
+    with client:
+        connection = client.session.transport
+
+        def pong_received():
+            assert connection.rtt is not None
+
+        assert_stops_raising(pong_received)
+
+
 def test_ipv4_secure_websocket_connection():
     # note that TLS not supported by crossbar on ipv6
     crossbar = Crossbar(
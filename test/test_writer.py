@@ -0,0 +1,160 @@
+import eventlet
+import pytest
+
+from wampy.errors import ConnectionError, SendQueueFullError, WampyError
+from wampy.transports.writer import Writer
+
+
+class Recorder(object):
+
+    def __init__(self, fail=False):
+        self.writes = []
+        self.fail = fail
+        # holds up every write until it is sent
+        self.unblocked = None
+
+    def __call__(self, data):
+        if self.unblocked is not None:
+            self.unblocked.wait()
+        # a slow write, so that more data is queued meanwhile
+        eventlet.sleep(0.01)
+        if self.fail:
+            raise IOError("broken pipe")
+        self.writes.append(bytes(data))
+
+
+def make_writer(send, **kwargs):
+    writer = Writer(send, **kwargs)
+    writer.start()
+    return writer
+
+
+def block(send):
+    send.unblocked = eventlet.event.Event()
+
+
+def test_write():
+    send = Recorder()
+    writer = make_writer(send)
+
+    writer.write(b'spam')
+    writer.flush()
+
+    assert send.writes == [b'spam']
+
+
+def test_writes_queued_together_are_coalesced():
+    send = Recorder()
+    writer = make_writer(send)
+
+    for i in range(10):
+        writer.write(str(i).encode('ascii'))
+    writer.flush()
+
+    assert send.writes == [b'0123456789']
+
+
+def test_writes_queued_during_a_write_are_coalesced():
+    send = Recorder()
+    writer = make_writer(send)
+
+    writer.write(b'a')
+    eventlet.sleep()
+    # the first write is now in progress
+    writer.write(b'b')
+    writer.write(b'c')
+    writer.flush()
+
+    assert send.writes == [b'a', b'bc']
+
+
+def test_not_writable_above_high_watermark():
+    send = Recorder()
+    block(send)
+    writer = make_writer(send, high_watermark=10, low_watermark=4)
+
+    writer.write(b'x' * 6)
+    eventlet.sleep()
+    # bytes count as queued until they have been written
+    writer.write(b'x' * 4)
+    assert writer.writable
+
+    writer.write(b'x')
+    assert not writer.writable
+    assert writer.queued_bytes == 11
+
+    send.unblocked.send()
+    # the first write leaves 5 bytes queued, still above the low
+    # watermark, and the second none
+    assert writer.wait_writable(timeout=1)
+    assert send.writes == [b'x' * 6, b'x' * 5]
+
+
+def test_block_when_not_writable():
+    send = Recorder()
+    block(send)
+    writer = make_writer(send, high_watermark=10)
+    writer.write(b'x' * 11)
+
+    sender = eventlet.spawn(lambda: writer.admit() and writer.write(b'y'))
+    eventlet.sleep(0.05)
+    assert not sender.dead
+
+    send.unblocked.send()
+    sender.wait()
+    writer.flush()
+
+    assert send.writes == [b'x' * 11, b'y']
+
+
+def test_raise_when_not_writable():
+    send = Recorder()
+    block(send)
+    writer = make_writer(send, high_watermark=10, overflow="raise")
+    writer.write(b'x' * 11)
+
+    with pytest.raises(SendQueueFullError):
+        writer.admit()
+
+
+def test_drop_when_not_writable():
+    send = Recorder()
+    block(send)
+    writer = make_writer(send, high_watermark=10, overflow="drop")
+    writer.write(b'x' * 11)
+
+    assert writer.admit() is False
+
+
+def test_unknown_overflow_policy():
+    with pytest.raises(WampyError):
+        Writer(Recorder(), overflow="ignore")
+
+
+def test_failed_write_fails_every_write_after():
+    writer = make_writer(Recorder(fail=True))
+    writer.write(b'spam')
+
+    with pytest.raises(ConnectionError):
+        writer.flush()
+
+    with pytest.raises(ConnectionError):
+        writer.write(b'eggs')
+
+
+def test_stop_writes_what_is_queued():
+    send = Recorder()
+    writer = make_writer(send)
+
+    writer.write(b'spam')
+    writer.stop()
+
+    assert send.writes == [b'spam']
+
+    with pytest.raises(ConnectionError):
+        writer.write(b'eggs')
+
+
+def test_not_started():
+    with pytest.raises(ConnectionError):
+        Writer(Recorder()).write(b'spam')
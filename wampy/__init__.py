@@ -1,9 +1,10 @@
-# Set default logging handler to avoid "No handler found" warnings.
+import importlib
 import logging
-
-import eventlet
+import sys
+import types
 
 
+# Set default logging handler to avoid "No handler found" warnings.
 try:  # Python 2.7+
     from logging import NullHandler
 except ImportError:
@@ -11,11 +12,54 @@ except ImportError:
         def emit(self, record):
             pass
 
-from wampy.peers.clients import Client  # noqa
-
 
 root = logging.getLogger(__name__)
 root.addHandler(NullHandler())
 
-root.warning('eventlet about to monkey patched your environment')
-eventlet.monkey_patch()
+
+def monkey_patch():
+    """ Patch the standard library to cooperate with the threads of the
+    concurrency backend, e.g. so that your own blocking I/O does not hold
+    up wampy's green threads. Call it before importing anything else.
+
+    wampy's own sockets cooperate with the backend whether or not the
+    standard library is patched, so importing wampy patches nothing.
+
+    """
+    from wampy.backends import get_backend
+    get_backend().monkey_patch()
+
+
+# attributes of the package imported when they are first used, so that
+# importing wampy does not import the sessions, transports and messages
+# behind them
+LAZY_ATTRIBUTES = {
+    'Client': 'wampy.peers.clients',
+}
+
+
+class _Package(types.ModuleType):
+
+    def __getattr__(self, name):
+        try:
+            module_name = LAZY_ATTRIBUTES[name]
+        except KeyError:
+            raise AttributeError(
+                "module '{}' has no attribute '{}'".format(
+                    self.__name__, name)
+            )
+
+        value = getattr(importlib.import_module(module_name), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(LAZY_ATTRIBUTES))
+
+
+_package = _Package(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+# Python 2 empties the globals of a module that is garbage collected,
+# and the functions above still use those of this one
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
@@ -0,0 +1,9 @@
+""" wampy for asyncio.
+
+A Client, Session and WebSocket transport built on asyncio streams and
+futures rather than eventlet, for applications that already run an
+asyncio event loop. Python 3.5+ only.
+
+"""
+from wampy.aio.clients import Client  # noqa
+from wampy.aio.roles import callee, subscribe  # noqa
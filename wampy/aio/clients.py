@@ -0,0 +1,245 @@
+import inspect
+import logging
+import ssl
+
+from wampy.errors import WampError, WampProtocolError, WampyError
+from wampy.messages import Message
+from wampy.messages.call import Call
+from wampy.messages.publish import Publish
+from wampy.messages.register import Register
+from wampy.messages.subscribe import Subscribe
+from wampy.roles.caller import DEFAULT_CALL_TIMEOUT, get_result
+from wampy.transports import tls
+
+from .session import Session
+from .transport import WebSocket
+
+logger = logging.getLogger(__name__)
+
+
+class RpcProxy(object):
+    """ Call procedures named after attributes, e.g. ::
+
+        result = await client.rpc.get_foo(spam="eggs")
+
+    with the client's ``call_timeout``, unless the proxy is given a
+    ``timeout`` of its own, e.g. ::
+
+        report = await client.rpc.with_timeout(300).get_report()
+
+    """
+
+    def __init__(self, client, timeout=None):
+        self.client = client
+        self.timeout = timeout
+
+    def with_timeout(self, timeout):
+        """ Return a proxy whose calls have ``timeout`` seconds. """
+        return self.__class__(client=self.client, timeout=timeout)
+
+    def __getattr__(self, name):
+
+        async def wrapper(*args, **kwargs):
+            return await self.client.send_call(
+                name, args, kwargs, timeout=self.timeout)
+
+        return wrapper
+
+
+class Client(object):
+    """ A WAMP Client for asyncio applications.
+
+    Usage::
+
+        async with Client(router=router) as client:
+            result = await client.call("com.example.add", 1, 2)
+
+    Methods decorated with :func:`wampy.aio.callee` or
+    :func:`wampy.aio.subscribe` are registered or subscribed once the
+    Client has joined its realm.
+
+    """
+    DEFAULT_ROLES = {
+        'roles': {
+            'subscriber': {},
+            'publisher': {},
+            'callee': {
+                'shared_registration': True,
+                'features': {
+                    'call_canceling': True,
+                },
+            },
+            'caller': {
+                'features': {
+                    'call_canceling': True,
+                },
+            },
+        },
+    }
+
+    def __init__(
+            self, router, roles=None, use_tls=False, ssl_context=None,
+            transport_options=None, call_timeout=DEFAULT_CALL_TIMEOUT,
+    ):
+        """ A WAMP Client.
+
+        :Parameters:
+            router : instance
+                An instance of :class:`peers.Router`.
+            use_tls : bool
+                Connect over TLS, verifying the router with its
+                ``certificate``, unless an ``ssl_context`` is given.
+            transport_options : dict
+                Keyword arguments for
+                :class:`wampy.aio.transport.WebSocket`.
+            call_timeout : float
+                How many seconds a CALL has to complete, unless it is
+                given a timeout of its own, or None to wait for ever.
+
+        """
+        self.roles = roles or self.DEFAULT_ROLES
+        self.call_timeout = call_timeout
+        self.realm = router.realm
+
+        transport_options = dict(transport_options or {})
+        if use_tls:
+            # asyncio wraps sockets of the standard library
+            transport_options['ssl'] = ssl_context or tls.get_ssl_context(
+                getattr(router, 'certificate', None), ssl_module=ssl)
+
+        self.session = Session(
+            client=self, router=router,
+            transport=WebSocket(router, **transport_options),
+        )
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        await self.stop()
+
+    @property
+    def subscription_map(self):
+        return self.session.subscription_map
+
+    @property
+    def registration_map(self):
+        return self.session.registration_map
+
+    async def start(self):
+        await self.session.begin()
+        await self._register_roles()
+
+    async def stop(self):
+        await self.session.end()
+
+    @property
+    def rpc(self):
+        return RpcProxy(client=self)
+
+    async def call(self, procedure, *args, **kwargs):
+        """ Call a remote procedure, returning its result. """
+        return await self.send_call(procedure, args, kwargs)
+
+    async def send_call(self, procedure, args=None, kwargs=None, timeout=None):
+        """ Call ``procedure``, returning its result, or raising
+        ``CallError`` for an ERROR, as the eventlet caller does.
+
+        The call has ``timeout`` seconds, else the client's
+        ``call_timeout``, to complete, after which it is canceled and
+        ``asyncio.TimeoutError`` raised. The Dealer is asked to cancel it
+        after as long too, with the "timeout" call option.
+
+        """
+        if timeout is None:
+            timeout = self.call_timeout
+
+        options = {}
+        if timeout is not None:
+            # in milliseconds, where 0 would mean no timeout at all
+            options['timeout'] = max(int(round(timeout * 1000)), 1)
+
+        message = Call(
+            procedure=procedure, options=options, args=args, kwargs=kwargs)
+        response = await self.session.request(message, timeout=timeout)
+        return get_result(response)
+
+    async def publish(self, *unsupported_args, **kwargs):
+        """ Publish keyword arguments to a ``topic``, e.g. ::
+
+            await client.publish(topic="foo", message="bar")
+
+        """
+        if len(unsupported_args) != 0:
+            raise WampyError(
+                "wampy only supports publishing keyword arguments "
+                "to a Topic."
+            )
+
+        topic = kwargs.pop("topic")
+        if not kwargs:
+            raise WampyError(
+                "wampy requires at least one message to publish to a topic"
+            )
+
+        message = Publish(topic=topic, options={}, **kwargs)
+        logger.info('publishing message: "%s"', message)
+
+        await self.session.send_message(message)
+
+    async def subscribe(self, topic, handler):
+        """ Subscribe ``handler``, a function or coroutine function, to
+        the events published to ``topic``, returning the subscription ID.
+        """
+        response = await self.session.request(Subscribe(topic=topic))
+        if response[0] != Message.SUBSCRIBED:
+            raise WampProtocolError(
+                'failed to subscribe to topic: "{}"'.format(response)
+            )
+
+        subscription_id = response[2]
+        self.session.subscription_map[subscription_id] = handler, topic
+
+        logger.info('subscribed to topic "%s"', topic)
+        return subscription_id
+
+    async def register(self, procedure, handler, invocation_policy="single"):
+        """ Register ``handler``, a function or coroutine function, as
+        ``procedure``, returning the registration ID.
+        """
+        message = Register(
+            procedure=procedure, options={"invoke": invocation_policy})
+        response = await self.session.request(message)
+        if response[0] != Message.REGISTERED:
+            raise WampError(
+                'failed to register procedure "{}": {}'.format(
+                    procedure, response)
+            )
+
+        registration_id = response[2]
+        self.session.registration_map[registration_id] = (
+            handler, procedure)
+
+        logger.info('registered procedure "%s"', procedure)
+        return registration_id
+
+    async def _register_roles(self):
+        logger.info("registering roles for: %s", self.__class__.__name__)
+
+        bases = [b for b in inspect.getmro(self.__class__) if b is not object]
+
+        for base in bases:
+            for name, maybe_role in base.__dict__.items():
+                if not callable(maybe_role):
+                    continue
+
+                if hasattr(maybe_role, 'callee'):
+                    await self.register(
+                        name, getattr(self, name),
+                        invocation_policy=maybe_role.invocation_policy,
+                    )
+
+                if hasattr(maybe_role, 'subscriber'):
+                    await self.subscribe(
+                        maybe_role.topic, getattr(self, name))
@@ -0,0 +1,59 @@
+""" Decorators marking the methods of an asyncio ``Client`` subclass as
+procedures to register or handlers of events to subscribe to, once the
+Client has joined its realm.
+
+They mark methods just as their eventlet counterparts in
+``wampy.roles`` do, but the methods may be coroutine functions.
+
+"""
+import types
+from functools import partial
+
+from wampy.errors import WampyError
+
+
+def callee(*args, **kwargs):
+    """ Register the method as a procedure, named after it, e.g. ::
+
+        @callee
+        async def get_foo(self):
+            ...
+
+        @callee(invocation_policy="roundrobin")
+        async def get_bar(self):
+            ...
+
+    """
+    def registering_decorator(fn, invocation_policy="single"):
+        fn.callee = True
+        fn.invocation_policy = invocation_policy
+        return fn
+
+    if len(args) == 1 and isinstance(args[0], types.FunctionType):
+        return registering_decorator(args[0])
+
+    return partial(registering_decorator, **kwargs)
+
+
+def subscribe(**kwargs):
+    """ Subscribe the method to a ``topic``, e.g. ::
+
+        @subscribe(topic="foo")
+        async def foo_handler(self, *args, **kwargs):
+            ...
+
+    """
+    if "topic" not in kwargs:
+        raise WampyError(
+            "subscriber missing ``topic`` keyword argument"
+        )
+
+    topic = kwargs['topic']
+
+    def subscribing_decorator(fn):
+        fn.subscriber = True
+        fn.topic = topic
+        fn.handler = fn
+        return fn
+
+    return subscribing_decorator
@@ -0,0 +1,403 @@
+import asyncio
+import itertools
+import logging
+
+from wampy.constants import MAX_REQUEST_ID
+from wampy.errors import ConnectionError, WampError, WampProtocolError
+from wampy.messages import (
+    MESSAGE_TYPE_MAP, Error, Interrupt, Invocation, Message)
+from wampy.messages.cancel import Cancel
+from wampy.messages.goodbye import Goodbye
+from wampy.messages.hello import Hello
+from wampy.messages.yield_ import Yield
+
+logger = logging.getLogger(__name__)
+
+
+class Session(object):
+    """ A WAMP Session over an asyncio transport.
+
+    A single task reads every message the router sends. Replies to the
+    requests of this Session - RESULT, SUBSCRIBED, REGISTERED and ERROR -
+    resolve the future waiting on the request they answer, looked up by
+    its request ID, so any number of requests can be outstanding at once.
+    EVENTs and INVOCATIONs are handled in tasks of their own, so that a
+    slow handler never holds up the reading of replies, and an INTERRUPT
+    can cancel the task of the INVOCATION it is for.
+
+    """
+
+    def __init__(self, client, router, transport):
+        """ A Session between a Client and a Router.
+
+        :Parameters:
+            client : instance
+                An instance of :class:`wampy.aio.Client`.
+            router : instance
+                An instance of :class:`peers.Router`.
+            transport : instance
+                An instance of :class:`wampy.aio.transport.WebSocket`.
+
+        """
+        self.client = client
+        self.router = router
+        self.transport = transport
+
+        # subscription ID: (handler, topic)
+        self.subscription_map = {}
+        # registration ID: (handler, procedure)
+        self.registration_map = {}
+
+        self.session_id = None
+        # the Details of the Router's WELCOME, announcing its features
+        self.router_details = {}
+
+        # request ID: the future for the reply to the request
+        self._requests = {}
+        self._request_ids = itertools.count(1)
+        self._welcome = None
+        self._goodbye = None
+        self._listener = None
+        # the EVENT and INVOCATION handlers still running
+        self._tasks = set()
+        # request ID of an INVOCATION: the task handling it
+        self._invocations = {}
+
+    @property
+    def realm(self):
+        return self.router.realm['name']
+
+    @property
+    def roles(self):
+        return self.client.roles
+
+    @property
+    def id(self):
+        return self.session_id
+
+    def router_supports(self, role, feature):
+        """ Whether the Router has announced ``feature`` of its ``role``,
+        e.g. ``router_supports('dealer', 'call_canceling')``.
+        """
+        roles = self.router_details.get('roles', {})
+        features = roles.get(role, {}).get('features', {})
+        return bool(features.get(feature))
+
+    def next_request_id(self):
+        """ Return the ID for the next request of this Session, counting
+        up from 1 and wrapping around after ``MAX_REQUEST_ID``.
+        """
+        return (next(self._request_ids) - 1) % MAX_REQUEST_ID + 1
+
+    async def begin(self, timeout=5):
+        self._request_ids = itertools.count(1)
+        await self.transport.connect()
+
+        loop = asyncio.get_event_loop()
+        self._welcome = loop.create_future()
+        self._listener = asyncio.ensure_future(self._listen())
+
+        await self.send_message(Hello(self.realm, self.roles))
+
+        try:
+            self.session_id = await asyncio.wait_for(self._welcome, timeout)
+        except asyncio.TimeoutError:
+            await self._disconnect()
+            raise WampProtocolError("no reply to HELLO")
+        except Exception:
+            await self._disconnect()
+            raise
+
+    async def end(self, timeout=2):
+        if self._listener is None:
+            return
+
+        loop = asyncio.get_event_loop()
+        self._goodbye = loop.create_future()
+
+        try:
+            await self.send_message(Goodbye(wamp_code=Message.GOODBYE))
+            await asyncio.wait_for(self._goodbye, timeout)
+        except (ConnectionError, asyncio.TimeoutError) as exc:
+            # the router already gone away?
+            logger.warning("GOODBYE failed!: %s", exc)
+
+        await self._disconnect()
+
+        self.subscription_map = {}
+        self.registration_map = {}
+        self.session_id = None
+        self.router_details = {}
+
+    async def send_message(self, message):
+        self._assign_request_id(message)
+
+        message_type = MESSAGE_TYPE_MAP[message.WAMP_CODE]
+        message = message.serialize()
+
+        logger.debug('sending "%s" message: %s', message_type, message)
+
+        await self.transport.send(message)
+
+    async def request(self, message, timeout=None):
+        """ Send a request and return the router's reply to it.
+
+        :Parameters:
+            message : instance
+                A :class:`wampy.messages.Message` with a ``request_id``.
+            timeout : float
+                Give up waiting for the reply after this many seconds,
+                raising ``asyncio.TimeoutError``.
+
+        A CALL given up on, because of its ``timeout`` or because the
+        task awaiting it has been cancelled, is canceled with the
+        Dealer too, if it has announced that it supports call canceling.
+
+        """
+        loop = asyncio.get_event_loop()
+        self._assign_request_id(message)
+        request_id = message.request_id
+
+        reply = self._requests[request_id] = loop.create_future()
+        try:
+            await self.send_message(message)
+        except BaseException:
+            self._requests.pop(request_id, None)
+            raise
+
+        try:
+            return await asyncio.wait_for(reply, timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # unless the reply has arrived: ``wait_for`` cancels it else
+            if message.WAMP_CODE == Message.CALL and (
+                    not reply.done() or reply.cancelled()):
+                self._send_cancel(request_id)
+            raise
+        finally:
+            self._requests.pop(request_id, None)
+
+    def _send_cancel(self, request_id, mode=Cancel.DEFAULT_MODE):
+        if not self.router_supports('dealer', 'call_canceling'):
+            return
+
+        async def send_cancel():
+            try:
+                await self.send_message(Cancel(request_id, mode=mode))
+            except ConnectionError as exc:
+                logger.warning("CANCEL failed!: %s", exc)
+
+        # the task giving up on the call may be being cancelled itself
+        self._spawn(send_cancel())
+
+    def _assign_request_id(self, message):
+        if getattr(message, 'request_id', False) is None:
+            message.set_request_id(self.next_request_id())
+
+    async def _disconnect(self):
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.cancel()
+
+        self._invocations = {}
+        tasks, self._tasks = self._tasks, set()
+        for task in tasks:
+            task.cancel()
+
+        await self.transport.disconnect()
+        self._fail_requests(ConnectionError("session ended"))
+
+        logger.debug('disconnected from %s', self.router.url)
+
+    def _fail_requests(self, exc):
+        requests, self._requests = self._requests, {}
+        for reply in requests.values():
+            if not reply.done():
+                reply.set_exception(exc)
+
+    async def _listen(self):
+        try:
+            while True:
+                frame = await self.transport.receive()
+                self._dispatch(frame.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.debug("stopped listening: %s", exc)
+            error = ConnectionError(
+                "connection to {} has been lost: {}".format(
+                    self.router.url, exc)
+            )
+            for waiter in (self._welcome, self._goodbye):
+                if waiter is not None and not waiter.done():
+                    waiter.set_exception(error)
+            self._fail_requests(error)
+
+    def _dispatch(self, message):
+        wamp_code = message[0]
+        logger.debug("received message: %s", MESSAGE_TYPE_MAP.get(
+            wamp_code, wamp_code))
+
+        if wamp_code in (Message.RESULT, Message.SUBSCRIBED,
+                         Message.REGISTERED, Message.UNREGISTERED):
+            self._resolve(message[1], message)
+
+        elif wamp_code == Message.ERROR:
+            # [ERROR, REQUEST.Type, REQUEST.Request|id, Details, Error|uri]
+            self._resolve(message[2], message)
+
+        elif wamp_code == Message.EVENT:
+            self._handle_event(message)
+
+        elif wamp_code == Message.INVOCATION:
+            self._invocations[message[1]] = self._spawn(
+                self._handle_invocation(message))
+
+        elif wamp_code == Message.INTERRUPT:
+            self._handle_interrupt(message)
+
+        elif wamp_code == Message.WELCOME:
+            if self._welcome is not None and not self._welcome.done():
+                # [WELCOME, Session|id, Details|dict]
+                self.router_details = message[2] if len(message) > 2 else {}
+                self._welcome.set_result(message[1])
+
+        elif wamp_code == Message.ABORT:
+            if self._welcome is not None and not self._welcome.done():
+                self._welcome.set_exception(WampError(
+                    "session aborted by the router: {}".format(message)))
+
+        elif wamp_code == Message.GOODBYE:
+            if self._goodbye is not None and not self._goodbye.done():
+                self._goodbye.set_result(message)
+            else:
+                # the router is ending the session: say goodbye back
+                self._spawn(self.send_message(
+                    Goodbye(wamp_code=Message.GOODBYE,
+                            reason="wamp.close.goodbye_and_out")))
+
+        else:
+            logger.warning("unexpected message: %s", message)
+
+    def _resolve(self, request_id, message):
+        reply = self._requests.get(request_id)
+        if reply is None:
+            logger.warning("reply to no request: %s", message)
+            return
+
+        if not reply.done():
+            reply.set_result(message)
+
+    def _handle_event(self, message):
+        # [EVENT, SUBSCRIBED.Subscription|id, PUBLISHED.Publication|id,
+        #  Details|dict, PUBLISH.Arguments|list, PUBLISH.ArgumentKw|dict]
+        subscription_id = message[1]
+        args = message[4] if len(message) > 4 else []
+        kwargs = message[5] if len(message) > 5 else {}
+
+        try:
+            handler, topic = self.subscription_map[subscription_id]
+        except KeyError:
+            logger.warning("EVENT for no subscription: %s", message)
+            return
+
+        kwargs['meta'] = {
+            'topic': topic,
+            'subscription_id': subscription_id,
+        }
+
+        try:
+            result = handler(*args, **kwargs)
+        except Exception:
+            logger.exception("error handling EVENT on %s", topic)
+            return
+
+        if asyncio.iscoroutine(result):
+            self._spawn(result)
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _handle_interrupt(self, message):
+        # [INTERRUPT, INVOCATION.Request|id, Options|dict]
+        request_id = message[1]
+        task = self._invocations.pop(request_id, None)
+        if task is None:
+            # answered already
+            logger.debug(
+                "ignoring INTERRUPT of invocation %s: it is done", request_id)
+            return
+
+        logger.info("interrupting invocation %s", request_id)
+        task.cancel()
+
+        async def send_error():
+            try:
+                await self.send_message(Error(
+                    Message.ERROR, Message.INVOCATION, request_id, {},
+                    Interrupt.CANCELED,
+                ))
+            except ConnectionError as exc:
+                logger.error(
+                    "failed to answer INTERRUPT of %s: %s", request_id, exc)
+
+        self._spawn(send_error())
+
+    async def _handle_invocation(self, message):
+        # [INVOCATION, Request|id, REGISTERED.Registration|id, Details|dict,
+        #  CALL.Arguments|list, CALL.ArgumentsKw|dict]
+        request_id, registration_id = message[1], message[2]
+        args = message[4] if len(message) > 4 else []
+        kwargs = message[5] if len(message) > 5 else {}
+
+        try:
+            handler, procedure = self.registration_map[registration_id]
+        except KeyError:
+            # answered as the eventlet callee does, see ``Invocation``
+            logger.warning(
+                "INVOCATION for no registration: %s", registration_id)
+            self._invocations.pop(request_id, None)
+            try:
+                await self.send_message(Error(
+                    Message.ERROR, Message.INVOCATION, request_id, {},
+                    Invocation.NO_SUCH_REGISTRATION,
+                ))
+            except ConnectionError as exc:
+                logger.error(
+                    "failed to answer INVOCATION %s: %s", request_id, exc)
+            return
+
+        try:
+            result = handler(*args, **kwargs)
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as exc:
+            logger.exception("error calling: %s", procedure)
+            result = None
+            error = str(exc)
+        else:
+            error = None
+
+        if self._invocations.pop(request_id, None) is None:
+            # interrupted: the Dealer has been answered already
+            return
+
+        # the reply is that of the eventlet callee, see ``Invocation``
+        result_kwargs = {
+            'error': error,
+            'message': result,
+            'meta': {
+                'procedure_name': procedure,
+                'session_id': self.session_id,
+            },
+        }
+
+        try:
+            await self.send_message(Yield(
+                request_id, result_args=[result],
+                result_kwargs=result_kwargs,
+            ))
+        except ConnectionError as exc:
+            logger.error("failed to YIELD for %s: %s", procedure, exc)
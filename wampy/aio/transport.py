@@ -0,0 +1,312 @@
+""" A WebSocket transport on asyncio streams.
+
+The frames are those of the eventlet transport, read from an
+``asyncio.StreamReader`` and written to an ``asyncio.StreamWriter``.
+Every frame is written with a single, synchronous, ``write``, so frames
+sent by concurrent tasks are never interleaved, and the transport's own
+buffer coalesces those written while the socket is busy. Senders wait on
+``drain`` only once that buffer is above its high water mark.
+
+"""
+import asyncio
+import logging
+import os
+import socket
+import sys
+from base64 import b64encode
+from struct import pack
+
+from wampy.constants import (
+    WEBSOCKET_SUBPROTOCOLS, WEBSOCKET_SUCCESS_STATUS, WEBSOCKET_VERSION)
+from wampy.errors import ConnectionError, WampProtocolError, WampyError
+from wampy.mixins import ParseUrlMixin
+from wampy.transports.websocket.frames import (
+    ClientFrame, Frame, FrameHeader, ServerFrame)
+from wampy.transports.websocket.reader import MessageReader
+
+logger = logging.getLogger(__name__)
+
+
+# as for the eventlet transports, see ``wampy.transports.sockets``
+DEFAULT_CONNECT_TIMEOUT = 5
+CONNECTION_ATTEMPT_DELAY = 0.25
+
+FAMILIES = {
+    None: socket.AF_UNSPEC,
+    4: socket.AF_INET,
+    6: socket.AF_INET6,
+}
+
+
+class WebSocket(ParseUrlMixin):
+
+    CLOSE_NORMAL = 1000
+
+    def __init__(
+            self, router, max_message_size=None,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT, ssl=None,
+            high_watermark=None, low_watermark=None,
+    ):
+        """ A WebSocket connection to a Router.
+
+        :Parameters:
+            router : instance
+                An instance of :class:`peers.Router`.
+            max_message_size : int
+                The largest message, in bytes, that the server may send
+                over this connection. Defaults to no limit.
+            connect_timeout : float
+                Give up on connecting to the server after this many
+                seconds.
+            ssl : instance
+                An ``ssl.SSLContext`` to connect over TLS with.
+            high_watermark : int
+                The number of bytes buffered above which senders wait for
+                the buffer to drain to the ``low_watermark``. Defaults to
+                asyncio's.
+
+        """
+        self.url = router.url
+
+        self.host = None
+        self.port = None
+        self.ipv = router.ipv
+        self.resource = None
+        self.unix_socket_path = None
+
+        self.parse_url()
+        self.websocket_location = self.resource
+        self.key = b64encode(os.urandom(16)).decode('ascii')
+
+        self.max_message_size = max_message_size
+        self.connect_timeout = connect_timeout
+        self.ssl = ssl
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+
+        self.status = None
+        self.headers = None
+
+        self._reader = None
+        self._writer = None
+        self._close_sent = False
+        # makes messages of the frames received, as for the eventlet
+        # transport
+        self.messages = MessageReader(max_message_size)
+
+    @property
+    def netloc(self):
+        host = self.host
+        if ':' in host:
+            # an IPv6 address
+            host = "[{}]".format(host)
+
+        if self.port is None:
+            return host
+        return "{}:{}".format(host, self.port)
+
+    async def connect(self):
+        self._close_sent = False
+        self.messages.reset()
+
+        try:
+            self._reader, self._writer = await asyncio.wait_for(
+                self._open_connection(), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(
+                "timed out after {} seconds connecting to {}".format(
+                    self.connect_timeout, self.url)
+            )
+        except OSError as exc:
+            raise ConnectionError(
+                'cannot connect to: "{}": {}'.format(self.url, exc))
+
+        if self.high_watermark is not None:
+            self._writer.transport.set_write_buffer_limits(
+                high=self.high_watermark, low=self.low_watermark)
+
+        await self._upgrade()
+
+    def _open_connection(self):
+        server_hostname = self.host if self.ssl else None
+
+        if self.unix_socket_path:
+            return asyncio.open_unix_connection(
+                self.unix_socket_path, ssl=self.ssl,
+                server_hostname=server_hostname,
+            )
+
+        kwargs = {}
+        try:
+            kwargs['family'] = FAMILIES[self.ipv]
+        except KeyError:
+            raise WampyError("unknown IPV: {}".format(self.ipv))
+
+        if kwargs['family'] == socket.AF_UNSPEC and (
+                sys.version_info >= (3, 8)):
+            # race the router's addresses, as the eventlet transports do
+            kwargs['happy_eyeballs_delay'] = CONNECTION_ATTEMPT_DELAY
+
+        return asyncio.open_connection(
+            self.host, self.port, ssl=self.ssl,
+            server_hostname=server_hostname, **kwargs)
+
+    def _get_handshake_headers(self):
+        return [
+            "GET {} HTTP/1.1".format(self.websocket_location),
+            "Host: {}".format(self.netloc),
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            "Sec-WebSocket-Key: {}".format(self.key),
+            "Origin: ws://{}".format(self.netloc),
+            "Sec-WebSocket-Version: {}".format(WEBSOCKET_VERSION),
+            "Sec-WebSocket-Protocol: {}".format(WEBSOCKET_SUBPROTOCOLS),
+        ]
+
+    async def _upgrade(self):
+        handshake = '\r\n'.join(self._get_handshake_headers()) + "\r\n\r\n"
+        self._writer.write(handshake.encode('utf-8'))
+
+        try:
+            response = await asyncio.wait_for(
+                self._reader.readuntil(b'\r\n\r\n'), self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise WampyError(
+                'No response after handshake "{}"'.format(handshake)
+            )
+        except asyncio.IncompleteReadError as exc:
+            raise ConnectionError(
+                'Connection closed during the handshake: "{}"'.format(
+                    exc.partial.decode('utf-8', 'replace'))
+            )
+
+        lines = response.decode('utf-8', 'replace').split('\r\n')
+
+        status_info = lines[0].strip().split(" ", 2)
+        try:
+            status = int(status_info[1])
+        except (IndexError, ValueError):
+            raise WampProtocolError(
+                'Invalid handshake response: "{}"'.format(lines[0])
+            )
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip().lower()
+
+        if status != WEBSOCKET_SUCCESS_STATUS:
+            raise WampProtocolError(
+                'Upgrade refused by {}: "{}"'.format(self.url, lines[0])
+            )
+
+        self.status, self.headers = status, headers
+        logger.info("handshake complete: %s : %s", status, headers)
+
+    async def disconnect(self):
+        """ Close the connection, telling the server why if it is still
+        there to be told.
+        """
+        writer, self._writer = self._writer, None
+        if writer is None:
+            return
+
+        if not self._close_sent:
+            self._close_sent = True
+            try:
+                writer.write(ClientFrame(
+                    pack('!H', self.CLOSE_NORMAL),
+                    opcode=Frame.OPCODE_CLOSE).payload)
+            except Exception as exc:
+                logger.debug("failed to send CLOSE: %s", exc)
+
+        writer.close()
+        if hasattr(writer, 'wait_closed'):
+            try:
+                await writer.wait_closed()
+            except Exception as exc:
+                logger.debug("failed to close the connection: %s", exc)
+
+    async def send(self, message, binary=False):
+        """ Send a message to the server.
+
+        :Parameters:
+            message : string, bytes, bytearray or memoryview
+                Text is encoded as UTF-8.
+            binary : bool
+                Send a binary rather than a text message.
+
+        """
+        if self._writer is None:
+            raise ConnectionError("cannot send: not connected")
+
+        if not isinstance(message, (bytes, bytearray, memoryview)):
+            message = message.encode('utf-8')
+
+        opcode = Frame.OPCODE_BINARY if binary else Frame.OPCODE_TEXT
+        self._writer.write(ClientFrame(message, opcode=opcode).payload)
+
+        try:
+            await self._writer.drain()
+        except OSError as exc:
+            raise ConnectionError('error: "{}"'.format(exc))
+
+    async def receive(self):
+        """ Return the next message sent by the server. """
+        while True:
+            frame = await self._read_frame()
+
+            if frame.is_control:
+                self._handle_control_frame(frame)
+                continue
+
+            message = self.messages.reassemble(frame)
+            if message is not None:
+                return message
+
+    async def _read_exactly(self, length):
+        try:
+            return await self._reader.readexactly(length)
+        except asyncio.IncompleteReadError:
+            raise ConnectionError("Connection closed by the server")
+        except OSError as exc:
+            raise ConnectionError('error: "{}"'.format(exc))
+
+    async def _read_frame(self):
+        data = await self._read_exactly(2)
+
+        # the length of the payload may follow in 2 or 8 more bytes
+        indicator = data[1] & 0x7F
+        if indicator == 126:
+            data += await self._read_exactly(2)
+        elif indicator == 127:
+            data += await self._read_exactly(8)
+
+        header = FrameHeader.parse(data)
+        self.messages.check_message_size(header)
+
+        body = await self._read_exactly(header.payload_length)
+        return ServerFrame.from_body(
+            opcode=header.opcode, body=body, rsv1=header.rsv1,
+            fin=header.fin,
+        )
+
+    def _handle_control_frame(self, frame):
+        reply, error = self.messages.read_control_frame(frame)
+
+        if frame.opcode == Frame.OPCODE_PONG:
+            logger.debug("PONG received")
+
+        elif frame.opcode == Frame.OPCODE_CLOSE:
+            if not self._close_sent and self._writer is not None:
+                # echo the status code back, completing the closing
+                # handshake
+                self._close_sent = True
+                self._writer.write(reply.payload)
+
+        elif reply is not None:
+            self._writer.write(reply.payload)
+
+        if error is not None:
+            raise error
@@ -0,0 +1,90 @@
+""" The concurrency backends.
+
+wampy runs its listeners, writers and keepalives concurrently with the
+application, in green threads of eventlet by default. Whatever spawns,
+sleeps, queues, signals or times out does so through the backend, so
+that gevent or plain threads may be used instead. Choose one before any
+Client is created, by name::
+
+    from wampy.backends import set_backend
+
+    set_backend("gevent")
+
+or with the ``WAMPY_BACKEND`` environment variable.
+
+A backend is a module, or any other object, providing:
+
+- ``name``
+- ``spawn(func, *args, **kwargs)``, returning a thread with ``wait()``,
+  ``kill()`` and ``dead``
+- ``sleep(seconds=0)``
+- ``Queue``, with ``put``, ``get(block=True, timeout=None)``, ``qsize``
+  and ``empty``, raising ``Empty`` when a ``get`` times out
+- ``Event``, signalled once with ``send(result=None)`` or
+  ``send_exception(exc)``, for which ``wait()`` returns the result or
+  raises the exception, and ``ready()`` tells whether it has been
+- ``Semaphore(value=1)``, a context manager
+- ``Timeout(seconds=None, exception=None)``, an exception and a context
+  manager raising itself, or ``exception``, in the thread that created
+  it once ``seconds`` have passed, unless it is cancelled with
+  ``cancel()`` first. Given ``exception=False`` it is
+  silently swallowed when leaving the ``with`` block instead.
+- ``ThreadExit``, raised inside a thread when it is killed
+- ``socket`` and ``ssl``, modules of sockets that block no more than
+  the current thread, so that wampy works whether or not the standard
+  library has been patched
+- ``monkey_patch()``, patching the standard library to cooperate with
+  the backend's threads
+
+"""
+import importlib
+import os
+
+from wampy.errors import WampyError
+
+
+BACKENDS = {
+    'eventlet': 'wampy.backends.eventlet_backend',
+    'gevent': 'wampy.backends.gevent_backend',
+    'threading': 'wampy.backends.threading_backend',
+}
+
+DEFAULT_BACKEND = 'eventlet'
+
+_backend = None
+
+
+def get_backend():
+    """ Return the backend in use, choosing the one named by the
+    ``WAMPY_BACKEND`` environment variable, else eventlet, if none has
+    been chosen yet.
+    """
+    if _backend is None:
+        set_backend(os.environ.get('WAMPY_BACKEND', DEFAULT_BACKEND))
+
+    return _backend
+
+
+def set_backend(backend):
+    """ Use ``backend``, the name of one of the ``BACKENDS`` or a backend
+    of your own, from now on, returning it.
+
+    Connections keep the backend they were created with, so choose one
+    before creating any Client.
+
+    """
+    global _backend
+
+    if isinstance(backend, str):
+        try:
+            module_name = BACKENDS[backend]
+        except KeyError:
+            raise WampyError(
+                "unknown backend: {}. Choose from: {}".format(
+                    backend, ", ".join(sorted(BACKENDS)))
+            )
+
+        backend = importlib.import_module(module_name)
+
+    _backend = backend
+    return backend
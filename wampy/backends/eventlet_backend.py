@@ -0,0 +1,47 @@
+""" Green threads of eventlet. The API of the other backends is modelled
+on this one, which is little more than eventlet itself.
+"""
+import logging
+
+import eventlet
+from eventlet import greenthread, hubs
+from eventlet.event import Event  # noqa
+from eventlet.green import socket, ssl  # noqa
+from eventlet.queue import Empty, Queue  # noqa
+from eventlet.semaphore import Semaphore  # noqa
+from eventlet.timeout import Timeout  # noqa
+from greenlet import GreenletExit as ThreadExit  # noqa
+
+logger = logging.getLogger(__name__)
+
+
+name = 'eventlet'
+
+
+class GreenThread(greenthread.GreenThread):
+
+    def kill(self, *throw_args):
+        if not self and not self.dead:
+            # greenlet 2 fails to throw into a greenlet that has not
+            # started yet, as eventlet does: let it start first
+            eventlet.sleep()
+
+        return super(GreenThread, self).kill(*throw_args)
+
+
+def spawn(func, *args, **kwargs):
+    # as ``eventlet.spawn``, but of a thread that may be killed whether
+    # or not it has started
+    hub = hubs.get_hub()
+    thread = GreenThread(hub.greenlet)
+    hub.schedule_call_global(0, thread.switch, func, args, kwargs)
+    return thread
+
+
+def sleep(seconds=0):
+    eventlet.sleep(seconds)
+
+
+def monkey_patch():
+    logger.warning('eventlet about to monkey patched your environment')
+    eventlet.monkey_patch()
@@ -0,0 +1,59 @@
+""" Greenlets of gevent, adapted to the API of eventlet.
+"""
+import logging
+
+import gevent
+import gevent.event
+import gevent.monkey
+from gevent import GreenletExit as ThreadExit  # noqa
+from gevent import socket, ssl  # noqa
+from gevent.lock import Semaphore  # noqa
+from gevent.queue import Empty, Queue  # noqa
+
+logger = logging.getLogger(__name__)
+
+
+name = 'gevent'
+
+
+class GreenThread(gevent.Greenlet):
+
+    def wait(self):
+        """ Return what the greenlet returned, else raise what it raised.
+        """
+        return self.get()
+
+
+class Timeout(gevent.Timeout):
+
+    def __init__(self, seconds=None, exception=None):
+        """ Start timing out, as an eventlet ``Timeout`` does, rather than
+        waiting to be started.
+        """
+        super(Timeout, self).__init__(seconds, exception)
+        self.start()
+
+
+class Event(gevent.event.AsyncResult):
+
+    def send(self, result=None):
+        self.set(result)
+
+    def send_exception(self, exc):
+        self.set_exception(exc)
+
+    def wait(self):
+        return self.get()
+
+
+def spawn(func, *args, **kwargs):
+    return GreenThread.spawn(func, *args, **kwargs)
+
+
+def sleep(seconds=0):
+    gevent.sleep(seconds)
+
+
+def monkey_patch():
+    logger.warning('gevent about to monkey patched your environment')
+    gevent.monkey.patch_all()
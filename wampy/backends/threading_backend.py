@@ -0,0 +1,234 @@
+""" Plain threads, adapted to the API of eventlet.
+
+Threads cannot be interrupted, so a ``Timeout`` only expires while the
+thread that started it is waiting through this backend - sleeping,
+waiting on an ``Event`` or another thread, or getting from a ``Queue`` -
+and not, for instance, while it is blocked reading from a socket. Nor
+can threads be killed: ``kill`` stops no more than the waiting for the
+thread, which carries on until whatever it is blocked on fails, as it
+does once its connection is closed. Threads are daemons, so they never
+keep the process alive.
+
+"""
+import logging
+import socket  # noqa
+import ssl  # noqa
+import threading
+import time
+
+try:
+    from Queue import Empty, Queue as _Queue
+except ImportError:
+    from queue import Empty, Queue as _Queue
+
+logger = logging.getLogger(__name__)
+
+
+name = 'threading'
+
+# how often a thread waiting on another checks for its ``Timeout``, and
+# for KeyboardInterrupt, which Python 2 does not deliver during a join
+JOIN_INTERVAL = 0.1
+
+_local = threading.local()
+
+
+class ThreadExit(BaseException):
+    """ Never raised: threads cannot be killed. """
+
+
+class Timeout(BaseException):
+
+    def __init__(self, seconds=None, exception=None):
+        """ Start timing out the current thread after ``seconds``.
+        """
+        BaseException.__init__(self, seconds)
+
+        self.seconds = seconds
+        self.exception = exception
+
+        self.deadline = None
+        if seconds is not None:
+            self.deadline = time.time() + seconds
+            _timeouts().append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        self.cancel()
+        return exception_value is self and self.exception is False
+
+    def __str__(self):
+        return "{} seconds".format(self.seconds)
+
+    def cancel(self):
+        timeouts = _timeouts()
+        if self in timeouts:
+            timeouts.remove(self)
+
+    def expire(self):
+        self.cancel()
+
+        if self.exception is None or self.exception is False:
+            raise self
+        raise self.exception
+
+
+def _timeouts():
+    try:
+        return _local.timeouts
+    except AttributeError:
+        _local.timeouts = []
+        return _local.timeouts
+
+
+def _next_timeout():
+    timeouts = _timeouts()
+    if not timeouts:
+        return None
+
+    return min(timeouts, key=lambda timeout: timeout.deadline)
+
+
+def _remaining():
+    """ Return the seconds left until the next ``Timeout`` of the current
+    thread, raising it if there are none left.
+    """
+    timeout = _next_timeout()
+    if timeout is None:
+        return None
+
+    remaining = timeout.deadline - time.time()
+    if remaining <= 0:
+        timeout.expire()
+
+    return remaining
+
+
+def _check():
+    _remaining()
+
+
+def _shortest(timeout, remaining):
+    if remaining is None:
+        return timeout
+    if timeout is None:
+        return remaining
+    return min(timeout, remaining)
+
+
+class Thread(object):
+
+    def __init__(self, func, args, kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+
+        self._result = None
+        self._exception = None
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+    @property
+    def dead(self):
+        return not self._thread.is_alive()
+
+    def wait(self):
+        """ Return what the thread returned, else raise what it raised.
+        """
+        while self._thread.is_alive():
+            self._thread.join(_shortest(JOIN_INTERVAL, _remaining()))
+            _check()
+
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def kill(self):
+        logger.debug("threads cannot be killed: leaving %s", self.func)
+
+    def _run(self):
+        try:
+            self._result = self.func(*self.args, **self.kwargs)
+        except BaseException as exc:
+            self._exception = exc
+            logger.debug("%s raised: %s", self.func, exc)
+
+
+class Event(object):
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._ready = False
+        self._result = None
+        self._exc = None
+
+    def ready(self):
+        return self._ready
+
+    def send(self, result=None):
+        with self._condition:
+            self._result = result
+            self._ready = True
+            self._condition.notify_all()
+
+    def send_exception(self, exc):
+        with self._condition:
+            self._exc = exc
+            self._ready = True
+            self._condition.notify_all()
+
+    def wait(self):
+        with self._condition:
+            while not self._ready:
+                self._condition.wait(_shortest(JOIN_INTERVAL, _remaining()))
+                _check()
+
+        if self._exc is not None:
+            raise self._exc
+        return self._result
+
+
+class Queue(_Queue):
+
+    def get(self, block=True, timeout=None):
+        expiring = _next_timeout()
+        if not block or expiring is None:
+            return _Queue.get(self, block, timeout)
+
+        remaining = max(0, expiring.deadline - time.time())
+        if timeout is not None and timeout < remaining:
+            return _Queue.get(self, block, timeout)
+
+        try:
+            return _Queue.get(self, block, remaining)
+        except Empty:
+            expiring.expire()
+
+
+Semaphore = threading.Semaphore
+
+
+def spawn(func, *args, **kwargs):
+    thread = Thread(func, args, kwargs)
+    thread.start()
+    return thread
+
+
+def sleep(seconds=0):
+    expiring = _next_timeout()
+    if expiring is not None and expiring.deadline <= time.time() + seconds:
+        time.sleep(max(0, expiring.deadline - time.time()))
+        expiring.expire()
+
+    time.sleep(seconds)
+
+
+def monkey_patch():
+    # nothing to patch
+    pass
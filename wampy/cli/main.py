@@ -1,5 +1,7 @@
 import argparse
 
+import wampy
+
 from . import run
 
 
@@ -18,6 +20,9 @@ def setup_parser():
 
 
 def main():
+    # the applications run are written as if on green threads
+    wampy.monkey_patch()
+
     parser = setup_parser()
     args = parser.parse_args()
     args.main(args)
@@ -15,6 +15,8 @@ ROLES = [
 
 # Basic Profile
 DEFAULT_REALM = "realm1"
+# request IDs are drawn sequentially from [1, 2^53], per Session
+MAX_REQUEST_ID = 2 ** 53
 DEFAULT_ROLES = {
     'roles': {
         'subscriber': {},
@@ -1,3 +1,7 @@
+class CallCanceledError(Exception):
+    pass
+
+
 class ConfigurationError(Exception):
     pass
 
@@ -15,6 +19,10 @@ class MessageRouterConnectionError(Exception):
     pass
 
 
+class SendQueueFullError(Exception):
+    pass
+
+
 class SessionError(Exception):
     pass
 
@@ -37,3 +45,16 @@ class WampError(Exception):
 
 class WampyError(Exception):
     pass
+
+
+class CallError(WampProtocolError, WampError):
+    """ The ERROR a CALL has been answered with: the error's ``uri``,
+    and its ``error_args`` and ``error_kwargs``, if any.
+    """
+    def __init__(self, uri, args=None, kwargs=None):
+        self.uri = uri
+        self.error_args = args or []
+        self.error_kwargs = kwargs or {}
+
+        super(CallError, self).__init__(
+            "{} {} {}".format(uri, self.error_args, self.error_kwargs))
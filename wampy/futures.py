@@ -0,0 +1,187 @@
+""" Futures of the replies to requests, and conditions to wait on.
+
+Every request a Session sends with ``Session.request`` - a CALL, say -
+is entered in its table of pending requests under its request ID, with
+a ``Future`` for the reply. The thread listening on the connection
+resolves the Future with the RESULT or ERROR carrying the same request
+ID, however many requests are outstanding and in whatever order their
+replies arrive, so concurrent callers never receive each other's
+replies. A reply arriving for a request that has been given up on is
+dropped rather than handed to whoever asks next.
+
+A request may be given a deadline, after which its Future is abandoned
+whether or not anyone is waiting on it, so its entry in the table is
+dropped along with any late reply.
+
+Whatever else is waited for - a WELCOME, a number of registrations - is
+waited for on a ``Condition``, which sleeps until it is notified of a
+change rather than polling for one.
+
+"""
+import logging
+import time
+
+from wampy.backends import get_backend
+from wampy.errors import WampProtocolError
+
+logger = logging.getLogger(__name__)
+
+
+class Future(object):
+
+    def __init__(
+            self, request_id, on_abandon=None, deadline=None,
+            on_progress=None,
+    ):
+        """ The reply, once it arrives, to the request ``request_id``.
+
+        :Parameters:
+            on_abandon : callable
+                Called with the Future when no reply is waited for any
+                longer, to forget the request.
+            deadline : float
+                The ``time.time()`` after which no reply is waited for.
+            on_progress : callable
+                Called with each progressive RESULT arriving before the
+                reply, in the thread listening on the connection.
+
+        """
+        self.request_id = request_id
+        self.on_abandon = on_abandon
+        self.deadline = deadline
+        self.on_progress = on_progress
+
+        self.backend = get_backend()
+        self._event = self.backend.Event()
+        self._callbacks = []
+
+    def __repr__(self):
+        return "<Future for request {}{}>".format(
+            self.request_id, " (done)" if self.done() else "")
+
+    def done(self):
+        return self._event.ready()
+
+    def set_result(self, message):
+        if not self.done():
+            self._event.send(message)
+            self._run_callbacks()
+
+    def set_exception(self, exc):
+        if not self.done():
+            self._event.send_exception(exc)
+            self._run_callbacks()
+
+    def set_progress(self, message):
+        if not self.done() and self.on_progress is not None:
+            self.on_progress(message)
+
+    def add_done_callback(self, callback):
+        """ Call ``callback`` with the Future once it is done, in the
+        thread that resolves it, or at once if it already is.
+        """
+        if self.done():
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def result(self, timeout=None):
+        """ Return the reply, waiting for at most ``timeout`` seconds, or
+        else until the deadline, for it to arrive, else raise
+        ``WampProtocolError``.
+
+        The request is only given up on once its deadline has passed: it
+        is still pending after a shorter ``timeout``.
+
+        """
+        if timeout is None and self.deadline is not None:
+            timeout = max(self.deadline - time.time(), 0)
+
+        if not self.done():
+            timer = self.backend.Timeout(timeout)
+            try:
+                self._event.wait()
+            except self.backend.Timeout as exc:
+                if exc is not timer:
+                    raise
+
+                if not self.expired():
+                    raise WampProtocolError(
+                        "no reply to request {} after {} seconds".format(
+                            self.request_id, timeout)
+                    )
+
+                self.abandon(WampProtocolError(
+                    "no reply to request {} by its deadline".format(
+                        self.request_id)
+                ))
+            finally:
+                timer.cancel()
+
+        return self._event.wait()
+
+    def expired(self, now=None):
+        """ Whether the deadline has passed. """
+        if self.deadline is None:
+            return False
+
+        return (time.time() if now is None else now) >= self.deadline
+
+    def abandon(self, exc):
+        """ Stop waiting for the reply, failing the Future with ``exc``.
+        """
+        self.set_exception(exc)
+
+        if self.on_abandon is not None:
+            self.on_abandon(self)
+
+    def _run_callbacks(self):
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                logger.exception("callback of %s failed", self)
+
+
+class Condition(object):
+
+    def __init__(self):
+        """ Something that changes, for waiting until it has changed
+        enough, e.g. the state of a Session as it processes messages.
+        """
+        self.backend = get_backend()
+        # an ``Event`` per thread waiting for the next change
+        self._waiters = []
+
+    def notify_all(self):
+        """ Wake every thread waiting for a change. """
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            waiter.send()
+
+    def wait_for(self, predicate, timeout=None):
+        """ Wait until ``predicate()`` is true, checking it whenever the
+        Condition is notified, for at most ``timeout`` seconds. Return
+        the last value of ``predicate()``.
+        """
+        timer = self.backend.Timeout(timeout)
+        try:
+            while True:
+                result = predicate()
+                if result:
+                    return result
+
+                waiter = self.backend.Event()
+                self._waiters.append(waiter)
+                # unless it changed before the waiter was in place
+                if predicate():
+                    continue
+
+                waiter.wait()
+        except self.backend.Timeout as exc:
+            if exc is not timer:
+                raise
+            return predicate()
+        finally:
+            timer.cancel()
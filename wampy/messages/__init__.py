@@ -1,7 +1,9 @@
 from . call import Call
+from . cancel import Cancel
 from . error import Error
 from . event import Event
 from . hello import Hello
+from . interrupt import Interrupt
 from . invocation import Invocation
 from . goodbye import Goodbye
 from . message import Message
@@ -16,8 +18,9 @@ from . welcome import Welcome
 
 
 __all__ = [
-    Call, Error, Event, Goodbye, Hello, Invocation, Message, Publish,
-    Register, Registered, Result, Subscribe, Subscribed, Welcome, Yield
+    Call, Cancel, Error, Event, Goodbye, Hello, Interrupt, Invocation,
+    Message, Publish, Register, Registered, Result, Subscribe, Subscribed,
+    Welcome, Yield
 ]
 
 
@@ -32,11 +35,13 @@ MESSAGE_TYPE_MAP = {
     33: 'SUBSCRIBED',
     36: 'EVENT',
     48: 'CALL',
+    49: 'CANCEL',
     50: 'RESULT',
     64: 'REGISTER',
     65: 'REGISTERED',
     66: 'UNREGISTER',
     67: 'UNREGISTERED',
     68: 'INVOCATION',
+    69: 'INTERRUPT',
     70: 'YIELD',
 }
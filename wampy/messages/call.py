@@ -1,5 +1,3 @@
-import random
-
 from wampy.messages.message import Message
 
 
@@ -15,8 +13,9 @@ class Call(Message):
             CALL, 10001, {}, "com.myapp.myprocedure1", [], {}
         ]
 
-    "Request" is a random, ephemeral ID chosen by the Callee and
-    used to correlate the Dealer's response with the request.
+    "Request" is an ID, sequential within the Session, chosen when the
+    message is sent and used to correlate the Dealer's response with the
+    request.
 
     "Options" is a dictionary that allows to provide additional
     registration request details in a extensible way.
@@ -31,7 +30,8 @@ class Call(Message):
         self.options = options or {}
         self.args = args or []
         self.kwargs = kwargs or {}
-        self.request_id = random.getrandbits(32)
+        # assigned by the Session sending the message
+        self.request_id = None
         self.message = [
             Message.CALL, self.request_id, self.options, self.procedure,
             self.args, self.kwargs
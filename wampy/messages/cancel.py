@@ -0,0 +1,42 @@
+from wampy.messages.message import Message
+
+
+class Cancel(Message):
+    """ When a Caller wishes to cancel a call it has made, it sends a
+    "CANCEL" message to the Dealer.
+
+    Message is of the format ``[CANCEL, CALL.Request|id, Options|dict]``,
+    e.g. ::
+
+        [
+            CANCEL, 10001, {"mode": "kill"}
+        ]
+
+    "mode" is one of:
+
+    - "skip": the Dealer replies to the Caller with an ERROR at once,
+      and lets the Callee carry on.
+    - "kill": the Dealer sends the Callee an INTERRUPT, and replies to
+      the Caller once the Callee has stopped.
+    - "killnowait": the Dealer sends the Callee an INTERRUPT, and replies
+      to the Caller at once.
+
+    """
+    WAMP_CODE = 49
+    MODES = ("skip", "kill", "killnowait")
+    DEFAULT_MODE = "kill"
+
+    def __init__(self, request_id, mode=DEFAULT_MODE):
+        super(Cancel, self).__init__()
+
+        if mode not in self.MODES:
+            raise ValueError(
+                "mode must be one of {}, not {}".format(
+                    ", ".join(self.MODES), mode)
+            )
+
+        self.request_id = request_id
+        self.options = {"mode": mode}
+        self.message = [
+            Message.CANCEL, self.request_id, self.options,
+        ]
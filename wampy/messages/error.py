@@ -7,11 +7,37 @@ logger = logging.getLogger('wampy.messages.error')
 
 
 class Error(Message):
+    """ The reply to a request that failed, e.g. ::
+
+        [ERROR, REQUEST.Type|int, REQUEST.Request|id, Details|dict,
+         Error|uri, Arguments|list, ArgumentsKw|dict]
+
+    where "Arguments" and "ArgumentsKw" are optional.
+
+    """
     WAMP_CODE = 8
 
-    def __init__(self, wamp_code, *args, **kwargs):
+    def __init__(
+            self, wamp_code, request_type, request_id, details=None,
+            error=None, args=None, kwargs=None,
+    ):
         assert wamp_code == self.WAMP_CODE
 
+        super(Error, self).__init__()
+
+        self.request_type = request_type
+        self.request_id = request_id
+        self.details = details or {}
+        self.error = error
+        self.args = args
+        self.kwargs = kwargs
+
+        self.message = [
+            Message.ERROR, self.request_type, self.request_id, self.details,
+            self.error,
+        ]
+        if args is not None or kwargs is not None:
+            self.message.extend([self.args or [], self.kwargs or {}])
+
     def process(self, message, client=None):
-        _, _, _, _, _, errors = message
-        logger.error(errors)
+        logger.error("%s: %s", self.error, message[5:])
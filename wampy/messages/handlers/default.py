@@ -1,9 +1,9 @@
 import logging
 
-from wampy.messages import MESSAGE_TYPE_MAP
+from wampy.messages import MESSAGE_TYPE_MAP, Message
 from wampy.messages import (
-    Goodbye, Error, Event, Invocation, Registered, Result, Subscribed,
-    Welcome, Yield)
+    Goodbye, Error, Event, Interrupt, Invocation, Registered, Result,
+    Subscribed, Welcome, Yield)
 from wampy.errors import WampyError
 
 logger = logging.getLogger('wampy.messagehandler')
@@ -28,14 +28,15 @@ class MessageHandler(object):
             # Goodbye: mandatory because GOODBYE is echoed by the Router
             # Registered: a client is likely to be a Callee
             # Invocation: same as above
+            # Interrupt: to stop an Invocation when its call is canceled
             # Yield: and again
             # Result: a client is likely to be a Caller
             # Error: for debugging clients
             # Subscribed: because a client is likely to be a Subscriber
             # Event: sames as above
             self.messages_to_handle = [
-                Welcome, Goodbye, Registered, Invocation, Yield, Result,
-                Error, Subscribed, Event
+                Welcome, Goodbye, Registered, Invocation, Interrupt, Yield,
+                Result, Error, Subscribed, Event
             ]
         else:
             for message in messages_to_handle:
@@ -58,6 +59,15 @@ class MessageHandler(object):
     def handle_message(self, message, context=None, meta=None):
         wamp_code = message[0]
         if wamp_code not in self.messages:
+            if wamp_code == Message.INTERRUPT:
+                # the Dealer may interrupt any invocation: a handler that
+                # can't must not fail, and end the Session, because of it
+                logger.warning(
+                    "ignoring INTERRUPT of invocation %s: no message "
+                    "handler is configured for it", message[1],
+                )
+                return
+
             raise WampyError(
                 "No message handler is configured for: {}".format(
                     MESSAGE_TYPE_MAP[wamp_code])
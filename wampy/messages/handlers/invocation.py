@@ -2,7 +2,7 @@ import logging
 
 from wampy.messages.invocation import InvocationWithMeta
 from wampy.messages import MESSAGE_TYPE_MAP
-from wampy.messages import Goodbye, Error, Registered, Welcome
+from wampy.messages import Goodbye, Error, Interrupt, Registered, Welcome
 from wampy.errors import WampyError
 
 from . default import MessageHandler
@@ -15,7 +15,8 @@ class InvokeWithMetaMessageHandler(MessageHandler):
     def __init__(self, client):
         super(InvokeWithMetaMessageHandler, self).__init__(
             client=client, messages_to_handle=[
-                InvocationWithMeta, Welcome, Registered, Goodbye, Error]
+                InvocationWithMeta, Interrupt, Welcome, Registered,
+                Goodbye, Error]
         )
 
     def handle_message(self, message, context=None, meta=None):
@@ -0,0 +1,56 @@
+import logging
+
+from wampy.messages.message import Message
+
+logger = logging.getLogger(__name__)
+
+
+class Interrupt(Message):
+    """ A Dealer asks a Callee to stop an invocation, for a call its
+    Caller has canceled, by sending an "INTERRUPT" message.
+
+       [INTERRUPT, INVOCATION.Request|id, Options|dict]
+
+    The thread running the invocation is killed, and the Dealer told so
+    with an ERROR, "wamp.error.canceled".
+
+    """
+    WAMP_CODE = 69
+    CANCELED = "wamp.error.canceled"
+
+    def __init__(self, wamp_code, request_id, options=None):
+        assert wamp_code == self.WAMP_CODE
+
+        self.request_id = request_id
+        self.options = options or {}
+
+        self.message = [
+            self.WAMP_CODE, self.request_id, self.options,
+        ]
+
+    def process(self, message, client):
+        session = client.session
+        # the invocation has been answered already unless it's there
+        missing = object()
+        with session.invocations_lock:
+            thread = session.invocations.pop(self.request_id, missing)
+        if thread is missing:
+            logger.debug(
+                "ignoring INTERRUPT of invocation %s: it is done",
+                self.request_id,
+            )
+            return
+
+        logger.info(
+            "interrupting invocation %s (%s)",
+            self.request_id, self.options.get("mode"),
+        )
+
+        if thread is not None:
+            thread.kill()
+
+        from wampy.messages import Error
+        session.send_message(Error(
+            Message.ERROR, Message.INVOCATION, self.request_id, {},
+            self.CANCELED,
+        ))
@@ -1,3 +1,4 @@
+import inspect
 import logging
 
 from wampy.messages.message import Message
@@ -17,9 +18,22 @@ class Invocation(Message):
        [INVOCATION, Request|id, REGISTERED.Registration|id,
            Details|dict, CALL.Arguments|list, CALL.ArgumentsKw|dict]
 
+    The endpoint runs as the INVOCATION arrives, unless the Client has
+    been told to run invocations concurrently: then it runs in a thread
+    of its own, so that the Session carries on listening meanwhile, and
+    an INTERRUPT can kill it.
+
+    An endpoint returning a generator streams its results, each in a
+    progressive YIELD, when the Caller has asked for progressive results
+    ("receive_progress"), else they are all yielded at once, in a list.
+
+    An INVOCATION for a registration the Client does not know of is
+    answered with an ERROR, "wamp.error.no_such_registration".
+
     """
 
     WAMP_CODE = 68
+    NO_SUCH_REGISTRATION = "wamp.error.no_such_registration"
 
     def __init__(
             self, wamp_code, request_id, registration_id, details,
@@ -62,13 +76,49 @@ class Invocation(Message):
                 _, request_id, registration_id, details, args, kwargs = (
                     message)
 
-        self.procedure_name = client.registration_map[registration_id]
+        try:
+            self.procedure_name = client.registration_map[registration_id]
+        except KeyError:
+            logger.warning(
+                "INVOCATION for no registration: %s", registration_id)
+            from wampy.messages import Error
+            self.session.send_message(Error(
+                Message.ERROR, Message.INVOCATION, request_id, {},
+                self.NO_SUCH_REGISTRATION,
+            ))
+            return
+
         entrypoint = getattr(client, self.procedure_name)
 
         self.update_kwargs(kwargs)
 
+        invocations = self.session.invocations
+        lock = self.session.invocations_lock
+        # in case the thread is done before it's known
+        with lock:
+            invocations[request_id] = None
+
+        if not client.concurrent_invocations:
+            self.invoke(request_id, entrypoint, args, kwargs)
+            return
+
+        thread = self.session.backend.spawn(
+            self.invoke, request_id, entrypoint, args, kwargs)
+        with lock:
+            if request_id in invocations:
+                invocations[request_id] = thread
+
+    def invoke(self, request_id, entrypoint, args, kwargs):
+        streamed = False
         try:
             resp = entrypoint(*args, **kwargs)
+            if inspect.isgenerator(resp):
+                if self.details.get('receive_progress'):
+                    self.send_progress(request_id, resp)
+                    streamed = True
+                    resp = None
+                else:
+                    resp = list(resp)
         except Exception as exc:
             logger.exception("error calling: %s", self.procedure_name)
             resp = None
@@ -84,7 +134,15 @@ class Invocation(Message):
         result_kwargs['meta']['procedure_name'] = self.procedure_name
         result_kwargs['meta']['session_id'] = self.session.id
 
-        result_args = [resp]
+        # the results have all been yielded already if streamed
+        result_args = [] if streamed else [resp]
+
+        with self.session.invocations_lock:
+            try:
+                del self.session.invocations[request_id]
+            except KeyError:
+                # interrupted: the Dealer has been answered already
+                return
 
         from wampy.messages import Yield
         yield_message = Yield(
@@ -95,6 +153,21 @@ class Invocation(Message):
         logger.info("yielding response: %s", yield_message)
         self.session.send_message(yield_message)
 
+    def send_progress(self, request_id, results):
+        """ Send each of ``results`` in a progressive YIELD as soon as it
+        is produced.
+        """
+        from wampy.messages import Yield
+        for result in results:
+            if request_id not in self.session.invocations:
+                # interrupted
+                return
+
+            self.session.send_message(Yield(
+                request_id, options={'progress': True},
+                result_args=[result],
+            ))
+
 
 class InvocationWithMeta(Invocation):
 
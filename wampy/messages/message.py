@@ -33,6 +33,8 @@ class Message(object):
     RESULT = 50
 
     CALL = 48
+    CANCEL = 49
+    INTERRUPT = 69
     YIELD = 70
 
     def __init__(self):
@@ -41,6 +43,13 @@ class Message(object):
     def process(self, message, client):
         pass
 
+    def set_request_id(self, request_id):
+        """ Set the ID of a request, such as a CALL, which is the second
+        element of the message, e.g. ``[CALL, Request|id, ...]``.
+        """
+        self.request_id = request_id
+        self.message[1] = request_id
+
     def serialize(self):
         if self.message is None:
             raise MessageError(
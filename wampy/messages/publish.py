@@ -1,5 +1,3 @@
-import random
-
 from wampy.messages.message import Message
 
 
@@ -22,7 +20,8 @@ class Publish(Message):
 
         self.topic = topic
         self.options = options
-        self.request_id = random.getrandbits(32)
+        # assigned by the Session sending the message
+        self.request_id = None
         self.args = args
         self.kwargs = kwargs
         self.message = [
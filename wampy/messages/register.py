@@ -1,5 +1,3 @@
-import random
-
 from wampy.messages.message import Message
 
 
@@ -14,8 +12,9 @@ class Register(Message):
             REGISTER, 25349185, {}, "com.myapp.myprocedure1"
         ]
 
-    "Request" is a random, ephemeral ID chosen by the Callee and
-    used to correlate the Dealer's response with the request.
+    "Request" is an ID, sequential within the Session, chosen when the
+    message is sent and used to correlate the Dealer's response with the
+    request.
 
     "Options" is a dictionary that allows to provide additional
     registration request details in a extensible way.
@@ -28,7 +27,8 @@ class Register(Message):
 
         self.procedure = procedure
         self.options = options or {}
-        self.request_id = random.getrandbits(32)
+        # assigned by the Session sending the message
+        self.request_id = None
         self.message = [
             Message.REGISTER, self.request_id, self.options,
             self.procedure
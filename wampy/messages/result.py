@@ -41,5 +41,6 @@ class Result(Message):
         ]
 
     def process(self, message, client):
-        logger.info("RESULT received: %s", message)
-        client.session._message_queue.put(message)
+        # the RESULT of a pending CALL resolves the Future of its reply
+        # before it gets here, so this one is too late or unasked for
+        logger.warning("RESULT for no pending CALL: %s", message)
@@ -1,5 +1,3 @@
-import random
-
 from wampy.messages.message import Message
 
 
@@ -21,7 +19,8 @@ class Subscribe(Message):
 
         self.topic = topic
         self.options = options or {}
-        self.request_id = random.getrandbits(32)
+        # assigned by the Session sending the message
+        self.request_id = None
         self.message = [
             self.WAMP_CODE, self.request_id, self.options, self.topic
         ]
@@ -37,3 +37,4 @@ class Welcome(Message):
             )
 
         session.session_id = session_id
+        session.router_details = self.details
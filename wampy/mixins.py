@@ -1,4 +1,7 @@
-from urlparse import urlsplit
+try:
+    from urlparse import urlsplit
+except ImportError:  # Python 3
+    from urllib.parse import urlsplit
 
 
 class ParseUrlMixin(object):
@@ -8,6 +11,10 @@ class ParseUrlMixin(object):
         - ws://host[:port][path]
         - wss://host[:port][path]
         - ws+unix:///path/to/my.socket
+        - rs://host:port
+        - rs+unix:///path/to/my.socket
+
+        ``rs`` is a WAMP RawSocket, for which there is no default port.
 
         """
         scheme, url = self.url.split(":", 1)
@@ -28,8 +35,11 @@ class ParseUrlMixin(object):
         elif scheme == "wss":
             if not self.port:
                 self.port = 443
-        elif scheme in ('ws+unix', 'wss+unix'):
+        elif scheme in ('ws+unix', 'wss+unix', 'rs+unix'):
             pass
+        elif scheme == "rs":
+            if not parsed.port:
+                raise ValueError("A port is required by: %s" % self.url)
         else:
             raise ValueError("Invalid scheme: %s" % scheme)
 
@@ -7,7 +7,9 @@ from wampy.messages import MESSAGE_TYPE_MAP
 from wampy.messages.handlers import MessageHandler
 from wampy.messages.register import Register
 from wampy.messages.subscribe import Subscribe
-from wampy.roles.caller import CallProxy, RpcProxy
+from wampy.roles.caller import (
+    DEFAULT_CALL_TIMEOUT, DEFAULT_CONCURRENCY, CallProxy, RpcProxy,
+    call_many, send_call)
 from wampy.roles.publisher import PublishProxy
 
 logger = logging.getLogger("wampy.clients")
@@ -23,17 +25,49 @@ class Client(object):
             'publisher': {},
             'callee': {
                 'shared_registration': True,
+                'features': {
+                    'call_canceling': True,
+                },
+            },
+            'caller': {
+                'features': {
+                    'call_canceling': True,
+                    'progressive_call_results': True,
+                },
             },
-            'caller': {},
         },
     }
 
     def __init__(
             self, router, roles=None, message_handler=None,
-            transport="websocket", use_tls=False,
+            transport="websocket", use_tls=False, transport_options=None,
+            call_timeout=DEFAULT_CALL_TIMEOUT, concurrent_invocations=False,
     ):
+        """ A WAMP Client.
+
+        :Parameters:
+            router : instance
+                An instance of :class:`peers.Router`.
+            transport_options : dict
+                Keyword arguments for the transport, e.g.
+                ``max_message_size`` and ``fragment_size`` for the
+                websocket transport.
+            call_timeout : float
+                How many seconds a CALL has to complete, unless it is
+                given a timeout of its own, or None to wait for ever.
+            concurrent_invocations : bool
+                Run each INVOCATION of a Callee in a thread of its own,
+                so that an endpoint doesn't hold up those invoked after
+                it, and an INTERRUPT can stop it. Only for endpoints that
+                are safe to run concurrently, and to be killed part way
+                through. Defaults to ``False``: invocations run one at a
+                time, as they arrive, and can't be interrupted.
+
+        """
 
         self.roles = roles or self.DEFAULT_ROLES
+        self.call_timeout = call_timeout
+        self.concurrent_invocations = concurrent_invocations
         # only support one realm per Router, and we implicitly assume that
         # is the one a client is interested in here. this possibly could be
         # improved....
@@ -45,6 +79,7 @@ class Client(object):
             router=router,
             transport=transport,  # TODO transport should wrap tls an ipv
             use_tls=use_tls,
+            transport_options=transport_options,
         )
 
         self.request_ids = {}
@@ -83,9 +118,64 @@ class Client(object):
     def recv_message(self):
         return self.session.recv_message()
 
-    def send_message_and_wait_for_response(self, message):
-        self.session.send_message(message)
-        return self.session.recv_message()
+    def send_message_and_wait_for_response(self, message, timeout=5):
+        """ Send a request, such as a CALL, and return the reply to it,
+        given up on after ``timeout`` seconds.
+        """
+        return self.session.request(message, timeout=timeout).result()
+
+    def call_async(self, procedure, *args, **kwargs):
+        """ Call ``procedure`` without waiting for its result, returning
+        a :class:`roles.caller.CallFuture` of it, e.g. ::
+
+            futures = [client.call_async("add", n, 1) for n in range(10)]
+            results = [future.result() for future in futures]
+
+        """
+        return send_call(self, procedure, args, kwargs)
+
+    def call_many(
+            self, procedure, iterable_of_args,
+            concurrency=DEFAULT_CONCURRENCY, ordered=True, timeout=None,
+    ):
+        """ Call ``procedure`` with each of ``iterable_of_args``, keeping
+        up to ``concurrency`` CALLs in flight, and yield their results,
+        e.g. ::
+
+            for binary in client.call_many("get_binary", range(10000)):
+                print(binary)
+
+        See :func:`roles.caller.call_many`.
+
+        """
+        return call_many(
+            self, procedure, iterable_of_args, concurrency=concurrency,
+            ordered=ordered, timeout=timeout,
+        )
+
+    def call_stream(self, procedure, *args, **kwargs):
+        """ Call ``procedure``, asking for progressive results, and
+        iterate over them as they arrive, e.g. ::
+
+            for row in client.call_stream("com.example.rows", "table"):
+                print(row)
+
+        Callees stream results by returning a generator, e.g. ::
+
+            @callee
+            def rows(self, table):
+                for row in self.database.query(table):
+                    yield row
+
+        Unlike other calls, a stream has no deadline, not even the
+        ``call_timeout``, unless given one with
+        ``client.call.with_timeout(seconds).stream(...)``.
+
+        See :func:`roles.caller.call_stream` for what happens when
+        results arrive faster than they are consumed.
+
+        """
+        return self.call.stream(procedure, *args, **kwargs)
 
     def process_message(self, message):
         logger.info("client processing %s", MESSAGE_TYPE_MAP[message[0]])
@@ -130,7 +220,6 @@ class Client(object):
     def _subscribe_to_topic(self, topic, handler):
         subscriber_name = handler.func_name
         message = Subscribe(topic=topic)
-        request_id = message.request_id
 
         try:
             self.session.send_message(message)
@@ -140,7 +229,7 @@ class Client(object):
                     topic, exc)
             )
 
-        self.request_ids[request_id] = message, subscriber_name
+        self.request_ids[message.request_id] = message, subscriber_name
 
         logger.info(
             'registered handler "%s" for topic "%s"',
@@ -155,7 +244,6 @@ class Client(object):
 
         options = {"invoke": invocation_policy}
         message = Register(procedure=procedure_name, options=options)
-        request_id = message.request_id
 
         try:
             self.session.send_message(message)
@@ -164,7 +252,7 @@ class Client(object):
                 "failed to register callee: %s", procedure_name
             )
 
-        self.request_ids[request_id] = procedure_name
+        self.request_ids[message.request_id] = procedure_name
 
         logger.info(
             'Register request sent for procedure name "%s"', procedure_name,
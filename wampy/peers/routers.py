@@ -4,11 +4,11 @@ import os
 import signal
 import socket
 import subprocess
-from socket import error as socket_error
 from time import time as now
 
 from wampy.errors import ConnectionError, WampyError
 from wampy.mixins import ParseUrlMixin
+from wampy.transports.sockets import connect_tcp, connect_unix
 
 logger = logging.getLogger('wampy.peers.routers')
 
@@ -35,7 +35,7 @@ class Crossbar(ParseUrlMixin):
             )
 
         self.transport = config['transports'][0]
-        self.url = self.transport.get("url")
+        self.url = self._get_url(self.transport)
         if self.url is None:
             raise WampyError(
                 "The ``url`` value is required by Wampy. "
@@ -43,12 +43,15 @@ class Crossbar(ParseUrlMixin):
             )
 
         self.ipv = self.transport['endpoint'].get("version", None)
-        if self.ipv is None:
-            logger.warning(
-                "defaulting to IPV 4 because neither was specified."
+        if self.ipv is None and self.transport['endpoint']['type'] != 'unix':
+            logger.info(
+                "neither IPV 4 nor 6 was specified: connecting over "
+                "whichever answers first."
             )
-            self.ipv = 4
 
+        self.host = None
+        self.port = None
+        self.unix_socket_path = None
         self.parse_url()
 
         self.websocket_location = self.resource
@@ -58,6 +61,23 @@ class Crossbar(ParseUrlMixin):
 
         self.proc = None
 
+    @staticmethod
+    def _get_url(transport):
+        # Crossbar does not allow a ``url`` for a RawSocket transport, nor
+        # one for a Unix domain socket, so these are built from the
+        # endpoint
+        endpoint = transport['endpoint']
+        scheme = 'rs' if transport['type'] == 'rawsocket' else 'ws'
+
+        if endpoint['type'] == 'unix':
+            return "{}+unix://{}".format(scheme, endpoint['path'])
+
+        if scheme == 'rs':
+            return "rs://{}:{}".format(
+                endpoint.get('interface', 'localhost'), endpoint['port'])
+
+        return transport.get("url")
+
     @property
     def can_use_tls(self):
         return bool(self.certificate)
@@ -80,8 +100,8 @@ class Crossbar(ParseUrlMixin):
             if timeout < 0:
                 if raise_if_not_ready:
                     raise ConnectionError(
-                        'Failed to connect to CrossBar over {}: {}:{}'.format(
-                            self.ipv, self.host, self.port)
+                        'Failed to connect to CrossBar at {}'.format(
+                            self.url)
                     )
                 else:
                     return ready
@@ -127,26 +147,10 @@ class Crossbar(ParseUrlMixin):
             logger.exception("failed to stop crossbar")
 
     def try_connection(self):
-        if self.ipv == 4:
-            _socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-            try:
-                _socket.connect((self.host, self.port))
-            except socket_error:
-                pass
-
-        elif self.ipv == 6:
-            _socket = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
-
-            try:
-                _socket.connect(("::", self.port))
-            except socket_error:
-                pass
-
+        if self.unix_socket_path:
+            _socket = connect_unix(self.unix_socket_path)
         else:
-            raise WampyError(
-                "unknown IPV: {}".format(self.ipv)
-            )
+            _socket = connect_tcp(self.host, self.port, self.ipv)
 
         _socket.shutdown(socket.SHUT_RDWR)
         _socket.close()
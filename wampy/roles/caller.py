@@ -1,12 +1,332 @@
 import logging
+import time
+from collections import deque
 
-from wampy.errors import WampProtocolError
+from wampy.backends import get_backend
+from wampy.errors import CallError, WampProtocolError, WampyError
+from wampy.futures import Condition
 from wampy.messages import MESSAGE_TYPE_MAP
 from wampy.messages import Message
 from wampy.messages.call import Call
+from wampy.messages.cancel import Cancel
+from wampy.transports.writer import BLOCK, DROP, OVERFLOW_POLICIES, RAISE
 
 logger = logging.getLogger('wampy.rpc')
 
+# how many CALLs ``call_many`` keeps in flight by default
+DEFAULT_CONCURRENCY = 10
+# how many seconds a CALL has to complete by default
+DEFAULT_CALL_TIMEOUT = 5
+# how many progressive results ``call_stream`` buffers by default
+DEFAULT_BUFFER_SIZE = 100
+
+
+def get_result(response):
+    """ Return the result of a CALL from its ``response``, raising
+    ``CallError`` for an ERROR, else ``WampProtocolError`` unless it is
+    a RESULT.
+    """
+    wamp_code = response[0]
+    if wamp_code == Message.ERROR:
+        # [ERROR, CALL, CALL.Request|id, Details|dict, Error|uri,
+        #  Arguments|list, ArgumentsKw|dict]
+        raise CallError(*response[4:7])
+
+    if wamp_code != Message.RESULT:
+        raise WampProtocolError(
+            'unexpected message code: "{} ({})" {}'.format(
+                wamp_code, MESSAGE_TYPE_MAP.get(wamp_code),
+                response[4:])
+        )
+
+    # a RESULT may carry no Arguments at all
+    results = response[3] if len(response) > 3 else []
+    return results[0] if results else None
+
+
+def send_call(
+        client, procedure, args=None, kwargs=None, timeout=None,
+        on_progress=None,
+):
+    """ Send a CALL of ``procedure``, returning a ``CallFuture`` of its
+    result.
+
+    The call has ``timeout`` seconds, else the client's ``call_timeout``,
+    to complete. The Dealer is asked to cancel it after as long, with the
+    "timeout" call option, and the result is no longer waited for.
+
+    Given ``on_progress``, progressive results are asked for, with the
+    "receive_progress" call option, and each RESULT carrying one is
+    passed to it.
+
+    """
+    if timeout is None:
+        timeout = client.call_timeout
+
+    return _send_call(client, procedure, args, kwargs, timeout, on_progress)
+
+
+def _send_call(client, procedure, args, kwargs, timeout, on_progress):
+    # as ``send_call``, but a ``timeout`` of None is no deadline at all
+    options = {}
+    if timeout is not None:
+        # in milliseconds, where 0 would mean no timeout at all
+        options['timeout'] = max(int(round(timeout * 1000)), 1)
+    if on_progress is not None:
+        options['receive_progress'] = True
+
+    message = Call(
+        procedure=procedure, options=options, args=args, kwargs=kwargs)
+    session = client.session
+    future = session.request(
+        message, timeout=timeout, on_progress=on_progress)
+    return CallFuture(future, session)
+
+
+def call_stream(
+        client, procedure, args=None, kwargs=None, timeout=None,
+        buffer_size=DEFAULT_BUFFER_SIZE, overflow=BLOCK,
+):
+    """ Call ``procedure`` asking for progressive results, and yield
+    each of them as it arrives, then the final result, if any.
+
+    A stream has no deadline, unlike other calls, unless it is given a
+    ``timeout``: the whole of it must then have arrived within that many
+    seconds, or the call is canceled and ``WampProtocolError`` raised.
+
+    Up to ``buffer_size`` results may wait to be consumed, so that a
+    fast Callee can't fill the Caller's memory. Should another arrive
+    meanwhile, the ``overflow`` policy decides what becomes of it:
+
+    - ``block`` the reading of the connection until the next result has
+      been consumed, so that the Router, and in turn the Callee, is held
+      up too. So are any other replies over the connection meanwhile:
+      don't wait for those while iterating over the stream.
+    - ``drop`` the oldest result waiting, or
+    - ``raise`` ``WampProtocolError``, canceling the call.
+
+    The call is canceled if the iteration stops before it is over.
+
+    """
+    if overflow not in OVERFLOW_POLICIES:
+        raise WampyError(
+            "unknown overflow policy: {}".format(overflow)
+        )
+
+    # the progressive RESULTs waiting to be consumed
+    buffered = deque()
+    # notified whenever a result is buffered or consumed, and once the
+    # call is done
+    changed = Condition()
+    # the ``CallFuture``, once the CALL has been sent
+    calls = []
+
+    def room():
+        return len(buffered) < buffer_size or (calls and calls[0].done())
+
+    def on_progress(message):
+        # in the thread listening on the connection
+        if not room():
+            if overflow == RAISE:
+                calls[0].abandon(WampProtocolError(
+                    "more than {} results of {} waiting to be "
+                    "consumed".format(buffer_size, procedure)
+                ))
+                return
+
+            if overflow == DROP:
+                buffered.popleft()
+                logger.warning(
+                    "dropped a result of %s: %s waiting to be consumed",
+                    procedure, buffer_size,
+                )
+            else:
+                changed.wait_for(room)
+                if calls[0].done():
+                    return
+
+        buffered.append(message)
+        changed.notify_all()
+
+    call = _send_call(client, procedure, args, kwargs, timeout, on_progress)
+    calls.append(call)
+    call.add_done_callback(lambda _: changed.notify_all())
+
+    def ready():
+        return buffered or call.done()
+
+    try:
+        while True:
+            deadline = call.future.deadline
+            if deadline is None:
+                changed.wait_for(ready)
+            elif not changed.wait_for(
+                    ready, max(deadline - time.time(), 0)):
+                call.abandon(WampProtocolError(
+                    "no reply to {} by its deadline".format(procedure)))
+                continue
+
+            if not buffered:
+                break
+
+            message = buffered.popleft()
+            # room for the next result
+            changed.notify_all()
+
+            # [RESULT, CALL.Request|id, {"progress": true}, Arguments|list]
+            if len(message) > 3 and message[3]:
+                yield message[3][0]
+
+        response = call.future.result()
+        # the final RESULT may carry one last result, or none
+        if response[0] != Message.RESULT or (
+                len(response) > 3 and response[3]):
+            yield get_result(response)
+    finally:
+        if not call.done():
+            call.cancel()
+
+
+class CallFuture(object):
+    """ The result, once it arrives, of a CALL made with
+    ``Client.call_async``.
+    """
+
+    def __init__(self, future, session=None):
+        # the ``wampy.futures.Future`` of the response
+        self.future = future
+        self.session = session
+
+    def __repr__(self):
+        return "<CallFuture for request {}{}>".format(
+            self.request_id, " (done)" if self.done() else "")
+
+    @property
+    def request_id(self):
+        return self.future.request_id
+
+    def done(self):
+        return self.future.done()
+
+    def add_done_callback(self, callback):
+        """ Call ``callback`` with the CallFuture once it is done. """
+        self.future.add_done_callback(lambda _: callback(self))
+
+    def result(self, timeout=None):
+        """ Return the result of the CALL, waiting for at most ``timeout``
+        seconds, or else until its deadline, for it, else raise
+        ``WampProtocolError``, as for an ERROR.
+        """
+        return get_result(self.future.result(timeout))
+
+    def abandon(self, exc):
+        """ Stop waiting for the result, failing the CallFuture with
+        ``exc``.
+        """
+        self.future.abandon(exc)
+
+    def cancel(self, mode=Cancel.DEFAULT_MODE):
+        """ Cancel the CALL, failing the CallFuture with
+        ``CallCanceledError``, and return whether it was still pending.
+
+        See :meth:`wampy.session.Session.cancel` for the ``mode``.
+
+        """
+        return self.session.cancel(self.future, mode)
+
+
+def call_many(
+        client, procedure, iterable_of_args,
+        concurrency=DEFAULT_CONCURRENCY, ordered=True, timeout=None,
+):
+    """ Call ``procedure`` once for each item of ``iterable_of_args``,
+    with up to ``concurrency`` CALLs in flight at a time, yielding their
+    results.
+
+    Each item is a tuple of positional arguments, or else the one
+    argument. Results are yielded in the order of the arguments, or, if
+    not ``ordered``, as they arrive, like ``imap`` and
+    ``imap_unordered`` of ``multiprocessing.Pool``.
+
+    Each CALL has the client's ``call_timeout`` to complete. The first
+    ERROR, a CALL passing its deadline, or, given a ``timeout``, a wait
+    of more than ``timeout`` seconds for a result, raises
+    ``WampProtocolError`` and abandons the CALLs still in flight.
+
+    """
+    if concurrency < 1:
+        raise ValueError(
+            "concurrency must be at least 1, not {}".format(concurrency))
+
+    backend = get_backend()
+    arguments = iter(iterable_of_args)
+    in_flight = deque()
+    # the CallFutures in flight once they are done, if not ``ordered``
+    completed = backend.Queue()
+
+    def call_next():
+        for args in arguments:
+            if not isinstance(args, tuple):
+                args = (args,)
+
+            call = client.call_async(procedure, *args)
+            if not ordered:
+                call.add_done_callback(completed.put)
+
+            in_flight.append(call)
+            return True
+
+        return False
+
+    def next_completed():
+        while True:
+            wait = timeout
+            if wait is None:
+                # until the first deadline of the CALLs in flight, if any
+                deadlines = [
+                    call.future.deadline for call in in_flight
+                    if call.future.deadline is not None
+                ]
+                if deadlines:
+                    wait = max(min(deadlines) - time.time(), 0)
+
+            try:
+                return completed.get(timeout=wait)
+            except backend.Empty:
+                if timeout is not None:
+                    raise WampProtocolError(
+                        "no reply to any of {} calls to {} after {} "
+                        "seconds".format(len(in_flight), procedure, timeout)
+                    )
+
+            # abandoning them puts the expired CALLs on ``completed``
+            now = time.time()
+            for call in list(in_flight):
+                if not call.done() and call.future.expired(now):
+                    call.abandon(WampProtocolError(
+                        "no reply to {} by its deadline".format(procedure)))
+
+    try:
+        while len(in_flight) < concurrency and call_next():
+            pass
+
+        while in_flight:
+            if ordered:
+                call = in_flight[0]
+            else:
+                call = next_completed()
+
+            # still in flight, so abandoned, if this wait times out
+            result = call.result(timeout)
+            in_flight.remove(call)
+            call_next()
+            yield result
+    finally:
+        for call in in_flight:
+            if not call.done():
+                call.abandon(WampProtocolError(
+                    "call to {} abandoned".format(procedure)))
+
 
 class CallProxy:
     """ Proxy wrapper of a `wampy` client for WAMP application RPCs.
@@ -19,25 +339,33 @@ class CallProxy:
     and a `CallProxy` object will call such and endpoint, passing in
     any `args` or `kwargs` necessary.
 
+    Each call has the client's ``call_timeout`` to complete, unless the
+    proxy is given a ``timeout`` of its own, e.g. ::
+
+        client.call.with_timeout(300)("com.example.report")
+
+    An ERROR reply raises ``CallError``, as for ``CallFuture.result``.
+
     """
-    def __init__(self, client):
+    def __init__(self, client, timeout=None):
         self.client = client
+        self.timeout = timeout
 
-    def __call__(self, procedure, *args, **kwargs):
-        message = Call(procedure=procedure, args=args, kwargs=kwargs)
-        response = self.client.send_message_and_wait_for_response(
-            message)
-        wamp_code = response[0]
-
-        if wamp_code == Message.ERROR:
-            logger.error("call returned an error: %s", response)
-            return response
-        elif wamp_code == Message.RESULT:
-            results = response[3]
-            result = results[0]
-            return result
+    def with_timeout(self, timeout):
+        """ Return a proxy whose calls have ``timeout`` seconds. """
+        return self.__class__(client=self.client, timeout=timeout)
 
-        raise WampProtocolError("unexpected response: %s", response)
+    def stream(self, procedure, *args, **kwargs):
+        """ Call ``procedure``, iterating over its progressive results
+        as they arrive. See :func:`call_stream`.
+        """
+        return call_stream(
+            self.client, procedure, args, kwargs, timeout=self.timeout)
+
+    def __call__(self, procedure, *args, **kwargs):
+        return send_call(
+            self.client, procedure, args, kwargs, timeout=self.timeout,
+        ).result()
 
 
 class RpcProxy:
@@ -50,27 +378,26 @@ class RpcProxy:
     The typical use case of this proxy class is for microservices
     where endpoints are class methods.
 
+    As for the ``CallProxy``, a ``timeout`` may be given to the calls,
+    e.g. ::
+
+        client.rpc.with_timeout(0.05).get_data()
+
     """
-    def __init__(self, client):
+    def __init__(self, client, timeout=None):
         self.client = client
+        self.timeout = timeout
+
+    def with_timeout(self, timeout):
+        """ Return a proxy whose calls have ``timeout`` seconds. """
+        return self.__class__(client=self.client, timeout=timeout)
 
     def __getattr__(self, name):
 
         def wrapper(*args, **kwargs):
-            message = Call(procedure=name, args=args, kwargs=kwargs)
-            # TOOO: make_remote_procedure_call might be a better name?
-            response = self.client.send_message_and_wait_for_response(
-                message)
-            wamp_code = response[0]
-            if wamp_code != Message.RESULT:
-                raise WampProtocolError(
-                    'unexpected message code: "%s (%s) %s"',
-                    wamp_code, MESSAGE_TYPE_MAP[wamp_code],
-                    response[5]
-                )
-
-            results = response[3]
-            result = results[0]
+            call = send_call(
+                self.client, name, args, kwargs, timeout=self.timeout)
+            result = call.result()
             logger.debug("RpcProxy got result: %s", result)
             return result
 
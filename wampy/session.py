@@ -1,12 +1,20 @@
+import heapq
+import itertools
 import logging
-import socket
-
-import eventlet
-
-from wampy.errors import ConnectionError, WampError, WampProtocolError
+import time
+from collections import deque
+
+from wampy.backends import get_backend
+from wampy.constants import MAX_REQUEST_ID
+from wampy.errors import (
+    CallCanceledError, ConnectionError, WampError, WampProtocolError,
+    WampyError, WebsocktProtocolError)
+from wampy.futures import Condition, Future
 from wampy.messages import Message
+from wampy.messages.cancel import Cancel
 from wampy.messages.hello import Hello
 from wampy.messages.goodbye import Goodbye
+from wampy.transports.rawsocket.connection import RawSocket
 from wampy.transports.websocket.connection import (
     WampWebSocket, TLSWampWebSocket)
 
@@ -15,15 +23,25 @@ from wampy.messages import MESSAGE_TYPE_MAP
 
 logger = logging.getLogger('wampy.session')
 
+# how many of the latest messages are kept for ``recv_message``
+RECENT_MESSAGES = 100
+
 
 def session_builder(
-        client, router, transport="websocket", use_tls=False, ipv=4
+        client, router, transport="websocket", use_tls=False, ipv=4,
+        transport_options=None,
 ):
+    transport_options = transport_options or {}
+
     if transport == "websocket":
         if use_tls:
-            transport = TLSWampWebSocket(router)
+            transport = TLSWampWebSocket(router, **transport_options)
         else:
-            transport = WampWebSocket(router)
+            transport = WampWebSocket(router, **transport_options)
+    elif transport == "rawsocket":
+        if use_tls:
+            raise WampError("TLS is not supported over RawSocket, sorry")
+        transport = RawSocket(router, **transport_options)
     else:
         raise WampError("transport not supported: {}".format(transport))
 
@@ -51,7 +69,7 @@ class Session(object):
 
     """
 
-    def __init__(self, client, router, transport):
+    def __init__(self, client, router, transport, binary_serializer=None):
         """ A Session between a Client and a Router.
 
         :Parameters:
@@ -59,21 +77,51 @@ class Session(object):
                 An instance of :class:`peers.Client`.
             router : instance
                 An instance of :class:`peers.Router`.
+            binary_serializer : object
+                Anything with ``dumps``, of a message to bytes, and
+                ``loads``, of a memoryview of them, such as the
+                ``msgpack`` module. Binary messages are sent with it, and
+                the binary frames received decoded with it. Without one,
+                binary frames are dropped.
 
         """
         self.client = client
         self.router = router
         self.transport = transport
+        self.binary_serializer = binary_serializer
 
         self.subscription_map = {}
         self.registration_map = {}
 
         self.session_id = None
-        # spawn a green thread to listen for incoming messages over
-        # a connection and put them on a queue to be processed
+        # the Details of the Router's WELCOME, announcing its features
+        self.router_details = {}
+        # spawn a thread, of the concurrency backend, to listen for
+        # incoming messages over a connection and process them
+        self.backend = get_backend()
+        # request ID of an INVOCATION: the thread running it, guarded by
+        # the lock as the thread removes itself when done
+        self.invocations = {}
+        self.invocations_lock = self.backend.Semaphore()
         self._connection = None
         self._managed_thread = None
-        self._message_queue = eventlet.Queue()
+        self._listening = False
+        # request ID: the ``Future`` of the reply to that request
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        # (deadline, request ID, ``Future``) of the pending requests with
+        # a deadline, soonest first
+        self._deadlines = []
+        # guards both of the above, changed by the threads making
+        # requests as well as by the listener
+        self._pending_lock = self.backend.Semaphore()
+        # notified whenever a message has been processed, and when the
+        # connection is lost
+        self._changed = Condition()
+        self._received = 0
+        # (number, message) of the latest messages, numbered from 1 as
+        # they are received
+        self._recent_messages = deque(maxlen=RECENT_MESSAGES)
 
     @property
     def host(self):
@@ -95,7 +143,36 @@ class Session(object):
     def id(self):
         return self.session_id
 
+    def router_supports(self, role, feature):
+        """ Whether the Router has announced ``feature`` of its ``role``,
+        e.g. ``("dealer", "call_canceling")``, in its WELCOME.
+        """
+        roles = self.router_details.get('roles', {})
+        features = roles.get(role, {}).get('features', {})
+        return bool(features.get(feature))
+
+    @property
+    def writable(self):
+        """ Whether a message sent now is queued without the overflow
+        policy of the transport's send queue coming into play.
+        """
+        return self.transport.writer.writable
+
+    def wait_writable(self, timeout=None):
+        """ Wait, for at most ``timeout`` seconds, until the send queue
+        has drained to its low watermark, returning whether it has.
+        """
+        return self.transport.writer.wait_writable(timeout)
+
+    def next_request_id(self):
+        """ Return the ID for the next request of this Session, counting
+        up from 1 and wrapping around after ``MAX_REQUEST_ID``.
+        """
+        # ``next`` on a count is atomic, whatever the concurrency backend
+        return (next(self._request_ids) - 1) % MAX_REQUEST_ID + 1
+
     def begin(self):
+        self._request_ids = itertools.count(1)
         self._connect()
         self._say_hello()
 
@@ -105,30 +182,144 @@ class Session(object):
         self.subscription_map = {}
         self.registration_map = {}
         self.session_id = None
+        self.router_details = {}
+
+    def send_message(self, message, binary=False):
+        """ Send ``message``, as JSON text, or else, if ``binary``, in a
+        binary frame serialized by the ``binary_serializer``.
+        """
+        self._assign_request_id(message)
 
-    def send_message(self, message):
         message_type = MESSAGE_TYPE_MAP[message.WAMP_CODE]
+        if binary:
+            if self.binary_serializer is None:
+                raise WampyError(
+                    "cannot send a binary message without a "
+                    "binary_serializer"
+                )
+
+            logger.debug('sending binary "%s" message', message_type)
+            self.send_bytes(
+                self.binary_serializer.dumps(message.message), binary=True)
+            return
+
         message = message.serialize()
 
         logger.debug(
             'sending "%s" message: %s', message_type, message
         )
 
-        self._connection.send_websocket_frame(str(message))
+        self._connection.send(message)
 
-    def recv_message(self, timeout=5):
-        logger.debug('waiting for message')
+    def send_bytes(self, data, binary=False):
+        """ Send an already serialized message over the connection.
 
-        try:
-            message = self._wait_for_message(timeout)
-        except eventlet.Timeout:
-            raise WampProtocolError("no message returned")
+        :Parameters:
+            data : bytes, bytearray or memoryview
+                The message, sent as it is without being copied or
+                re-encoded.
+            binary : bool
+                Send the message in a binary rather than a text frame, as
+                required by binary serializers.
 
-        logger.debug(
-            'received message: "%s"', MESSAGE_TYPE_MAP[message[0]]
+        """
+        if not isinstance(data, (bytes, bytearray, memoryview)):
+            raise TypeError(
+                "expected bytes, bytearray or memoryview, not {}".format(
+                    type(data).__name__)
+            )
+
+        logger.debug('sending %s bytes', len(data))
+
+        self._connection.send(data, binary=binary)
+
+    def request(
+            self, message, timeout=None, on_progress=None, binary=False,
+    ):
+        """ Send ``message``, a request such as a CALL, returning a
+        ``Future`` of the RESULT or ERROR replying to it.
+
+        Given a ``timeout``, the request is forgotten once that many
+        seconds have passed without a reply, and a late reply dropped.
+        ``on_progress`` is called with each progressive RESULT before it.
+        ``binary`` is as for :meth:`send_message`.
+
+        """
+        self._assign_request_id(message)
+        self._expire_pending()
+
+        request_id = message.request_id
+        if timeout is None:
+            deadline = None
+        else:
+            deadline = time.time() + timeout
+
+        if message.WAMP_CODE == Message.CALL:
+            on_abandon = self._abandon_call
+        else:
+            on_abandon = self._forget
+
+        future = Future(
+            request_id, on_abandon=on_abandon, deadline=deadline,
+            on_progress=on_progress,
         )
+        with self._pending_lock:
+            self._pending[request_id] = future
+            if deadline is not None:
+                heapq.heappush(
+                    self._deadlines, (deadline, request_id, future))
 
-        return message
+        try:
+            self.send_message(message, binary=binary)
+        except Exception as exc:
+            # never sent, so there is nothing to CANCEL
+            with self._pending_lock:
+                if self._pending.get(request_id) is future:
+                    del self._pending[request_id]
+                if deadline is not None:
+                    self._deadlines[:] = [
+                        entry for entry in self._deadlines
+                        if entry[2] is not future
+                    ]
+                    heapq.heapify(self._deadlines)
+            future.set_exception(exc)
+            raise
+
+        return future
+
+    def cancel(self, future, mode=Cancel.DEFAULT_MODE):
+        """ Cancel the CALL whose reply ``future`` is, failing it with
+        ``CallCanceledError``, and return whether it was still pending.
+
+        The Dealer is sent a CANCEL in ``mode``, one of ``Cancel.MODES``,
+        if it has announced that it supports call canceling, so that it
+        may interrupt the Callee.
+
+        """
+        if future.done():
+            return False
+
+        self._forget(future)
+        future.set_exception(CallCanceledError(
+            "call {} has been canceled".format(future.request_id)))
+        self._send_cancel(future.request_id, mode)
+        return True
+
+    def recv_message(self, timeout=5):
+        """ Return the next message to arrive, once it has been processed.
+        """
+        return self._recv_message_after(self._received, timeout)
+
+    def wait_for(self, predicate, timeout=None):
+        """ Wait until ``predicate()`` is true, checking it whenever a
+        message has been processed, for at most ``timeout`` seconds.
+        Return the last value of ``predicate()``.
+
+        e.g. ``session.wait_for(lambda: session.id is not None)`` waits
+        for the WELCOME.
+
+        """
+        return self._changed.wait_for(predicate, timeout)
 
     def _connect(self):
         connection = self.transport
@@ -140,23 +331,20 @@ class Session(object):
                 'cannot connect to: "{}": {}'.format(self.transport.url, exc)
             )
 
-        self._listen_on_connection(connection, self._message_queue)
+        self._listen_on_connection(connection)
         self._connection = connection
 
     def _disconnet(self):
-        _socket = self.transport.socket
-
-        try:
-            _socket.shutdown(socket.SHUT_RDWR)
-        except socket.error:
-            pass
-
-        _socket.close()
+        self.transport.disconnect()
 
         self._managed_thread.kill()
+        self._listening = False
         self._connection = None
         self.session = None
 
+        self._fail_pending(ConnectionError("session ended"))
+        self._changed.notify_all()
+
         logger.debug('disconnected from %s', self.host)
 
     def _say_hello(self):
@@ -165,6 +353,8 @@ class Session(object):
 
     def _say_goodbye(self):
         message = Goodbye(wamp_code=6)
+        # the Router may echo the GOODBYE before we start waiting for it
+        received = self._received
         try:
             self.send_message(message)
         except Exception as exc:
@@ -173,42 +363,198 @@ class Session(object):
             logger.warning("GOODBYE failed!: %s", exc)
         else:
             try:
-                message = self.recv_message(timeout=2)
+                message = self._recv_message_after(received, timeout=2)
                 if message[0] != Message.GOODBYE:
                     raise WampProtocolError(
                         "Unexpected response from GOODBYE message: {}".format(
                             message
                         )
                     )
-            except WampProtocolError:
+            except (ConnectionError, WampProtocolError):
                 # Server already gone away?
                 pass
 
-    def _listen_on_connection(self, connection, message_queue):
+    def _assign_request_id(self, message):
+        if getattr(message, 'request_id', False) is None:
+            message.set_request_id(self.next_request_id())
+
+    def _forget(self, future):
+        with self._pending_lock:
+            if self._pending.get(future.request_id) is future:
+                del self._pending[future.request_id]
+
+    def _abandon_call(self, future):
+        # no one is waiting for the result: don't have it computed
+        self._forget(future)
+        self._send_cancel(future.request_id, Cancel.DEFAULT_MODE)
+
+    def _send_cancel(self, request_id, mode):
+        if not self.router_supports('dealer', 'call_canceling'):
+            return
+
+        try:
+            self.send_message(Cancel(request_id, mode=mode))
+        except Exception as exc:
+            logger.warning("CANCEL failed!: %s", exc)
+
+    def _load_binary(self, frame):
+        # a binary frame is not JSON: decode it, if possible, rather than
+        # have it fail to parse and end the session
+        if self.binary_serializer is None:
+            logger.warning(
+                "dropping a binary message of %s bytes: there is no "
+                "binary_serializer", len(frame.data),
+            )
+            return None
+
+        try:
+            return self.binary_serializer.loads(frame.data)
+        except Exception:
+            logger.exception(
+                "dropping a binary message of %s bytes that failed to "
+                "deserialize", len(frame.data),
+            )
+            return None
+
+    def _fail_pending(self, exc):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._deadlines = []
+        for future in pending.values():
+            future.set_exception(exc)
+
+    def _expire_pending(self):
+        """ Abandon the pending requests whose deadlines have passed,
+        whether or not anyone is waiting for their replies.
+        """
+        now = time.time()
+        expired = []
+
+        with self._pending_lock:
+            deadlines = self._deadlines
+            while deadlines and deadlines[0][0] <= now:
+                expired.append(heapq.heappop(deadlines)[2])
+
+            # the requests answered in time stay in the heap until their
+            # deadlines pass: don't let them pile up under long deadlines
+            if len(deadlines) > 2 * len(self._pending) + 64:
+                deadlines[:] = [
+                    entry for entry in deadlines if not entry[2].done()]
+                heapq.heapify(deadlines)
+
+        # abandoned without the lock, which abandoning them takes
+        for future in expired:
+            if not future.done():
+                future.abandon(WampProtocolError(
+                    "no reply to request {} by its deadline".format(
+                        future.request_id)
+                ))
+
+    def _resolve(self, message):
+        """ Resolve the ``Future`` of the request ``message`` replies to,
+        returning whether there was one.
+        """
+        wamp_code = message[0]
+        if wamp_code == Message.RESULT:
+            # [RESULT, CALL.Request|id, Details|dict, ...]
+            request_id = message[1]
+            if message[2].get('progress'):
+                # more to come before the request is answered
+                future = self._pending.get(request_id)
+                if future is None:
+                    return False
+
+                future.set_progress(message)
+                return True
+        elif wamp_code == Message.ERROR:
+            # [ERROR, REQUEST.Type|int, REQUEST.Request|id, Details|dict,
+            #  Error|uri, ...]
+            request_id = message[2]
+        else:
+            return False
+
+        with self._pending_lock:
+            future = self._pending.pop(request_id, None)
+        if future is None:
+            return False
+
+        future.set_result(message)
+        return True
+
+    def _recv_message_after(self, received, timeout):
+        """ Return the first message to arrive after ``received`` messages
+        had, waiting for at most ``timeout`` seconds for it.
+        """
+        logger.debug('waiting for message')
+
+        def arrived():
+            return self._received > received or not self._listening
+
+        if not self._changed.wait_for(arrived, timeout):
+            raise WampProtocolError("no message returned")
+
+        if self._received == received:
+            # nothing more will arrive: don't wait for the timeout
+            raise ConnectionError(
+                "connection to {} has been lost".format(self.transport.url)
+            )
+
+        number = received + 1
+        for recent_number, message in self._recent_messages:
+            if recent_number == number:
+                break
+        else:
+            raise WampProtocolError(
+                "message {} is no longer kept: {} have arrived since".format(
+                    number, self._received - number)
+            )
+
+        logger.debug(
+            'received message: "%s"', MESSAGE_TYPE_MAP[message[0]]
+        )
+
+        return message
+
+    def _listen_on_connection(self, connection):
         def connection_handler():
             while True:
                 try:
-                    frame = connection.read_websocket_frame()
+                    frame = connection.receive()
                     if frame:
-                        message = frame.payload
-                        self.client.process_message(message)
+                        if frame.is_binary:
+                            message = self._load_binary(frame)
+                            if message is None:
+                                continue
+                        else:
+                            message = frame.payload
+                        if not self._resolve(message):
+                            self.client.process_message(message)
+
+                        self._expire_pending()
+
+                        self._recent_messages.append(
+                            (self._received + 1, message))
+                        self._received += 1
+                        self._changed.notify_all()
                 except (
                         SystemExit, KeyboardInterrupt, ConnectionError,
                         WampProtocolError,
                 ):
                     break
+                except WebsocktProtocolError as exc:
+                    logger.error("websocket protocol error: %s", exc)
+                    break
+                except Exception:
+                    logger.exception("failed to process message")
+                    break
 
-        gthread = eventlet.spawn(connection_handler)
-        self._managed_thread = gthread
-
-    def _wait_for_message(self, timeout):
-        q = self._message_queue
-
-        with eventlet.Timeout(timeout):
-            while q.qsize() == 0:
-                # if the expected message is not there, switch context to
-                # allow other threads to continue working to fetch it for us
-                eventlet.sleep()
+            # nothing more will arrive: don't keep anyone waiting for it
+            self._listening = False
+            self._fail_pending(ConnectionError(
+                "connection to {} has been lost".format(self.transport.url)
+            ))
+            self._changed.notify_all()
 
-        message = q.get()
-        return message
+        self._listening = True
+        thread = self.backend.spawn(connection_handler)
+        self._managed_thread = thread
@@ -1,27 +1,28 @@
-import eventlet
+from wampy.backends import get_backend
 
 TIMEOUT = 5
 
 
 def wait_for_subscriptions(client, number_of_subscriptions):
-    with eventlet.Timeout(TIMEOUT):
-        while (
-            len(client.session.subscription_map.keys())
-            < number_of_subscriptions
-        ):
-            eventlet.sleep()
+    session = client.session
+
+    with get_backend().Timeout(TIMEOUT):
+        session.wait_for(
+            lambda: len(session.subscription_map) >= number_of_subscriptions
+        )
 
 
 def wait_for_registrations(client, number_of_registrations):
-    with eventlet.Timeout(TIMEOUT):
-        while (
-            len(client.session.registration_map.keys())
-            < number_of_registrations
-        ):
-            eventlet.sleep()
+    session = client.session
+
+    with get_backend().Timeout(TIMEOUT):
+        session.wait_for(
+            lambda: len(session.registration_map) >= number_of_registrations
+        )
 
 
 def wait_for_session(client):
-    with eventlet.Timeout(TIMEOUT):
-        while client.session.id is None:
-            eventlet.sleep()
+    session = client.session
+
+    with get_backend().Timeout(TIMEOUT):
+        session.wait_for(lambda: session.id is not None)
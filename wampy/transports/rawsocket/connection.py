@@ -0,0 +1,369 @@
+""" The WAMP RawSocket transport.
+
+https://wamp-proto.org/spec.html#rawsocket-transport
+
+A lighter alternative to WebSocket for talking to a Router over TCP:
+there is no HTTP upgrade and no masking, just a 4 octet handshake and
+then every message prefixed with a 4 octet header holding its length.
+
+"""
+import json
+import logging
+import socket
+from struct import pack_into, unpack_from
+
+from wampy.backends import get_backend
+from wampy.errors import ConnectionError, WampProtocolError, WampyError
+from wampy.mixins import ParseUrlMixin
+from wampy.transports.sockets import (
+    DEFAULT_CONNECT_TIMEOUT, HANDSHAKE_TIMEOUT, SocketOptions, connect_tcp,
+    connect_unix, recv_into, socket_timeout,
+)
+from wampy.transports.writer import Writer
+
+logger = logging.getLogger(__name__)
+
+
+class RawSocketMessage(object):
+    """ A message received over a RawSocket.
+    """
+
+    # RawSocket does not tell text from binary messages: the serializer
+    # agreed in the handshake, JSON, decides
+    is_binary = False
+
+    def __init__(self, body):
+        self.body = body
+        self._payload = None
+
+    @property
+    def data(self):
+        """ The raw bytes of the message, without copying them. """
+        return memoryview(self.body)
+
+    @property
+    def text(self):
+        # see ``ServerFrame.text``
+        return self.body.decode('utf-8')
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            try:
+                # decoded as ``ServerFrame.payload`` is
+                self._payload = json.loads(self.text)
+            except Exception:
+                raise WampProtocolError(
+                    'Failed to load JSON object from: "{}"'.format(
+                        self.body)
+                )
+
+        return self._payload
+
+
+class RawSocket(ParseUrlMixin):
+
+    MAGIC = 0x7F
+    SERIALIZER_JSON = 1
+
+    # the type of each message is held in the low 3 bits of the first
+    # octet of its header, and its length in the 3 octets that follow
+    MESSAGE_REGULAR = 0
+    MESSAGE_PING = 1
+    MESSAGE_PONG = 2
+
+    HEADER_LENGTH = 4
+    MAX_LENGTH = 0xFFFFFF
+
+    # maximum message lengths are agreed as a power of two between 2**9
+    # and 2**24 bytes
+    MIN_LENGTH_EXPONENT = 9
+    MAX_LENGTH_EXPONENT = 24
+
+    HANDSHAKE_ERRORS = {
+        0: "illegal (must not be used)",
+        1: "serializer unsupported",
+        2: "maximum message length unacceptable",
+        3: "use of reserved bits (unsupported feature)",
+        4: "maximum connection count reached",
+    }
+
+    # the maximum number of bytes to ask for with each ``recv``
+    recv_bufsize = 64 * 1024
+    # messages of at least this many bytes are received straight into a
+    # buffer of their own rather than through the receive buffer
+    large_message_size = 1024 * 1024
+
+    def __init__(
+            self, router, max_message_size=None,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT, socket_options=None,
+            send_queue=None,
+    ):
+        """ A RawSocket connection to a Router.
+
+        :Parameters:
+            router : instance
+                An instance of :class:`peers.Router`.
+            max_message_size : int
+                The largest message, in bytes, that the router may send
+                over this connection. Rounded up to a power of two, as
+                the protocol requires. Defaults to the largest allowed,
+                16 MB.
+            connect_timeout : float
+                Give up on connecting to the router after this many
+                seconds.
+            socket_options : dict
+                Keyword arguments for :class:`sockets.SocketOptions`,
+                e.g. to enable TCP keepalive or size the socket buffers.
+            send_queue : dict
+                Keyword arguments for :class:`writer.Writer`, bounding
+                the queue of messages waiting to be sent: its
+                ``high_watermark`` and ``low_watermark``, in bytes, and
+                the ``overflow`` policy once it is full.
+
+        """
+        self.url = router.url
+
+        self.host = None
+        self.port = None
+        self.ipv = router.ipv
+        self.resource = None
+        # set for ``rs+unix`` URLs
+        self.unix_socket_path = None
+
+        self.parse_url()
+        self.socket = None
+        self.connect_timeout = connect_timeout
+        self.socket_options = SocketOptions(**(socket_options or {}))
+
+        self.length_exponent = self._length_exponent(max_message_size)
+        self.max_message_size = 2 ** self.length_exponent
+        # the largest message the router will accept, once it has told us
+        self.max_send_size = None
+
+        # bytes received but not yet returned as part of a message
+        self._buffer = bytearray()
+        self.backend = get_backend()
+        self.writer = Writer(self._sendall, **(send_queue or {}))
+
+    def _length_exponent(self, max_message_size):
+        if max_message_size is None:
+            return self.MAX_LENGTH_EXPONENT
+
+        exponent = (max_message_size - 1).bit_length()
+        if exponent > self.MAX_LENGTH_EXPONENT:
+            raise WampyError(
+                "max_message_size cannot be more than {} bytes: {}".format(
+                    2 ** self.MAX_LENGTH_EXPONENT, max_message_size)
+            )
+
+        return max(exponent, self.MIN_LENGTH_EXPONENT)
+
+    def connect(self):
+        self._buffer = bytearray()
+        self.max_send_size = None
+
+        if self.unix_socket_path:
+            self.socket = connect_unix(
+                self.unix_socket_path, socket_options=self.socket_options)
+        else:
+            self.socket = connect_tcp(
+                self.host, self.port, self.ipv, timeout=self.connect_timeout,
+                socket_options=self.socket_options,
+            )
+
+        try:
+            with self.backend.Timeout(HANDSHAKE_TIMEOUT), socket_timeout(
+                    self.socket, HANDSHAKE_TIMEOUT):
+                self._handshake()
+        except self.backend.Timeout:
+            raise WampyError(
+                "No response to RawSocket handshake from {}".format(self.url)
+            )
+
+        self.writer.start()
+
+    def _handshake(self):
+        length_bits = self.length_exponent - self.MIN_LENGTH_EXPONENT
+        self.socket.sendall(bytes(bytearray([
+            self.MAGIC, (length_bits << 4) | self.SERIALIZER_JSON, 0, 0,
+        ])))
+
+        reply = self._recv_exactly(4)
+        if reply[0] != self.MAGIC:
+            raise WampProtocolError(
+                "Not a RawSocket handshake reply: {!r}".format(bytes(reply))
+            )
+
+        serializer = reply[1] & 0x0F
+        if serializer == 0:
+            error_code = reply[1] >> 4
+            raise WampProtocolError(
+                "RawSocket connection refused by {}: {}".format(
+                    self.url, self.HANDSHAKE_ERRORS.get(
+                        error_code, "unknown error {}".format(error_code)))
+            )
+
+        if serializer != self.SERIALIZER_JSON:
+            raise WampProtocolError(
+                "Router chose an unsupported serializer: {}".format(
+                    serializer)
+            )
+
+        # the length of a message must fit into the 3 octets of its
+        # header, one byte short of the largest maximum that can be agreed
+        self.max_send_size = min(
+            2 ** (self.MIN_LENGTH_EXPONENT + (reply[1] >> 4)),
+            self.MAX_LENGTH,
+        )
+
+        logger.info(
+            "RawSocket handshake complete: router accepts messages of up to "
+            "%s bytes", self.max_send_size,
+        )
+
+    def _recv_exactly(self, length):
+        buffered_bytes = self._buffer
+
+        while len(buffered_bytes) < length:
+            self._recv()
+
+        received = buffered_bytes[:length]
+        del buffered_bytes[:length]
+        return received
+
+    def _recv(self):
+        try:
+            received_bytes = self.socket.recv(self.recv_bufsize)
+        except self.backend.ThreadExit as exc:
+            raise ConnectionError('Connection closed: "{}"'.format(exc))
+        except socket.timeout as e:
+            message = str(e)
+            raise ConnectionError('timeout: "{}"'.format(message))
+        except Exception as exc:
+            raise ConnectionError('error: "{}"'.format(exc))
+
+        if not received_bytes:
+            raise WampProtocolError("No message returned")
+
+        self._buffer.extend(received_bytes)
+
+    def disconnect(self):
+        self.writer.stop()
+
+        if self.socket is None:
+            return
+
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+        self.socket.close()
+
+    def send(self, message, binary=False):
+        """ Send a message to the router.
+
+        :Parameters:
+            message : string, bytes, bytearray or memoryview
+                Text is encoded as UTF-8. Anything else is sent as it is.
+            binary : bool
+                Ignored: RawSocket does not tell text from binary
+                messages, the serializer agreed in the handshake decides.
+
+        """
+        if not isinstance(message, (bytes, bytearray, memoryview)):
+            message = message.encode('utf-8')
+
+        if self.writer.admit():
+            self._send(self.MESSAGE_REGULAR, message)
+
+    def _send(self, message_type, message):
+        length = len(message)
+        if self.max_send_size is not None and length > self.max_send_size:
+            raise WampProtocolError(
+                "message of {} bytes exceeds the router's limit of {} "
+                "bytes".format(length, self.max_send_size)
+            )
+
+        # header and message are sent as one write, so that the router
+        # never waits on half a message
+        frame = bytearray(self.HEADER_LENGTH + length)
+        pack_into('!I', frame, 0, (message_type << 24) | length)
+        frame[self.HEADER_LENGTH:] = message
+
+        self.writer.write(frame)
+
+    def _sendall(self, data):
+        self.socket.sendall(data)
+
+    def receive(self):
+        """ Return the next message sent by the router. """
+        buffered_bytes = self._buffer
+
+        while True:
+            if len(buffered_bytes) >= self.HEADER_LENGTH:
+                header, = unpack_from('!I', buffered_bytes)
+                message_type = (header >> 24) & 0x07
+                length = header & 0xFFFFFF
+
+                if header >> 27:
+                    raise WampProtocolError(
+                        "reserved bits set in RawSocket header: "
+                        "{:#010x}".format(header)
+                    )
+
+                if length > self.max_message_size:
+                    raise WampProtocolError(
+                        "message of {} bytes exceeds the maximum size of {} "
+                        "bytes".format(length, self.max_message_size)
+                    )
+
+                if length >= self.large_message_size:
+                    body = self._receive_large_message(length)
+                else:
+                    body = self._receive_message(length)
+
+                if body is not None:
+                    if message_type == self.MESSAGE_REGULAR:
+                        return RawSocketMessage(body)
+
+                    if message_type == self.MESSAGE_PING:
+                        self._send(self.MESSAGE_PONG, body)
+                    elif message_type != self.MESSAGE_PONG:
+                        raise WampProtocolError(
+                            "unknown RawSocket message type: {}".format(
+                                message_type)
+                        )
+
+                    continue
+
+            self._recv()
+
+    def _receive_message(self, length):
+        buffered_bytes = self._buffer
+
+        end = self.HEADER_LENGTH + length
+        if len(buffered_bytes) < end:
+            return None
+
+        body = buffered_bytes[self.HEADER_LENGTH:end]
+        del buffered_bytes[:end]
+
+        return body
+
+    def _receive_large_message(self, length):
+        buffered_bytes = self._buffer
+        body = bytearray(length)
+
+        # whatever of the message has already been received is in the
+        # receive buffer, and the rest is received straight into place
+        start = self.HEADER_LENGTH
+        buffered = min(len(buffered_bytes) - start, length)
+        body[:buffered] = buffered_bytes[start:start + buffered]
+        del buffered_bytes[:start + buffered]
+
+        logger.debug("receiving message of %s bytes", length)
+        recv_into(self.socket, body, buffered)
+
+        return body
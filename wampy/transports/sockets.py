@@ -0,0 +1,380 @@
+""" Socket setup shared by every transport.
+
+Router hosts are resolved with ``getaddrinfo`` and the addresses they
+resolve to are cached for ``DNS_CACHE_TTL`` seconds, so that many
+clients (re)connecting at once do not each ask DNS the same question.
+A host none of whose cached addresses can be connected to is looked up
+again at once.
+
+When a host resolves to more than one address, e.g. to both an IPv6 and
+an IPv4 address, they are tried "Happy Eyeballs" style (RFC 8305):
+alternating between address families, a new attempt is started every
+``CONNECTION_ATTEMPT_DELAY`` seconds, or as soon as the last one fails,
+without abandoning those still in progress, and the first to connect
+wins. One unreachable address then costs a quarter of a second rather
+than a whole connect timeout.
+
+"""
+import logging
+import socket
+from contextlib import contextmanager
+from socket import error as socket_error
+from time import time
+
+from wampy.backends import get_backend
+from wampy.errors import ConnectionError, WampyError
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_CONNECT_TIMEOUT = 5
+HANDSHAKE_TIMEOUT = 5
+CONNECTION_ATTEMPT_DELAY = 0.25
+DNS_CACHE_TTL = 60
+
+FAMILIES = {
+    None: socket.AF_UNSPEC,
+    4: socket.AF_INET,
+    6: socket.AF_INET6,
+}
+
+
+class SocketOptions(object):
+
+    def __init__(
+            self, tcp_nodelay=True, tcp_keepalive=None,
+            send_buffer_size=None, receive_buffer_size=None,
+    ):
+        """ Options for the sockets of a transport.
+
+        :Parameters:
+            tcp_nodelay : bool
+                Disable Nagle's algorithm, so that a small message is
+                sent at once rather than held back until everything
+                before it has been acknowledged. Writes are coalesced by
+                the transport anyway. Defaults to ``True``.
+            tcp_keepalive : bool or int
+                Have the OS probe an idle connection to detect a peer
+                that has silently gone away. ``True`` to probe after the
+                system's idle time, or else the number of idle seconds
+                after which to probe. Defaults to not probing.
+            send_buffer_size : int
+                The size of the kernel send buffer, in bytes.
+            receive_buffer_size : int
+                The size of the kernel receive buffer, in bytes.
+
+        """
+        self.tcp_nodelay = tcp_nodelay
+        self.tcp_keepalive = tcp_keepalive
+        self.send_buffer_size = send_buffer_size
+        self.receive_buffer_size = receive_buffer_size
+
+    def apply(self, _socket):
+        """ Set the options on ``_socket``, before it connects so that the
+        buffer sizes are taken into account when the TCP window is agreed.
+        """
+        if self.send_buffer_size:
+            _socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+        if self.receive_buffer_size:
+            _socket.setsockopt(
+                socket.SOL_SOCKET, socket.SO_RCVBUF,
+                self.receive_buffer_size)
+
+        if _socket.family == socket.AF_UNIX:
+            return
+
+        _socket.setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, int(self.tcp_nodelay))
+
+        if self.tcp_keepalive:
+            _socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+            idle = self.tcp_keepalive
+            if idle is not True and hasattr(socket, 'TCP_KEEPIDLE'):
+                _socket.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle)
+                _socket.setsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_KEEPINTVL,
+                    max(1, idle // 3))
+
+
+class AddressCache(object):
+    """ The results of ``getaddrinfo``, each kept for ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=DNS_CACHE_TTL):
+        self.ttl = ttl
+        self._addresses = {}
+
+    def get(self, key):
+        try:
+            expires, addresses = self._addresses[key]
+        except KeyError:
+            return None
+
+        if expires < time():
+            del self._addresses[key]
+            return None
+
+        return addresses
+
+    def set(self, key, addresses):
+        self._addresses[key] = (time() + self.ttl, addresses)
+
+    def evict(self, key):
+        self._addresses.pop(key, None)
+
+    def clear(self):
+        self._addresses.clear()
+
+
+address_cache = AddressCache()
+
+
+def resolve(host, port, ipv=None):
+    """ Return the addresses to try to reach ``host``:``port`` at, as
+    ``(family, sockaddr)`` pairs in the order they should be tried.
+
+    :Parameters:
+        ipv : int
+            4 or 6 to only return addresses of that version, else
+            ``None`` for both.
+
+    """
+    key = _address_key(host, port, ipv)
+    addresses = address_cache.get(key)
+    if addresses is None:
+        addresses = interleave([
+            (addrinfo[0], addrinfo[4])
+            for addrinfo in get_backend().socket.getaddrinfo(
+                host, port, key[2], socket.SOCK_STREAM)
+        ])
+        address_cache.set(key, addresses)
+
+    return addresses
+
+
+def _address_key(host, port, ipv):
+    try:
+        family = FAMILIES[ipv]
+    except KeyError:
+        raise WampyError(
+            "unknown IPV: {}".format(ipv)
+        )
+
+    return (host, port, family)
+
+
+def interleave(addresses):
+    """ Reorder ``addresses`` to alternate between address families,
+    starting with the family of the first.
+    """
+    by_family = []
+    for address in addresses:
+        for same_family in by_family:
+            if same_family[0][0] == address[0]:
+                same_family.append(address)
+                break
+        else:
+            by_family.append([address])
+
+    interleaved = []
+    while by_family:
+        for same_family in list(by_family):
+            interleaved.append(same_family.pop(0))
+            if not same_family:
+                by_family.remove(same_family)
+
+    return interleaved
+
+
+def _attempt(family, sockaddr, results, socket_options):
+    _socket = get_backend().socket.socket(family, socket.SOCK_STREAM)
+
+    try:
+        socket_options.apply(_socket)
+        _socket.connect(sockaddr)
+    except socket_error as exc:
+        _socket.close()
+        results.put((None, sockaddr, exc))
+    except BaseException:
+        # cancelled because another attempt won
+        _socket.close()
+        raise
+    else:
+        results.put((_socket, sockaddr, None))
+
+
+def _race(addresses, attempt_delay, socket_options):
+    backend = get_backend()
+    results = backend.Queue()
+    attempts = []
+    errors = []
+
+    try:
+        for family, sockaddr in addresses:
+            attempts.append(
+                backend.spawn(
+                    _attempt, family, sockaddr, results, socket_options))
+
+            # give the attempt a head start before starting the next,
+            # unless it fails first
+            try:
+                _socket, sockaddr, exc = results.get(timeout=attempt_delay)
+            except backend.Empty:
+                continue
+
+            if _socket is not None:
+                return _socket
+            errors.append(exc)
+
+        while len(errors) < len(attempts):
+            _socket, sockaddr, exc = results.get()
+            if _socket is not None:
+                return _socket
+            errors.append(exc)
+
+        if errors:
+            raise errors[-1]
+        raise socket_error("no addresses to connect to")
+
+    finally:
+        for attempt in attempts:
+            attempt.kill()
+
+        # close any socket connected too late to win
+        while not results.empty():
+            _socket, _, _ = results.get()
+            if _socket is not None:
+                _socket.close()
+
+
+def connect_tcp(
+        host, port, ipv=None, timeout=DEFAULT_CONNECT_TIMEOUT,
+        attempt_delay=CONNECTION_ATTEMPT_DELAY, socket_options=None,
+):
+    """ Return a TCP socket connected to ``host``:``port``.
+
+    When none of the cached addresses of ``host`` can be connected to,
+    e.g. because it has moved, it is looked up again, and the addresses
+    it now resolves to tried once.
+
+    :Parameters:
+        ipv : int
+            4 or 6 to only connect over that version of IP, else
+            ``None`` to connect over whichever answers first.
+        timeout : float
+            Give up, raising ``socket.timeout``, when no connection has
+            been made after this many seconds.
+        attempt_delay : float
+            How long to wait on one address before also trying the next.
+        socket_options : instance
+            A :class:`SocketOptions` to apply to the socket.
+
+    """
+    socket_options = socket_options or SocketOptions()
+    backend = get_backend()
+
+    key = _address_key(host, port, ipv)
+    cached = address_cache.get(key) is not None
+
+    timer = backend.Timeout(timeout)
+    try:
+        try:
+            return _race(
+                resolve(host, port, ipv), attempt_delay, socket_options)
+        except socket_error as exc:
+            if not cached:
+                raise
+
+            logger.debug(
+                'unable to connect to the cached addresses of %s:%s: %s',
+                host, port, exc,
+            )
+            address_cache.evict(key)
+            return _race(
+                resolve(host, port, ipv), attempt_delay, socket_options)
+    except backend.Timeout as exc:
+        if exc is not timer:
+            raise
+
+        logger.debug(
+            'timed out connecting to %s:%s (IPV%s)', host, port, ipv or '4/6'
+        )
+        raise socket.timeout(
+            "timed out after {} seconds connecting to {}:{}".format(
+                timeout, host, port)
+        )
+    except socket_error as exc:
+        logger.debug(
+            'unable to connect to %s:%s (IPV%s): %s',
+            host, port, ipv or '4/6', exc,
+        )
+        raise
+    finally:
+        timer.cancel()
+
+
+@contextmanager
+def socket_timeout(_socket, seconds):
+    """ Have blocking operations on ``_socket`` raise ``socket.timeout``
+    after ``seconds`` until the block is left, and then restore its
+    timeout.
+
+    A backend ``Timeout`` cannot interrupt a thread of the threading
+    backend blocked reading from a socket, but the socket itself can.
+
+    """
+    previous = _socket.gettimeout()
+    _socket.settimeout(seconds)
+    try:
+        yield
+    finally:
+        _socket.settimeout(previous)
+
+
+def recv_into(_socket, buffer, offset=0):
+    """ Receive into ``buffer``, from ``offset`` on, until it is full.
+
+    Receiving a large message straight into a buffer of its own size
+    saves growing a receive buffer to hold it and then copying it out.
+
+    """
+    view = memoryview(buffer)
+    length = len(buffer)
+    backend = get_backend()
+
+    while offset < length:
+        try:
+            received = _socket.recv_into(view[offset:])
+        except backend.ThreadExit as exc:
+            raise ConnectionError('Connection closed: "{}"'.format(exc))
+        except Exception as exc:
+            raise ConnectionError('error: "{}"'.format(exc))
+
+        if not received:
+            raise ConnectionError(
+                "connection closed after {} of {} bytes".format(
+                    offset, length)
+            )
+
+        offset += received
+
+
+def connect_unix(path, socket_options=None):
+    """ Return a socket connected to the Unix domain socket at ``path``.
+    """
+    _socket = get_backend().socket.socket(
+        socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        if socket_options is not None:
+            socket_options.apply(_socket)
+        _socket.connect(path)
+    except socket_error:
+        logger.debug('unable to connect to %s', path)
+        _socket.close()
+        raise
+
+    return _socket
@@ -0,0 +1,136 @@
+""" TLS for the transports.
+
+Creating an ``SSLContext`` loads and parses the CA certificates, so one
+context is created per certificate and shared by every connection that
+verifies the router with it, rather than one per connection.
+
+Where Python supports it (3.6+), the TLS session of the last connection
+to each router is kept and offered when connecting to it again, so that
+reconnecting resumes the session with an abbreviated handshake instead
+of running the full key exchange and certificate verification.
+
+"""
+import logging
+import ssl
+
+from wampy.backends import get_backend
+
+logger = logging.getLogger(__name__)
+
+
+CIPHERS = (
+    "ECDH+AESGCM:DH+AESGCM:ECDH+AES256:DH+AES256:ECDH+AES128:DH+AES:"
+    "ECDH+3DES:DH+3DES:RSA+AES:RSA+3DES:!ADH:!AECDH:!MD5:!DSS"
+)
+
+# a WebSocket opens with an HTTP/1.1 upgrade request
+ALPN_PROTOCOLS = ('http/1.1',)
+
+SESSION_RESUMPTION = hasattr(ssl, 'SSLSession')
+
+_contexts = {}
+_sessions = {}
+
+
+def create_ssl_context(
+        certificate=None, alpn_protocols=ALPN_PROTOCOLS,
+        check_hostname=False, ssl_module=None,
+):
+    """ Return a new ``SSLContext`` for connecting to a Router.
+
+    :Parameters:
+        certificate : string
+            Path to the CA certificate(s) to verify the router with.
+            Defaults to the system's.
+        alpn_protocols : sequence
+            The protocols to offer by ALPN.
+        check_hostname : bool
+            Also check that the router's certificate matches its host.
+        ssl_module : module
+            The ``ssl`` module to create the context with. Defaults to
+            that of the concurrency backend, whose contexts wrap sockets
+            that cooperate with its threads.
+
+    """
+    if ssl_module is None:
+        ssl_module = get_backend().ssl
+
+    # negotiate the highest version both ends support, but no lower than
+    # TLS 1.2
+    context = ssl_module.SSLContext(ssl.PROTOCOL_SSLv23)
+    context.options |= (
+        ssl.OP_NO_SSLv2 | ssl.OP_NO_SSLv3 | ssl.OP_NO_TLSv1 |
+        ssl.OP_NO_TLSv1_1
+    )
+    context.set_ciphers(CIPHERS)
+    context.verify_mode = ssl.CERT_REQUIRED
+    context.check_hostname = check_hostname
+
+    if certificate:
+        context.load_verify_locations(cafile=certificate)
+    else:
+        context.load_default_certs()
+
+    if alpn_protocols and getattr(ssl, 'HAS_ALPN', False):
+        context.set_alpn_protocols(list(alpn_protocols))
+
+    return context
+
+
+def get_ssl_context(certificate=None, ssl_module=None):
+    """ Return the ``SSLContext`` shared by every connection verifying its
+    router with ``certificate``.
+    """
+    if ssl_module is None:
+        ssl_module = get_backend().ssl
+
+    key = (certificate, ssl_module)
+    try:
+        return _contexts[key]
+    except KeyError:
+        context = _contexts[key] = create_ssl_context(
+            certificate, ssl_module=ssl_module)
+        return context
+
+
+def wrap_socket(sock, context, host, port):
+    """ Run the TLS handshake over the connected ``sock``, resuming the
+    last session with ``host``:``port`` if there is one.
+    """
+    kwargs = {}
+    if SESSION_RESUMPTION:
+        session = _sessions.get((context, host, port))
+        if session is not None:
+            kwargs['session'] = session
+
+    wrapped_socket = context.wrap_socket(
+        sock, server_hostname=host, **kwargs)
+
+    if SESSION_RESUMPTION:
+        logger.debug(
+            "TLS handshake with %s:%s complete (session %s)", host, port,
+            "resumed" if wrapped_socket.session_reused else "new",
+        )
+
+    return wrapped_socket
+
+
+def save_session(sock, context, host, port):
+    """ Keep the TLS session of ``sock`` to resume when next connecting to
+    ``host``:``port``.
+
+    Under TLS 1.3 the server sends its session tickets after the
+    handshake, so this should be called once it has sent something.
+
+    """
+    if not SESSION_RESUMPTION:
+        return
+
+    session = sock.session
+    if session is not None:
+        _sessions[(context, host, port)] = session
+
+
+def clear():
+    _contexts.clear()
+    _sessions.clear()
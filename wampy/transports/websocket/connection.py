@@ -1,89 +1,194 @@
 import logging
 import socket
-import ssl
 import uuid
 from base64 import encodestring
-from socket import error as socket_error
-
-import eventlet
+from struct import pack, unpack
+from time import time
 
+from wampy.backends import get_backend
 from wampy.constants import WEBSOCKET_SUBPROTOCOLS, WEBSOCKET_VERSION
-from wampy.errors import (
-    IncompleteFrameError, ConnectionError, WampProtocolError, WampyError)
+from wampy.errors import ConnectionError, WampProtocolError, WampyError
 from wampy.mixins import ParseUrlMixin
+from wampy.transports import tls
+from wampy.transports.sockets import (
+    DEFAULT_CONNECT_TIMEOUT, HANDSHAKE_TIMEOUT, SocketOptions, connect_tcp,
+    connect_unix, recv_into, socket_timeout,
+)
+from wampy.transports.writer import Writer
 
-from . frames import ClientFrame, ServerFrame
+from . deflate import PerMessageDeflate
+from . frames import ClientFrame, Frame, FrameHeader, ServerFrame
+from . reader import MessageReader, close_frame
 
 logger = logging.getLogger(__name__)
 
 
+def bytes_to_text(data):
+    try:
+        return bytes(data).decode('utf-8')
+    except UnicodeDecodeError:
+        return bytes(data).decode('latin-1')
+
+
 class WampWebSocket(ParseUrlMixin):
 
-    def __init__(self, router):
+    # status code for a normal closure of the connection
+    CLOSE_NORMAL = 1000
+
+    # the maximum number of bytes to ask for with each ``recv``
+    recv_bufsize = 64 * 1024
+    # frames of at least this many bytes are received straight into a
+    # buffer of their own rather than through the receive buffer
+    large_frame_size = 1024 * 1024
+
+    def __init__(
+            self, router, max_message_size=None, fragment_size=None,
+            ping_interval=None, max_missed_pongs=3, compression=None,
+            connect_timeout=DEFAULT_CONNECT_TIMEOUT, socket_options=None,
+            send_queue=None,
+    ):
+        """ A WebSocket connection to a Router.
+
+        :Parameters:
+            router : instance
+                An instance of :class:`peers.Router`.
+            max_message_size : int
+                The largest message, in bytes, that the server may send
+                over this connection, however many frames it takes to do
+                so. A message is rejected as soon as a frame header
+                shows it to be too large, before its body is received.
+                Defaults to no limit.
+            fragment_size : int
+                When given, outgoing messages larger than this many bytes
+                are split into fragments of at most this size, so that a
+                huge message does not hold the socket for the whole of its
+                transfer. Defaults to sending every message as one frame.
+            ping_interval : float
+                When given, PING the server every ``ping_interval``
+                seconds, measuring the round trip time of each, and give
+                up on the connection once ``max_missed_pongs`` PINGs in a
+                row have gone unanswered. Defaults to never sending PINGs.
+            max_missed_pongs : int
+                See ``ping_interval``.
+            compression : bool or dict
+                Offer the server the permessage-deflate extension: either
+                ``True``, or a dictionary of keyword arguments for
+                :class:`deflate.PerMessageDeflate`. Defaults to no
+                compression.
+            connect_timeout : float
+                Give up on connecting to the server after this many
+                seconds.
+            socket_options : dict
+                Keyword arguments for :class:`sockets.SocketOptions`,
+                e.g. to enable TCP keepalive or size the socket buffers.
+            send_queue : dict
+                Keyword arguments for :class:`writer.Writer`, bounding
+                the queue of messages waiting to be sent: its
+                ``high_watermark`` and ``low_watermark``, in bytes, and
+                the ``overflow`` policy once it is full.
+
+        """
         self.url = router.url
 
         self.host = None
         self.port = None
         self.ipv = router.ipv
         self.resource = None
+        # set for ``ws+unix`` and ``wss+unix`` URLs
+        self.unix_socket_path = None
 
         self.parse_url()
         self.websocket_location = self.resource
         self.key = encodestring(uuid.uuid4().bytes).decode('utf-8').strip()
         self.socket = None
 
-    def _connect(self):
-        if self.ipv == 4:
-            _socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-            try:
-                _socket.connect((self.host, self.port))
-            except socket_error as exc:
-                if exc.errno == 61:
-                    logger.error(
-                        'unable to connect to %s:%s (IPV%s)',
-                        self.host, self.port, self.ipv
-                    )
-
-                raise
-
-        elif self.ipv == 6:
-            _socket = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
-
-            try:
-                _socket.connect(("::", self.port))
-            except socket_error as exc:
-                if exc.errno == 61:
-                    logger.error(
-                        'unable to connect to %s:%s (IPV%s)',
-                        self.host, self.port, self.ipv
-                    )
-
-                raise
+        self.connect_timeout = connect_timeout
+        self.socket_options = SocketOptions(**(socket_options or {}))
+        self.max_message_size = max_message_size
+        self.fragment_size = fragment_size
+        self.ping_interval = ping_interval
+        self.max_missed_pongs = max_missed_pongs
+
+        if compression is True:
+            compression = {}
+        elif compression is False:
+            compression = None
+        self.compression = compression
+        self._deflate_offer = None
+
+        # the round trip time of the last answered PING, in seconds
+        self.rtt = None
+        self.missed_pongs = 0
+        self._keepalive_thread = None
+        self._close_sent = False
+
+        # bytes received but not yet returned as part of a frame
+        self._buffer = bytearray()
+        self._frame_header = None
+        # makes messages of the frames received
+        self.messages = MessageReader(max_message_size)
+
+        # a message, fragmented or not, is queued while holding the
+        # ``_message_lock`` so that no other message can arrive between
+        # two fragments, and the ``writer`` alone writes to the socket
+        self.backend = get_backend()
+        self._message_lock = self.backend.Semaphore()
+        self.writer = Writer(self._sendall, **(send_queue or {}))
 
+    def _connect(self):
+        if self.unix_socket_path:
+            # a router on the same host need not be reached over TCP
+            self.socket = connect_unix(
+                self.unix_socket_path, socket_options=self.socket_options)
         else:
-            raise WampyError(
-                "unknown IPV: {}".format(self.ipv)
+            self.socket = connect_tcp(
+                self.host, self.port, self.ipv, timeout=self.connect_timeout,
+                socket_options=self.socket_options,
             )
 
-        self.socket = _socket
-
     def _upgrade(self):
         handshake_headers = self._get_handshake_headers()
         handshake = '\r\n'.join(handshake_headers) + "\r\n\r\n"
 
-        self.socket.send(handshake)
+        self.socket.sendall(handshake.encode('utf-8'))
 
         try:
-            with eventlet.Timeout(5):
+            with self.backend.Timeout(HANDSHAKE_TIMEOUT), socket_timeout(
+                    self.socket, HANDSHAKE_TIMEOUT):
                 self.status, self.headers = self._read_handshake_response()
-        except eventlet.Timeout:
+        except (self.backend.Timeout, socket.timeout):
             raise WampyError(
                 'No response after handshake "{}"'.format(handshake)
             )
 
         logger.debug("WAMP Connection reply: %s", self.headers)
 
+        extensions = self.headers.get('sec-websocket-extensions')
+        if (
+                self._deflate_offer is not None and extensions and
+                self._deflate_offer.accept(extensions)
+        ):
+            self.messages.deflate = self._deflate_offer
+
+    @property
+    def deflate(self):
+        """ The permessage-deflate extension, once agreed with the
+        server.
+        """
+        return self.messages.deflate
+
+    @property
+    def netloc(self):
+        host = self.host
+        if ':' in host:
+            # an IPv6 address
+            host = "[{}]".format(host)
+
+        # there is no port for a Unix domain socket
+        if self.port is None:
+            return host
+        return "{}:{}".format(host, self.port)
+
     def _get_handshake_headers(self):
         """ Do an HTTP upgrade handshake with the server.
 
@@ -98,7 +203,7 @@ class WampWebSocket(ParseUrlMixin):
         headers = []
         # https://tools.ietf.org/html/rfc6455
         headers.append("GET /{} HTTP/1.1".format(self.websocket_location))
-        headers.append("Host: {}:{}".format(self.host, self.port))
+        headers.append("Host: {}".format(self.netloc))
         headers.append("Upgrade: websocket")
         headers.append("Connection: Upgrade")
         # Sec-WebSocket-Key header containing base64-encoded random bytes,
@@ -107,49 +212,67 @@ class WampWebSocket(ParseUrlMixin):
         # proxy from re-sending a previous WebSocket conversation and does not
         # provide any authentication, privacy or integrity
         headers.append("Sec-WebSocket-Key: {}".format(self.key))
-        headers.append("Origin: ws://{}:{}".format(self.host, self.port))
+        headers.append("Origin: ws://{}".format(self.netloc))
         headers.append("Sec-WebSocket-Version: {}".format(WEBSOCKET_VERSION))
         headers.append("Sec-WebSocket-Protocol: {}".format(
             WEBSOCKET_SUBPROTOCOLS))
+        if self._deflate_offer is not None:
+            headers.append("Sec-WebSocket-Extensions: {}".format(
+                self._deflate_offer.offer()))
         logger.info(headers)
         return headers
 
     def _read_handshake_response(self):
-        status = None
-        headers = {}
+        """ Read and parse the server's reply to the upgrade request.
+
+        The response is received in chunks into the connection buffer
+        until the blank line ending the headers arrives, and then parsed
+        in one go. The server is free to start sending frames as soon as
+        it has replied, so any bytes following the headers are left in
+        the buffer for ``read_websocket_frame``.
+
+        """
+        buffered_bytes = self._buffer
 
         while True:
-            # we need this to guarantee we can context switch back to the
-            # Timeout.
-            eventlet.sleep()
+            end = buffered_bytes.find(b'\r\n\r\n')
+            if end != -1:
+                break
 
-            line = self._recv_handshake_response_by_line()
+            received_bytes = self.socket.recv(self.recv_bufsize)
+            if not received_bytes:
+                raise ConnectionError(
+                    'Connection closed during the handshake: "{}"'.format(
+                        bytes_to_text(buffered_bytes))
+                )
 
-            try:
-                line = line.decode('utf-8')
-            except:
-                line = u'{}'.format(line)
+            buffered_bytes.extend(received_bytes)
 
-            if line == "\r\n" or line == "\n":
-                break
+        response = bytes_to_text(buffered_bytes[:end])
+        del buffered_bytes[:end + 4]
+
+        lines = response.split('\r\n')
 
+        status_info = lines[0].strip().split(" ", 2)
+        try:
+            status = int(status_info[1])
+        except (IndexError, ValueError):
+            logger.warning('unexpected handshake resposne')
+            logger.error('%s', status_info)
+            raise WampProtocolError(
+                'Invalid handshake response: "{}"'.format(lines[0])
+            )
+
+        headers = {
+            'status_info': status_info,
+            'status': status,
+        }
+
+        for line in lines[1:]:
             line = line.strip()
             if line == '':
                 continue
 
-            if not status:
-                status_info = line.split(" ", 2)
-                try:
-                    status = int(status_info[1])
-                except IndexError:
-                    logger.warning('unexpected handshake resposne')
-                    logger.error('%s', status_info)
-                    raise
-
-                headers['status_info'] = status_info
-                headers['status'] = status
-                continue
-
             kv = line.split(":", 1)
             if len(kv) != 2:
                 raise Exception(
@@ -163,37 +286,114 @@ class WampWebSocket(ParseUrlMixin):
 
         return status, headers
 
-    def _recv_handshake_response_by_line(self):
-        received_bytes = bytearray()
+    def connect(self):
+        self._buffer = bytearray()
+        self._frame_header = None
+        self.messages.reset()
+        self._close_sent = False
+        self.rtt = None
+        self.missed_pongs = 0
 
-        while True:
-            bytes = self.socket.recv(1)
+        if self.compression is not None:
+            self._deflate_offer = PerMessageDeflate(**self.compression)
 
-            if not bytes:
-                break
+        self._connect()
+        self._upgrade()
+        self.writer.start()
 
-            received_bytes.append(bytes)
+        if self.ping_interval:
+            self._keepalive_thread = self.backend.spawn(self._keepalive)
 
-            if bytes == "\n" or bytes == "\r\n":
-                # a complete line has been received
-                break
+    def disconnect(self):
+        """ Close the connection, telling the server why if it is still
+        there to be told.
+        """
+        if self._keepalive_thread is not None:
+            self._keepalive_thread.kill()
+            self._keepalive_thread = None
 
-        return received_bytes
+        if self.socket is None:
+            return
 
-    def connect(self):
-        self._connect()
-        self._upgrade()
+        if not self._close_sent:
+            try:
+                self._send_close(self.CLOSE_NORMAL)
+            except Exception as exc:
+                logger.debug("failed to send CLOSE: %s", exc)
 
-    def read_websocket_frame(self, bufsize=1):
-        frame = None
-        received_bytes = bytearray()
+        self.writer.stop()
 
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except socket.error:
+            pass
+
+        self.socket.close()
+
+    def ping(self, payload=None):
+        """ Send a PING. Unless a ``payload`` is given the time it is
+        sent is used, so that the round trip time can be measured when
+        the PONG comes back.
+        """
+        if payload is None:
+            payload = pack('!d', time())
+
+        self._send_frame(ClientFrame(payload, opcode=Frame.OPCODE_PING))
+
+    def _keepalive(self):
         while True:
+            self.backend.sleep(self.ping_interval)
+
+            if self.missed_pongs >= self.max_missed_pongs:
+                logger.error(
+                    "no PONG for the last %s PINGs: giving up on %s",
+                    self.missed_pongs, self.url
+                )
+                # the listener will now be woken to find the connection
+                # has gone, rather than waiting for data that will never
+                # arrive
+                try:
+                    self.socket.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+                return
+
+            self.missed_pongs += 1
+            try:
+                self.ping()
+            except Exception as exc:
+                logger.error("failed to send PING: %s", exc)
+                return
+
+    def read_websocket_frame(self, bufsize=None):
+        """ Return the next complete frame sent by the server.
+
+        Bytes are received in large chunks into a buffer that persists
+        for the lifetime of the connection, so that a burst of frames
+        is received with a single ``recv`` and then handed out one
+        frame at a time without touching the socket again.
+
+        """
+        bufsize = bufsize or self.recv_bufsize
+
+        while True:
+            frame = self._read_frame_from_buffer()
+            if frame is not None:
+                if frame.is_control:
+                    self._handle_control_frame(frame)
+                    continue
+
+                message = self.messages.reassemble(frame)
+                if message is not None:
+                    return message
+
+                continue
+
             logger.debug("waiting for %s bytes", bufsize)
 
             try:
                 bytes = self.socket.recv(bufsize)
-            except eventlet.greenlet.GreenletExit as exc:
+            except self.backend.ThreadExit as exc:
                 raise ConnectionError('Connection closed: "{}"'.format(exc))
             except socket.timeout as e:
                 message = str(e)
@@ -202,55 +402,190 @@ class WampWebSocket(ParseUrlMixin):
                 raise ConnectionError('error: "{}"'.format(exc))
 
             if not bytes:
-                break
+                raise WampProtocolError("No frame returned")
 
-            logger.debug("received %s bytes", bufsize)
-            received_bytes.extend(bytes)
+            logger.debug("received %s bytes", len(bytes))
+            self._buffer.extend(bytes)
 
-            try:
-                frame = ServerFrame(received_bytes)
-            except IncompleteFrameError as exc:
-                bufsize = exc.required_bytes
-            else:
-                break
+    def _read_frame_from_buffer(self):
+        buffered_bytes = self._buffer
+
+        # the header of the next frame is parsed only once, however many
+        # reads it then takes to receive the rest of the frame
+        header = self._frame_header
+        if header is None:
+            header = FrameHeader.parse(buffered_bytes)
+            if header is None:
+                return None
 
-        if frame is None:
-            raise WampProtocolError("No frame returned")
+            self.messages.check_message_size(header)
+            self._frame_header = header
+
+        if header.payload_length >= self.large_frame_size:
+            return self._read_large_frame(header)
+
+        frame_length = header.frame_length
+        if len(buffered_bytes) < frame_length:
+            return None
+
+        frame = ServerFrame(buffered_bytes[:frame_length], header=header)
+
+        del buffered_bytes[:frame_length]
+        self._frame_header = None
 
         return frame
 
-    def send_websocket_frame(self, message):
-        frame = ClientFrame(message)
-        self.socket.sendall(frame.payload)
+    def _read_large_frame(self, header):
+        buffered_bytes = self._buffer
+        body = bytearray(header.payload_length)
+
+        # whatever of the body has already been received is in the
+        # receive buffer, and the rest is received straight into place
+        start = header.length
+        buffered = min(len(buffered_bytes) - start, header.payload_length)
+        body[:buffered] = buffered_bytes[start:start + buffered]
+        del buffered_bytes[:start + buffered]
+        self._frame_header = None
+
+        logger.debug("receiving frame of %s bytes", header.payload_length)
+        recv_into(self.socket, body, buffered)
+
+        return ServerFrame.from_body(
+            opcode=header.opcode, body=body, rsv1=header.rsv1,
+            fin=header.fin,
+        )
+
+    def _handle_control_frame(self, frame):
+        reply, error = self.messages.read_control_frame(frame)
+
+        if frame.opcode == Frame.OPCODE_PONG:
+            self.missed_pongs = 0
+            body = frame.body
+            if len(body) == 8:
+                self.rtt = time() - unpack('!d', bytes(body))[0]
+                logger.debug("PONG received: RTT %.6fs", self.rtt)
+
+        elif frame.opcode == Frame.OPCODE_CLOSE:
+            if not self._close_sent:
+                # echo the status code back, completing the closing
+                # handshake
+                self._close_sent = True
+                try:
+                    self._send_frame(reply)
+                except Exception as exc:
+                    logger.debug("failed to reply to CLOSE: %s", exc)
+
+        elif reply is not None:
+            self._send_frame(reply)
+
+        if error is not None:
+            raise error
+
+    def _send_close(self, code=None):
+        self._close_sent = True
+        self._send_frame(close_frame(code))
+
+    def receive(self):
+        """ Return the next message sent by the server. """
+        return self.read_websocket_frame()
+
+    def send(self, message, binary=False):
+        self.send_websocket_frame(message, binary=binary)
+
+    def send_websocket_frame(self, message, binary=False):
+        """ Send a message to the server.
+
+        :Parameters:
+            message : string, bytes, bytearray or memoryview
+                Text is encoded as UTF-8. Anything else is sent as it is,
+                without being copied or converted.
+            binary : bool
+                Send a binary rather than a text message.
+
+        """
+        if not isinstance(message, (bytes, bytearray, memoryview)):
+            # text is encoded once, here, and never converted again
+            message = message.encode('utf-8')
+
+        opcode = Frame.OPCODE_BINARY if binary else Frame.OPCODE_TEXT
+
+        if not self.writer.admit():
+            return
+
+        with self._message_lock:
+            # messages must be compressed in the order they are sent, as
+            # each may refer back to those before it
+            rsv1 = 0
+            if self.deflate is not None and self.deflate.should_compress(
+                    message):
+                message = self.deflate.compress(message)
+                rsv1 = 1
+
+            if self.fragment_size and len(message) > self.fragment_size:
+                self._send_fragmented(message, opcode=opcode, rsv1=rsv1)
+            else:
+                self._send_frame(
+                    ClientFrame(message, opcode=opcode, rsv1=rsv1))
+
+    def _send_fragmented(self, message, opcode=Frame.OPCODE_TEXT, rsv1=0):
+        fragment_size = self.fragment_size
+        message = memoryview(message)
+        length = len(message)
+
+        logger.debug(
+            "sending %s bytes in fragments of %s", length, fragment_size)
+
+        for offset in range(0, length, fragment_size):
+            end = offset + fragment_size
+            frame = ClientFrame(
+                message[offset:end], opcode=opcode, fin=int(end >= length),
+                rsv1=rsv1,
+            )
+            self._send_frame(frame)
+            # only the first frame of a message is flagged as compressed
+            opcode = Frame.OPCODE_CONT
+            rsv1 = 0
+
+            # let other threads run between fragments
+            self.backend.sleep()
+
+    def _send_frame(self, frame):
+        self.writer.write(frame.payload)
+
+    def _sendall(self, data):
+        # a memoryview lets a partial send resume without copying what
+        # remains of the data
+        self.socket.sendall(memoryview(data))
 
 
 class TLSWampWebSocket(WampWebSocket):
-    def __init__(self, router):
-        super(TLSWampWebSocket, self).__init__(router)
+    def __init__(self, router, ssl_context=None, **kwargs):
+        """ A secure WebSocket connection to a Router.
+
+        :Parameters:
+            ssl_context : ssl.SSLContext
+                Defaults to one shared by every connection verifying its
+                router with the router's certificate.
+
+        Any other keyword arguments are as for :class:`WampWebSocket`.
+
+        """
+        super(TLSWampWebSocket, self).__init__(router, **kwargs)
 
         self.ipv = router.ipv
-        self.ssl_version = ssl.PROTOCOL_TLSv1_2
         self.certificate = router.certificate
+        self.ssl_context = ssl_context or tls.get_ssl_context(
+            self.certificate)
 
     def _connect(self):
-        _socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        wrapped_socket = ssl.wrap_socket(
-            _socket,
-            ssl_version=self.ssl_version,
-            ciphers="ECDH+AESGCM:DH+AESGCM:ECDH+AES256:DH+AES256:ECDH+AES128:\
-            DH+AES:ECDH+3DES:DH+3DES:RSA+AES:RSA+3DES:!ADH:!AECDH:!MD5:!DSS",
-            cert_reqs=ssl.CERT_REQUIRED,
-            ca_certs=self.certificate,
-        )
+        super(TLSWampWebSocket, self)._connect()
 
-        try:
-            wrapped_socket.connect((self.host, self.port))
-        except socket_error as exc:
-            if exc.errno == 61:
-                logger.error(
-                    'unable to connect to %s:%s', self.host, self.port
-                )
+        self.socket = tls.wrap_socket(
+            self.socket, self.ssl_context, self.host, self.port)
 
-            raise
+    def _upgrade(self):
+        super(TLSWampWebSocket, self)._upgrade()
 
-        self.socket = wrapped_socket
+        # the server has replied, so any session ticket it sends after the
+        # handshake has arrived too
+        tls.save_session(self.socket, self.ssl_context, self.host, self.port)
@@ -0,0 +1,207 @@
+""" The "permessage-deflate" WebSocket extension.
+
+https://tools.ietf.org/html/rfc7692
+
+When both peers agree to it during the opening handshake, each message
+may be compressed with DEFLATE before it is framed. A compressed message
+is flagged by the RSV1 bit of its first frame.
+
+"""
+import logging
+import zlib
+
+from wampy.errors import WebsocktProtocolError
+
+
+logger = logging.getLogger(__name__)
+
+
+class PerMessageDeflate(object):
+
+    NAME = 'permessage-deflate'
+
+    # every compressed message ends with an empty, uncompressed DEFLATE
+    # block which is removed before the message is sent, and so must be
+    # put back before it is decompressed.
+    TAIL = b'\x00\x00\xff\xff'
+
+    MAX_WINDOW_BITS = 15
+    # zlib cannot compress raw DEFLATE with a window of less than 2**9
+    MIN_WINDOW_BITS = 9
+
+    def __init__(
+            self, client_max_window_bits=MAX_WINDOW_BITS,
+            server_max_window_bits=MAX_WINDOW_BITS,
+            client_no_context_takeover=False,
+            server_no_context_takeover=False,
+            threshold=128, level=zlib.Z_DEFAULT_COMPRESSION,
+    ):
+        """ Compression of WebSocket messages.
+
+        :Parameters:
+            client_max_window_bits : int
+                The base two logarithm of the largest LZ77 window to
+                compress outgoing messages with.
+            server_max_window_bits : int
+                The same, but asked of the server for incoming messages.
+            client_no_context_takeover : bool
+                Start each outgoing message with an empty window rather
+                than carrying it over from the last. Uses less memory, but
+                compresses less well.
+            server_no_context_takeover : bool
+                The same, but asked of the server for incoming messages.
+            threshold : int
+                Outgoing messages smaller than this many bytes are sent
+                without compression, where it is not worth the cost.
+            level : int
+                The zlib compression level, from 0 to 9.
+
+        """
+        for window_bits in (client_max_window_bits, server_max_window_bits):
+            if not (
+                    self.MIN_WINDOW_BITS <= window_bits <=
+                    self.MAX_WINDOW_BITS
+            ):
+                raise ValueError(
+                    "window bits must be between {} and {}: {}".format(
+                        self.MIN_WINDOW_BITS, self.MAX_WINDOW_BITS,
+                        window_bits)
+                )
+
+        self.client_max_window_bits = client_max_window_bits
+        self.server_max_window_bits = server_max_window_bits
+        self.client_no_context_takeover = client_no_context_takeover
+        self.server_no_context_takeover = server_no_context_takeover
+        self.threshold = threshold
+        self.level = level
+
+        self._compressor = None
+        self._decompressor = None
+
+    def offer(self):
+        """ Return the ``Sec-WebSocket-Extensions`` header value offering
+        the extension to the server.
+        """
+        params = [self.NAME]
+
+        if self.client_no_context_takeover:
+            params.append('client_no_context_takeover')
+        if self.server_no_context_takeover:
+            params.append('server_no_context_takeover')
+        if self.server_max_window_bits < self.MAX_WINDOW_BITS:
+            params.append(
+                'server_max_window_bits={}'.format(
+                    self.server_max_window_bits)
+            )
+
+        # tell the server that it may limit the window we compress with
+        if self.client_max_window_bits < self.MAX_WINDOW_BITS:
+            params.append(
+                'client_max_window_bits={}'.format(
+                    self.client_max_window_bits)
+            )
+        else:
+            params.append('client_max_window_bits')
+
+        return '; '.join(params)
+
+    def accept(self, header):
+        """ Configure the extension from the server's response to our
+        offer.
+
+        :Parameters:
+            header : string
+                the ``Sec-WebSocket-Extensions`` response header value
+
+        :Returns:
+            ``True`` if the server agreed to the extension, else
+            ``False``.
+
+        """
+        for extension in header.split(','):
+            params = [param.strip() for param in extension.split(';')]
+            if params[0] != self.NAME:
+                continue
+
+            for param in params[1:]:
+                name, _, value = param.partition('=')
+                name = name.strip()
+                value = value.strip().strip('"')
+
+                if name == 'client_no_context_takeover':
+                    self.client_no_context_takeover = True
+                elif name == 'server_no_context_takeover':
+                    self.server_no_context_takeover = True
+                elif name == 'client_max_window_bits' and value:
+                    self.client_max_window_bits = min(
+                        self.client_max_window_bits, int(value))
+                elif name == 'server_max_window_bits' and value:
+                    self.server_max_window_bits = int(value)
+                else:
+                    raise WebsocktProtocolError(
+                        "unexpected {} parameter: {}".format(
+                            self.NAME, param)
+                    )
+
+            self.client_max_window_bits = max(
+                self.client_max_window_bits, self.MIN_WINDOW_BITS)
+
+            logger.info(
+                "%s accepted: client window %s bits%s, "
+                "server window %s bits%s",
+                self.NAME, self.client_max_window_bits,
+                ' (no context takeover)'
+                if self.client_no_context_takeover else '',
+                self.server_max_window_bits,
+                ' (no context takeover)'
+                if self.server_no_context_takeover else '',
+            )
+            return True
+
+        return False
+
+    def should_compress(self, message):
+        return len(message) >= self.threshold
+
+    def compress(self, message):
+        if self._compressor is None or self.client_no_context_takeover:
+            self._compressor = zlib.compressobj(
+                self.level, zlib.DEFLATED, -self.client_max_window_bits,
+            )
+
+        if isinstance(message, memoryview):
+            message = message.tobytes()
+        elif not isinstance(message, bytes):
+            message = bytes(message)
+
+        compressed = self._compressor.compress(message)
+        compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+        assert compressed.endswith(self.TAIL)
+        return compressed[:-len(self.TAIL)]
+
+    def decompress(self, message, max_size=None):
+        """ Decompress a message, raising ``WebsocktProtocolError`` if it
+        would decompress to more than ``max_size`` bytes.
+        """
+        if self._decompressor is None or self.server_no_context_takeover:
+            self._decompressor = zlib.decompressobj(
+                -self.server_max_window_bits,
+            )
+
+        decompressor = self._decompressor
+        data = bytes(message) + self.TAIL
+
+        if max_size is None:
+            return decompressor.decompress(data)
+
+        # ask for one byte more than allowed, to tell a message of exactly
+        # the maximum size from one that is too big
+        decompressed = decompressor.decompress(data, max_size + 1)
+        if len(decompressed) > max_size:
+            raise WebsocktProtocolError(
+                "message exceeds the maximum size of {} bytes".format(
+                    max_size)
+            )
+
+        return decompressed
@@ -1,12 +1,11 @@
-import array
 import logging
 import json
 import os
 from struct import pack, unpack_from
 
-from wampy.errors import (
-    WampyError, WebsocktProtocolError, IncompleteFrameError
-)
+from wampy.errors import WebsocktProtocolError, IncompleteFrameError
+
+from . masking import mask, mask_in_place
 
 
 logger = logging.getLogger('wampy.networking.frames')
@@ -37,7 +36,8 @@ class Frame(object):
     # always use "text" as the type of data to send
     TEXT = 0x01  # 1, 00000001
 
-    # always send an entire message as one frame
+    # the final frame of a message, which is every frame unless the
+    # message is fragmented
     FIN = 0x80  # 128
 
     # opcodes indicate what the frame represents e.g. a ping, a pong,
@@ -91,14 +91,15 @@ class ClientFrame(Frame):
     """ Represent outgoing Client -> Server messages
     """
 
-    def __init__(self, bytes):
+    def __init__(self, bytes, opcode=Frame.OPCODE_TEXT, fin=1, rsv1=0):
         super(ClientFrame, self).__init__(bytes)
 
-        self.fin_bit = 1
-        self.rsv1_bit = 0
+        self.fin_bit = fin
+        # set on the first frame of a compressed message
+        self.rsv1_bit = rsv1
         self.rsv2_bit = 0
         self.rsv3_bit = 0
-        self.opcode = self.OPCODE_TEXT
+        self.opcode = opcode
         self.payload = self.generate_payload()
 
     # be carefule here: Python 2 a string is a byte string, but beyond this
@@ -121,18 +122,12 @@ class ClientFrame(Frame):
         # for browser vendors to get twitchy, masking was added to remove
         # the possibility of it being used as an attack.
         if data is None:
-            data = ""
-
-        _m = array.array("B", mask_key)
-        _d = array.array("B", data)
+            data = b""
 
-        for i in range(len(_d)):
-            _d[i] ^= _m[i % 4]
-
-        return _d.tostring()
+        return mask(mask_key, data)
 
     def generate_payload(self):
-        """ Format data to string (bytes) to send to server.
+        """ Format data to a bytearray to send to server.
         """
         # the first byte contains the FIN bit, the 3 RSV bits and the
         # 4 opcode bits and for a client will *always* be 1000 0001 (or 129).
@@ -148,14 +143,15 @@ class ClientFrame(Frame):
 
         # this shifts each bit into position and bitwise ORs them together,
         # using the struct module to pack them as incoming network bytes
-        payload = pack(
+        header = pack(
             '!B', (
                 (self.fin_bit << 7) |
+                (self.rsv1_bit << 6) |
                 self.opcode
             )
         )  # which is '\x81' as a raw byte repr
 
-        # note that because all RSV bits are zero, we can ignore them
+        # note that because RSV2 and RSV3 are always zero, we can ignore them
 
         # the second byte - and maybe the 7 after this, we'll use to tell
         # the server how long our payload is.
@@ -181,105 +177,196 @@ class ClientFrame(Frame):
         # the second byte contains the payload length and mask
         if length < self.LENGTH_7:
             # we can simply represent payload length with first 7 bits
-            payload += pack('!B', (mask_bit | length))
+            header += pack('!B', (mask_bit | length))
         elif length < self.LENGTH_16:
-            payload += pack('!B', (mask_bit | 126)) + pack('!H', length)
+            header += pack('!B', (mask_bit | 126)) + pack('!H', length)
         else:
-            payload += pack('!B', (mask_bit | 127)) + pack('!Q', length)
+            header += pack('!B', (mask_bit | 127)) + pack('!Q', length)
 
         # we always mask frames from the client to server
         mask_key = os.urandom(4)
-        mask_data = self.generate_mask(mask_key, self.body)
-        mask = mask_key + mask_data
-        payload += mask
+        header += mask_key
+
+        # the frame is assembled in a single buffer of exactly the right
+        # size: the body is copied in once and then masked where it lies,
+        # rather than building and concatenating intermediate strings
+        body_offset = len(header)
+        payload = bytearray(body_offset + length)
+        payload[:body_offset] = header
+        if length:
+            payload[body_offset:] = self.body
+            mask_in_place(mask_key, payload, body_offset)
 
         return payload
 
 
-class ServerFrame(Frame):
-    """ Represent incoming Server -> Client messages
+class FrameHeader(object):
+    """ The parsed header of a single websocket frame.
+
+    The header is parsed exactly once per frame, as soon as enough bytes
+    have been buffered to do so, and tells the reader how many more bytes
+    it must wait for before the frame is complete.
+
     """
 
-    def __init__(self, bytes):
-        super(ServerFrame, self).__init__(bytes)
+    def __init__(self, fin, opcode, masked, length, payload_length, rsv1=0):
+        self.fin = fin
+        self.rsv1 = rsv1
+        self.opcode = opcode
+        self.masked = masked
+        # the number of bytes taken up by the header itself, including
+        # any extended payload length and masking key
+        self.length = length
+        self.payload_length = payload_length
 
-        if not bytes:
-            return
+    @property
+    def frame_length(self):
+        return self.length + self.payload_length
 
-        try:
-            self.payload_length_indicator = bytes[1] & 0b1111111
-        except Exception:
-            raise IncompleteFrameError(required_bytes=1)
+    @classmethod
+    def parse(cls, buffered_bytes):
+        """ Parse a frame header from the start of ``buffered_bytes``.
 
-        # if this doesn't raise, all the above will receive a value
-        self.ensure_complete_frame(bytes)
+        :Parameters:
+            buffered_bytes : bytearray
+                bytes received from the server, beginning at the first
+                byte of a frame
 
-        # server must not mask the payload
-        mask = bytes[1] >> 7
-        assert mask == 0
+        :Returns:
+            A ``FrameHeader`` or ``None`` if more bytes must be received
+            before the header can be parsed.
 
-        self.buffered_bytes = bytes
+        """
+        available_bytes = len(buffered_bytes)
+        # we need a minimum of 2 bytes to determine the payload length
+        if available_bytes < 2:
+            return None
 
-        self.len = 0
-        # Parse the first two bytes of header.
-        self.fin = bytes[0] >> 7
+        first_byte = buffered_bytes[0]
+        second_byte = buffered_bytes[1]
 
-        if self.fin == 0:
-            logger.exception("Multiple Frames Returned: %s", bytes)
-            raise WampyError(
-                'Multiple framed responses not yet supported: {}'.format(bytes)
-            )
+        fin = first_byte >> 7
+        rsv1 = (first_byte >> 6) & 1
+        opcode = first_byte & 0b1111
+        masked = second_byte >> 7
+        payload_length_indicator = second_byte & 0b1111111
+
+        if payload_length_indicator < 126:
+            # the trailing 7 bits of the 2nd byte tell us exactly how long
+            # the payload is
+            length = 2
+            payload_length = payload_length_indicator
 
-        self.opcode = bytes[0] & 0b1111
-        try:
-            self.payload = json.loads(str(self.body))
-        except Exception:
+        elif payload_length_indicator == 126:
+            # the following two bytes indicate the payload length
+            length = 4
+            if available_bytes < length:
+                return None
+            payload_length = unpack_from("!H", buffered_bytes, 2)[0]
+
+        else:
+            # the following eight bytes indicate the payload length
+            length = 10
+            if available_bytes < length:
+                return None
+            payload_length = unpack_from("!Q", buffered_bytes, 2)[0]
+
+        if payload_length >= Frame.MAX_LENGTH:
+            # the most significant bit of a 64 bit length must be 0
             raise WebsocktProtocolError(
-                'Failed to load JSON object from: "%s"', self.body
+                "invalid payload length: {}".format(payload_length)
             )
 
-    def ensure_complete_frame(self, buffered_bytes):
-        # we need a minimum of 2 bytes to determine the payload length and
-        # hence whether this is a complete frame or not.
-        if len(buffered_bytes) < 2:
-            # there are more bytes to receive.
-            raise IncompleteFrameError(required_bytes=1)
+        if masked:
+            length += 4
 
-        payload_length_indicator = buffered_bytes[1] & 0b1111111
-        available_bytes_for_body = buffered_bytes[2:]
+        return cls(
+            fin=fin, opcode=opcode, masked=masked, length=length,
+            payload_length=payload_length, rsv1=rsv1,
+        )
 
-        try:
-            available_bytes_for_body[1]
-        except IndexError:
-            raise IncompleteFrameError(required_bytes=payload_length_indicator)
 
-        # unpack the buffered bytes into an integer
-        body_length = unpack_from(">h", available_bytes_for_body)[0]
+class ServerFrame(Frame):
+    """ Represent incoming Server -> Client messages
+    """
 
-        if payload_length_indicator < 126:
-            # then we have enough knowlege about the payload length as it's
-            # contained within the 2nd byte of the header - because the
-            # trailing 7 bits of the 2 bytes tells us exactly how long the
-            # payload is
-            body_candidate = available_bytes_for_body
-            # in this case body length is represented by the indicator
-            body_length = payload_length_indicator
+    def __init__(self, bytes, header=None):
+        super(ServerFrame, self).__init__(bytes)
 
-        elif payload_length_indicator == 126:
-            # then we don't have enough knowledge yet.
-            # and actually the following two bytes indicate the payload length.
-            # get all buffered bytes beyond the header and the excluded 2 bytes
-            body_candidate = available_bytes_for_body[2:]  # require >= 2 bytes
+        self._payload = None
 
-        else:
-            # actually, the following eight bytes indicate the payload length.
-            # so check we have at least as much as we need, else exit.
-            body_candidate = available_bytes_for_body[6:]  # require >= 8 bytes
+        if not bytes and header is None:
+            return
 
-        if len(body_candidate) < body_length:
+        if header is None:
+            header = FrameHeader.parse(bytes)
+            if header is None:
+                raise IncompleteFrameError(required_bytes=1)
+
+        frame_length = header.frame_length
+        if len(bytes) < frame_length:
             raise IncompleteFrameError(
-                required_bytes=body_length - len(body_candidate)
+                required_bytes=frame_length - len(bytes)
             )
 
-        self.body = body_candidate
-        self.payload_length_indicator = payload_length_indicator
+        # server must not mask the payload
+        assert header.masked == 0
+
+        self.header = header
+        self.buffered_bytes = bytes
+        if header.length == 0 and len(bytes) == frame_length:
+            # a body without a header, which slicing would only copy
+            self.body = bytes
+        else:
+            self.body = bytes[header.length:frame_length]
+
+        self.fin = header.fin
+        self.opcode = header.opcode
+
+    @property
+    def is_control(self):
+        # control frames are those with the most significant bit of the
+        # opcode set, i.e. CLOSE, PING and PONG
+        return bool(self.opcode & 0x8)
+
+    @property
+    def is_binary(self):
+        return self.opcode == self.OPCODE_BINARY
+
+    @property
+    def data(self):
+        """ The raw bytes of the message, without copying them. """
+        return memoryview(self.body)
+
+    @property
+    def text(self):
+        # decoded straight from the body, a bytearray or bytes, without
+        # copying it to bytes first
+        return self.body.decode('utf-8')
+
+    @classmethod
+    def from_body(cls, opcode, body, rsv1=0, fin=1):
+        """ Build a frame around a ``body`` received apart from its
+        header, e.g. the whole of a message that the server fragmented
+        over several frames.
+        """
+        header = FrameHeader(
+            fin=fin, opcode=opcode, masked=0, length=0,
+            payload_length=len(body), rsv1=rsv1,
+        )
+        return cls(body, header=header)
+
+    @property
+    def payload(self):
+        if self._payload is None:
+            try:
+                # the whole body is decoded to text once, and that text
+                # parsed: at its peak the message is held as its body,
+                # its text and what is parsed from it
+                self._payload = json.loads(self.text)
+            except Exception:
+                raise WebsocktProtocolError(
+                    'Failed to load JSON object from: "%s"', self.body
+                )
+
+        return self._payload
@@ -0,0 +1,96 @@
+""" Masking of Client -> Server frame payloads.
+
+Every byte of a client payload is XORed with one byte of a 4 byte
+masking key, repeating the key over the length of the payload. Done one
+byte at a time in Python this dominates the cost of sending anything
+larger than a few KB, so here the payload is masked without a Python
+level loop over its bytes: either with NumPy, when it is installed and
+the payload is large enough to make up for the overhead of calling into
+it, or else with ``translate``.
+
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# below this many bytes the pure Python implementation is at least as
+# fast as NumPy
+NUMPY_THRESHOLD = 4 * 1024
+
+# ``XOR_TABLES[k]`` maps every byte value ``b`` to ``b ^ k``, for use with
+# ``translate``
+XOR_TABLES = [bytes(bytearray(b ^ k for b in range(256))) for k in range(256)]
+
+
+def mask_with_translate(mask_key, buffer, offset=0):
+    """ Mask ``buffer[offset:]`` in place, four strided slices at a time.
+
+    Every 4th byte of the payload is XORed with the same byte of the mask
+    key, so each of the 4 strided slices is masked with a single byte
+    translation table.
+
+    """
+    for index, key in enumerate(bytearray(mask_key)):
+        start = offset + index
+        buffer[start::4] = buffer[start::4].translate(XOR_TABLES[key])
+
+
+def mask_with_numpy(mask_key, buffer, offset=0):
+    """ Mask ``buffer[offset:]`` in place, 8 bytes at a time, with
+    vectorised NumPy XOR.
+    """
+    length = len(buffer) - offset
+    words = length // 8
+
+    # XOR the payload as native 64 bit words with the mask key repeated
+    # to the same width
+    if words:
+        array = numpy.frombuffer(
+            buffer, dtype=numpy.uint64, count=words, offset=offset)
+        numpy.bitwise_xor(
+            array, numpy.frombuffer(mask_key * 2, dtype=numpy.uint64)[0],
+            out=array,
+        )
+
+    # then whatever is left over beyond the last whole word
+    key = bytearray(mask_key)
+    for index in range(words * 8, length):
+        buffer[offset + index] ^= key[index % 4]
+
+
+def mask_in_place(mask_key, buffer, offset=0):
+    """ Mask (or unmask) ``buffer[offset:]`` in place with ``mask_key``.
+
+    :Parameters:
+        mask_key: byte string
+            4 byte string(byte), e.g. '\\x10\\xc6\\xc4\\x16'
+        buffer: bytearray
+            the buffer holding the data to mask
+        offset: int
+            where in the buffer the data to mask begins
+
+    """
+    if numpy is not None and len(buffer) - offset >= NUMPY_THRESHOLD:
+        mask_with_numpy(mask_key, buffer, offset)
+    else:
+        mask_with_translate(mask_key, buffer, offset)
+
+
+def mask(mask_key, data):
+    """ Mask (or unmask) ``data`` with ``mask_key``.
+
+    :Parameters:
+        mask_key: byte string
+            4 byte string(byte), e.g. '\\x10\\xc6\\xc4\\x16'
+        data: byte string, bytearray or memoryview
+            data to mask
+
+    :Returns:
+        The masked data as a byte string.
+
+    """
+    masked = bytearray(data)
+    mask_in_place(mask_key, masked)
+    return bytes(masked)
@@ -0,0 +1,172 @@
+""" The sans-IO half of receiving WebSocket messages.
+
+Both the eventlet and the asyncio transports read frames from their
+sockets in their own way, and then hand each one to a
+:class:`MessageReader`, which decides what it means: which control
+frames need an answer, when a fragmented message is complete, and
+whether a message is too large to accept.
+
+"""
+import logging
+from struct import pack, unpack
+
+from wampy.errors import ConnectionError, WebsocktProtocolError
+
+from . frames import ClientFrame, Frame, ServerFrame
+
+logger = logging.getLogger(__name__)
+
+
+class MessageReader(object):
+
+    def __init__(self, max_message_size=None):
+        """ Reassemble the messages sent by a server from its frames.
+
+        :Parameters:
+            max_message_size : int
+                The largest message, in bytes, to accept, however many
+                frames it takes to send. Defaults to no limit.
+
+        """
+        self.max_message_size = max_message_size
+        # the permessage-deflate extension, once agreed with the server
+        self.deflate = None
+
+        # the message being reassembled from a series of fragments
+        self._fragments = None
+        self._fragments_opcode = None
+        self._fragments_rsv1 = 0
+
+    def reset(self):
+        """ Forget any partly received message, e.g. on reconnecting. """
+        self.deflate = None
+        self._fragments = None
+        self._fragments_opcode = None
+        self._fragments_rsv1 = 0
+
+    def check_message_size(self, header):
+        """ Reject a message as soon as the ``header`` of one of its
+        frames shows it to be too large, before the frame's body is
+        received.
+        """
+        if self.max_message_size is None:
+            return
+
+        message_size = header.payload_length
+        if self._fragments is not None and (
+                header.opcode == Frame.OPCODE_CONT):
+            message_size += len(self._fragments)
+
+        if message_size > self.max_message_size:
+            raise WebsocktProtocolError(
+                "message of at least {} bytes exceeds the maximum size of {} "
+                "bytes".format(message_size, self.max_message_size)
+            )
+
+    def read_control_frame(self, frame):
+        """ Return the frame to answer a control ``frame`` with, if any,
+        and the error to raise once it is answered, if any.
+
+        A PING is answered with a PONG carrying the same body, and a
+        CLOSE by echoing its status code back, after which the
+        connection is gone.
+
+        """
+        opcode = frame.opcode
+        body = bytes(frame.body)
+
+        if opcode == Frame.OPCODE_PING:
+            logger.debug("PING received")
+            return ClientFrame(body, opcode=Frame.OPCODE_PONG), None
+
+        if opcode == Frame.OPCODE_PONG:
+            return None, None
+
+        if opcode == Frame.OPCODE_CLOSE:
+            if len(body) >= 2:
+                code = unpack('!H', body[:2])[0]
+                reason = body[2:].decode('utf-8', 'replace')
+            else:
+                code, reason = None, u''
+
+            logger.info("CLOSE received: %s %s", code, reason)
+
+            return close_frame(code), ConnectionError(
+                'Connection closed by the server: {} {}'.format(code, reason)
+            )
+
+        raise WebsocktProtocolError(
+            "unknown control frame: {}".format(opcode)
+        )
+
+    def reassemble(self, frame):
+        """ Return the complete message that ``frame`` finishes, or
+        ``None`` when it is only a part of one.
+        """
+        if frame.opcode == Frame.OPCODE_CONT:
+            if self._fragments is None:
+                raise WebsocktProtocolError(
+                    "continuation frame received outside of a message"
+                )
+
+            self._add_fragment(frame)
+            if not frame.fin:
+                return None
+
+            message = ServerFrame.from_body(
+                opcode=self._fragments_opcode, body=self._fragments,
+                rsv1=self._fragments_rsv1,
+            )
+            self._fragments = None
+            self._fragments_opcode = None
+            self._fragments_rsv1 = 0
+
+        elif frame.fin:
+            if self._fragments is not None:
+                raise WebsocktProtocolError(
+                    "new message received before the last was complete"
+                )
+            message = frame
+
+        else:
+            logger.debug("receiving fragmented message")
+            self._fragments = bytearray()
+            self._fragments_opcode = frame.opcode
+            self._fragments_rsv1 = frame.header.rsv1
+            self._add_fragment(frame)
+
+            return None
+
+        if message.header.rsv1:
+            message = self._inflate(message)
+        return message
+
+    def _inflate(self, message):
+        if self.deflate is None:
+            raise WebsocktProtocolError(
+                "compressed message received but compression was not agreed"
+            )
+
+        body = self.deflate.decompress(message.body, self.max_message_size)
+        return ServerFrame.from_body(opcode=message.opcode, body=body)
+
+    def _add_fragment(self, frame):
+        fragments = self._fragments
+        message_size = len(fragments) + len(frame.body)
+
+        if (
+                self.max_message_size is not None and
+                message_size > self.max_message_size
+        ):
+            raise WebsocktProtocolError(
+                "message exceeds the maximum size of {} bytes".format(
+                    self.max_message_size)
+            )
+
+        fragments.extend(frame.body)
+
+
+def close_frame(code=None):
+    """ Return a CLOSE frame giving the status ``code``, if any. """
+    payload = b'' if code is None else pack('!H', code)
+    return ClientFrame(payload, opcode=Frame.OPCODE_CLOSE)
@@ -0,0 +1,290 @@
+""" The writer of a connection.
+
+Every message sent over a connection is queued for a single thread, of
+the concurrency backend, that alone writes to the socket, so the frames
+of different messages are never interleaved on the wire, and a slow
+router holds up the writer rather than whoever happens to be sending.
+Whatever has queued up while the writer was busy is written with its
+next ``sendall``, so a burst of small messages costs one system call
+rather than one each.
+
+The queue is bounded. Once more than ``high_watermark`` bytes are
+waiting to be written the connection is no longer writable, until the
+queue has drained to ``low_watermark`` bytes, and meanwhile the
+``overflow`` policy decides what becomes of a new message:
+
+- ``block`` the sender until the connection is writable again,
+- ``raise`` a ``SendQueueFullError``, or
+- ``drop`` the message.
+
+Python 2 has no ``socket.sendmsg``, so the messages of a batch are
+joined into one buffer rather than written with scatter/gather I/O.
+
+"""
+import logging
+from collections import deque
+
+from wampy.backends import get_backend
+from wampy.errors import ConnectionError, SendQueueFullError, WampyError
+
+logger = logging.getLogger(__name__)
+
+
+BLOCK = 'block'
+RAISE = 'raise'
+DROP = 'drop'
+
+OVERFLOW_POLICIES = (BLOCK, RAISE, DROP)
+
+HIGH_WATERMARK = 1024 * 1024
+STOP_TIMEOUT = 1
+
+# queued after everything the writer should write before it stops
+_STOP = object()
+
+
+class Writer(object):
+
+    def __init__(
+            self, send, high_watermark=HIGH_WATERMARK, low_watermark=None,
+            overflow=BLOCK,
+    ):
+        """ Write through ``send`` from a thread of its own.
+
+        :Parameters:
+            send : callable
+                Called with the bytes to write, e.g. ``socket.sendall``.
+            high_watermark : int
+                The number of bytes queued above which the connection
+                stops being writable.
+            low_watermark : int
+                The number of bytes queued at or below which it is
+                writable again. Defaults to half the ``high_watermark``.
+            overflow : string
+                What to do with a message sent while the connection is
+                not writable: "block", "raise" or "drop".
+
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise WampyError(
+                "unknown overflow policy: {}".format(overflow)
+            )
+
+        if low_watermark is None:
+            low_watermark = high_watermark // 2
+
+        if low_watermark > high_watermark:
+            raise WampyError(
+                "low_watermark cannot be above the high_watermark: "
+                "{} > {}".format(low_watermark, high_watermark)
+            )
+
+        self.send = send
+        self.backend = get_backend()
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.overflow = overflow
+
+        self._thread = None
+        # guards the accounting of queued bytes against a writer that,
+        # with the threading backend, may run at the same time
+        self._lock = self.backend.Semaphore()
+        self._reset()
+
+    def _reset(self):
+        # data to write, and ``Event``s to signal once everything queued
+        # before them is written
+        self._buffers = deque()
+        self.queued_bytes = 0
+
+        self.writable = True
+        # signalled once the connection is writable again
+        self._writable = None
+        # signalled when data is queued for the idle writer
+        self._idle = None
+        self._error = None
+
+    def start(self):
+        if self._thread is not None:
+            self._thread.kill()
+
+        self._reset()
+        self._thread = self.backend.spawn(self._run)
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """ Stop once everything queued so far has been written, or after
+        ``timeout`` seconds, whichever is sooner.
+        """
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+
+        if self._error is None:
+            self._buffers.append(_STOP)
+            self._wake()
+
+            with self.backend.Timeout(timeout, False):
+                thread.wait()
+
+        thread.kill()
+        self._fail(ConnectionError("connection closed"))
+
+    def admit(self):
+        """ Return whether a message may be sent now, applying the
+        overflow policy if the connection is not writable.
+        """
+        self._check()
+
+        if self.writable:
+            return True
+
+        if self.overflow == DROP:
+            logger.warning(
+                "dropping message: %s bytes already waiting to be sent",
+                self.queued_bytes,
+            )
+            return False
+
+        if self.overflow == RAISE:
+            raise SendQueueFullError(
+                "{} bytes already waiting to be sent".format(
+                    self.queued_bytes)
+            )
+
+        self.wait_writable()
+        return True
+
+    def wait_writable(self, timeout=None):
+        """ Wait until the connection is writable, for at most ``timeout``
+        seconds, returning whether it is.
+        """
+        if self._writable is not None:
+            with self.backend.Timeout(timeout, False):
+                self._writable.wait()
+
+        self._check()
+        return self.writable
+
+    def write(self, data):
+        """ Queue ``data`` to be written after everything queued before
+        it, whether or not the connection is writable.
+        """
+        self._check()
+
+        with self._lock:
+            self._buffers.append(data)
+            self.queued_bytes += len(data)
+
+            if self.writable and self.queued_bytes > self.high_watermark:
+                logger.info(
+                    "%s bytes waiting to be sent: no longer writable",
+                    self.queued_bytes,
+                )
+                self.writable = False
+                self._writable = self.backend.Event()
+
+        self._wake()
+
+    def flush(self, timeout=None):
+        """ Wait until everything queued so far has been written.
+        """
+        self._check()
+
+        flushed = self.backend.Event()
+        self._buffers.append(flushed)
+        self._wake()
+
+        with self.backend.Timeout(timeout):
+            flushed.wait()
+
+    def _check(self):
+        if self._error is not None:
+            raise ConnectionError('cannot send: "{}"'.format(self._error))
+
+        if self._thread is None:
+            raise ConnectionError("cannot send: not connected")
+
+    def _wake(self):
+        idle, self._idle = self._idle, None
+        if idle is not None:
+            idle.send()
+
+    def _run(self):
+        buffers = self._buffers
+
+        while True:
+            if not buffers:
+                idle = self._idle = self.backend.Event()
+                # unless something was queued before the writer was idle
+                if not buffers:
+                    idle.wait()
+                continue
+
+            batch = []
+            marker = None
+            while buffers:
+                data = buffers.popleft()
+                if data is _STOP or isinstance(data, self.backend.Event):
+                    marker = data
+                    break
+                batch.append(data)
+
+            if batch:
+                length = sum(len(data) for data in batch)
+
+                try:
+                    self.send(join(batch))
+                except Exception as exc:
+                    logger.error("failed to write to the connection: %s", exc)
+                    if marker is not None:
+                        buffers.appendleft(marker)
+                    self._fail(exc)
+                    return
+
+                with self._lock:
+                    self.queued_bytes -= length
+                    if not self.writable and (
+                            self.queued_bytes <= self.low_watermark):
+                        logger.info(
+                            "%s bytes waiting to be sent: writable again",
+                            self.queued_bytes,
+                        )
+                        self._set_writable()
+
+            if marker is _STOP:
+                return
+
+            if marker is not None:
+                marker.send()
+
+    def _fail(self, exc):
+        if self._error is None:
+            self._error = exc
+
+        # nothing more will be written, so keep no one waiting for it
+        error = ConnectionError('cannot send: "{}"'.format(self._error))
+        for data in self._buffers:
+            if isinstance(data, self.backend.Event):
+                data.send_exception(error)
+
+        self._buffers.clear()
+        self.queued_bytes = 0
+        self._set_writable()
+
+    def _set_writable(self):
+        self.writable = True
+
+        writable, self._writable = self._writable, None
+        if writable is not None:
+            writable.send()
+
+
+def join(buffers):
+    if len(buffers) == 1:
+        return buffers[0]
+
+    joined = bytearray()
+    for buffer in buffers:
+        joined += buffer
+
+    return joined